@@ -0,0 +1,42 @@
+import argparse
+import time
+
+from compiler import lexer
+from benchmarks.workload import generate_program
+
+
+def best_time(func, code, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(code)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Compare lexer engines in tokens per second.")
+    ap.add_argument("-n", "--declarations", type=int, default=100000)
+    ap.add_argument("-r", "--repeat", type=int, default=5)
+    args = ap.parse_args(argv)
+
+    code = generate_program(args.declarations)
+    reference = lexer.tokenize_regex(code)
+    assert lexer.tokenize(code) == reference, "tokenize differs from the regex reference"
+    assert list(lexer.tokenize_compact(code)) == reference, "tokenize_compact differs from the regex reference"
+
+    megabytes = len(code.encode("utf-8")) / 1e6
+    print(f"{len(reference):,} tokens, {megabytes:.1f} MB")
+    baseline = None
+    for name, func in [("tokenize_regex", lexer.tokenize_regex),
+                       ("tokenize", lexer.tokenize),
+                       ("tokenize_compact", lexer.tokenize_compact)]:
+        seconds = best_time(func, code, args.repeat)
+        baseline = baseline or seconds
+        print(f"{name:18} {len(reference) / seconds / 1e6:6.2f} Mtok/s "
+              f"{megabytes / seconds:6.2f} MB/s  x{baseline / seconds:.2f}")
+
+
+if __name__ == "__main__":
+    main()
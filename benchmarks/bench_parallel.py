@@ -0,0 +1,91 @@
+import argparse
+import os
+import sys
+import time
+
+from compiler import pipeline
+from compiler.parallel import ParallelCompiler
+from benchmarks.workload import PRESETS, generate_preset
+
+# Wall time of a serial compile against ParallelCompiler with a range of worker counts,
+# per phase. The parallel compiler runs the whole front end (lexing, parsing and
+# lowering) in its workers before it yields "tokens", so for those rows the tokens
+# column is the parallel part and "ir" is only the merge of the chunks' IR.
+
+
+def timed_phases(phases):
+    # Seconds spent producing each phase of a phase stream, and the results
+    seconds = {}
+    results = {}
+    start = time.perf_counter()
+    for phase, value in phases:
+        now = time.perf_counter()
+        seconds[phase] = now - start
+        results[phase] = value
+        start = now
+    return seconds, results
+
+
+def best(runs):
+    # Fastest run by total time
+    return min(runs, key=lambda seconds: sum(seconds.values()))
+
+
+def run_benchmark(code, workers_list, repeat):
+    rows = []
+    serial = []
+    for _ in range(repeat):
+        seconds, results = timed_phases(pipeline.iter_phases(code))
+        serial.append(seconds)
+    expected = str(results["target"])
+    rows.append(("serial", best(serial)))
+    for workers in workers_list:
+        compiler = ParallelCompiler(workers)
+        try:
+            runs = []
+            for _ in range(repeat):
+                seconds, results = timed_phases(compiler.iter_phases(code))
+                runs.append(seconds)
+                if str(results["target"]) != expected:
+                    raise AssertionError(f"{workers} workers produced different target code")
+        finally:
+            compiler.close()
+        rows.append((f"{workers} workers", best(runs)))
+    return rows
+
+
+def print_rows(rows, stream):
+    serial_total = sum(rows[0][1].values())
+    header = "".join(f"{phase:>10}" for phase in pipeline.PHASES)
+    print(f"{'run':12}{header}{'total':>10}{'speedup':>9}", file=stream)
+    for name, seconds in rows:
+        total = sum(seconds.values())
+        columns = "".join(f"{seconds[phase]:10.3f}" for phase in pipeline.PHASES)
+        print(f"{name:12}{columns}{total:10.3f}{serial_total / total:8.2f}x", file=stream)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Compare a serial compile with --split-jobs compiles.")
+    ap.add_argument("--size", choices=sorted(PRESETS), default="medium")
+    ap.add_argument("-j", "--workers", default=None,
+                    help="comma-separated worker counts (default: 1, 2, 4, ... up to the core count)")
+    ap.add_argument("-r", "--repeat", type=int, default=3)
+    args = ap.parse_args(argv)
+
+    if args.workers:
+        workers_list = [int(w) for w in args.workers.split(",")]
+    else:
+        cores = os.cpu_count() or 1
+        workers_list = [1]
+        while workers_list[-1] * 2 <= cores:
+            workers_list.append(workers_list[-1] * 2)
+
+    code = generate_preset(args.size)
+    print(f"workload {args.size}: {len(code.encode('utf-8')) / 1e6:.1f} MB, {os.cpu_count()} cores, "
+          f"best of {args.repeat}")
+    print_rows(run_benchmark(code, workers_list, args.repeat), sys.stdout)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
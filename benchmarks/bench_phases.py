@@ -0,0 +1,120 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+from compiler import lexer, parser, semantic_analyzer, intermediate_gen, optimizer, code_generator, pipeline
+from benchmarks.workload import PRESETS, generate_preset
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+def best_time(func, arg, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(arg)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def run_benchmarks(code, repeat):
+    # Time each phase on the previous phase's output, then the whole pipeline
+    megabytes = len(code.encode("utf-8")) / 1e6
+    results = {}
+
+    def record(name, seconds, units, unit_name):
+        results[name] = {
+            "seconds": seconds,
+            "mb_per_second": megabytes / seconds,
+            "units": units,
+            "units_per_second": units / seconds,
+            "unit": unit_name,
+        }
+
+    seconds, tokens = best_time(lexer.tokenize, code, repeat)
+    record("tokenize", seconds, len(tokens), "tokens")
+    seconds, buffer = best_time(lexer.tokenize_compact, code, repeat)
+    record("tokenize_compact", seconds, len(buffer), "tokens")
+    seconds, ast = best_time(lambda t: parser.Parser(t).parse(), tokens, repeat)
+    record("parse", seconds, len(tokens), "tokens")
+    seconds, _ = best_time(semantic_analyzer.analyze, ast, repeat)
+    record("analyze", seconds, len(ast), "statements")
+    seconds, ir = best_time(intermediate_gen.generate_ir, ast, repeat)
+    record("generate_ir", seconds, len(ir), "instructions")
+    seconds, opt_ir = best_time(optimizer.optimize, ir, repeat)
+    record("optimize", seconds, len(ir), "instructions")
+    seconds, _ = best_time(code_generator.generate_code, opt_ir, repeat)
+    record("generate_code", seconds, len(opt_ir), "instructions")
+    seconds, _ = best_time(pipeline.compile_source, code, repeat)
+    record("end_to_end", seconds, len(tokens), "tokens")
+    return {"source_bytes": len(code.encode("utf-8")), "phases": results}
+
+
+def compare(current, baseline, threshold):
+    # A phase regresses when its throughput falls more than `threshold` below the baseline
+    regressions = []
+    for name, result in current["phases"].items():
+        base = baseline["phases"].get(name)
+        if base is None:
+            continue
+        ratio = result["mb_per_second"] / base["mb_per_second"]
+        if ratio < 1 - threshold:
+            regressions.append((name, ratio))
+    return regressions
+
+
+def print_results(current, baseline, stream):
+    print(f"{'phase':18} {'seconds':>9} {'MB/s':>8} {'units/s':>12}  vs baseline", file=stream)
+    for name, r in current["phases"].items():
+        base = baseline["phases"].get(name) if baseline else None
+        delta = f"x{r['mb_per_second'] / base['mb_per_second']:.2f}" if base else "-"
+        print(f"{name:18} {r['seconds']:9.3f} {r['mb_per_second']:8.2f} "
+              f"{r['units_per_second']:12,.0f}  {delta}", file=stream)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark every compiler phase and check for regressions.")
+    ap.add_argument("--size", choices=sorted(PRESETS), default="medium")
+    ap.add_argument("-r", "--repeat", type=int, default=3)
+    ap.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline results file")
+    ap.add_argument("--save-baseline", action="store_true", help="store these results as the new baseline")
+    ap.add_argument("--threshold", type=float, default=0.2,
+                    help="allowed throughput drop per phase before failing (default: 0.2 = 20%%)")
+    args = ap.parse_args(argv)
+
+    code = generate_preset(args.size)
+    current = run_benchmarks(code, args.repeat)
+    current.update(size=args.size, python=platform.python_version(), machine=platform.machine())
+
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baselines = json.load(f)
+    baseline = baselines.get(args.size)
+
+    print(f"workload {args.size}: {current['source_bytes'] / 1e6:.1f} MB")
+    print_results(current, baseline, sys.stdout)
+
+    if args.save_baseline:
+        baselines[args.size] = current
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baselines, f, indent=2)
+        print(f"baseline saved to {args.baseline}")
+        return 0
+
+    if baseline is None:
+        print("no baseline for this size; run with --save-baseline to create one")
+        return 0
+    regressions = compare(current, baseline, args.threshold)
+    for name, ratio in regressions:
+        print(f"REGRESSION: {name} runs at {ratio:.0%} of baseline throughput")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+import argparse
+import random
+
+# Named workloads: (declarations, longest +/* chain, deepest parenthesis nesting)
+PRESETS = {
+    "small": (1000, 16, 8),
+    "medium": (10000, 32, 16),
+    "large": (100000, 64, 32),
+    "huge": (1000000, 64, 32),
+}
+
+
+def operand(rng, declared):
+    if declared and rng.random() < 0.6:
+        return rng.choice(declared)
+    return str(rng.randint(0, 999))
+
+
+def chain(rng, declared, length):
+    # a + b * c - d ... with length operands
+    parts = [operand(rng, declared)]
+    for _ in range(length - 1):
+        parts.append(rng.choice("+-*+*"))
+        parts.append(operand(rng, declared))
+    return " ".join(parts)
+
+
+def nested(rng, declared, depth):
+    # ((((a + 1) * b) - 2) ...) nested depth levels deep
+    expr = operand(rng, declared)
+    for _ in range(depth):
+        expr = f"({expr} {rng.choice('+-*')} {operand(rng, declared)})"
+    return expr
+
+
+def generate_program(declarations, max_chain=32, max_depth=16, float_ratio=0.2, seed=0):
+    # Programs in the accepted subset: int/float declarations whose initializers mix
+    # long operator chains, deeply parenthesized expressions and earlier variables
+    rng = random.Random(seed)
+    declared = []
+    lines = []
+    for i in range(declarations):
+        type_name = "float" if rng.random() < float_ratio else "int"
+        shape = rng.random()
+        if shape < 0.5:
+            expr = chain(rng, declared, rng.randint(1, max_chain))
+        elif shape < 0.8:
+            expr = nested(rng, declared, rng.randint(1, max_depth))
+        else:
+            expr = f"{nested(rng, declared, rng.randint(1, max_depth))} * {chain(rng, declared, rng.randint(1, max_chain))}"
+        name = f"v{i}"
+        lines.append(f"{type_name} {name} = {expr};")
+        declared.append(name)
+        # Only recent names are referenced, like machine-generated code
+        if len(declared) > 64:
+            declared.pop(0)
+    return "\n".join(lines) + "\n"
+
+
+def generate_preset(name, seed=0):
+    declarations, max_chain, max_depth = PRESETS[name]
+    return generate_program(declarations, max_chain, max_depth, seed=seed)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Write a synthetic program in the accepted C++ subset.")
+    ap.add_argument("output", help="file to write")
+    ap.add_argument("-n", "--declarations", type=int, default=10000)
+    ap.add_argument("--max-chain", type=int, default=32)
+    ap.add_argument("--max-depth", type=int, default=16)
+    ap.add_argument("--float-ratio", type=float, default=0.2)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args(argv)
+    with open(args.output, "w", encoding="utf-8") as f:
+        f.write(generate_program(args.declarations, args.max_chain, args.max_depth, args.float_ratio, args.seed))
+
+
+if __name__ == "__main__":
+    main()
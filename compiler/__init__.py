@@ -0,0 +1,2 @@
+# Bumped whenever a phase's output changes, so cached results from older compilers are not reused
+__version__ = "0.6.0"
@@ -0,0 +1,297 @@
+import argparse
+import fnmatch
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from compiler import pipeline, vm, irfile
+from compiler.cache import PhaseCache, DEFAULT_MAX_BYTES
+from compiler.parallel import ParallelCompiler
+from compiler.profiling import Profiler
+
+# Output file name for each phase, written next to each other per source file
+PHASE_FILES = {
+    "tokens": "tokens.txt",
+    "ast": "ast.txt",
+    "semantics": "semantics.txt",
+    "ir": "ir.txt",
+    "optimized": "optimized.txt",
+    "target": "target.asm",
+}
+
+# --emit-ir writes these phases in the binary format as well; --load-ir reads them back
+BINARY_FILES = {
+    "ast": "ast.mcir",
+    "ir": "ir.mcir",
+    "optimized": "optimized.mcir",
+}
+SOURCE_PATTERN = "*.cpp,*.cc,*.cxx"
+BINARY_PATTERN = "*.mcir"
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+
+# Phases a run needs when nothing is written to disk: enough to decide the status
+STATUS_PHASES = ["semantics", "target"]
+# --run executes the program before and after optimization on the bytecode VM
+RUN_PHASES = ["ir", "optimized"]
+
+# Per-process phase cache and --split-jobs compiler, set up by init_worker
+_phase_cache = None
+_file_compiler = None
+
+
+def init_worker(cache_dir, cache_bytes, split_jobs=1):
+    global _phase_cache, _file_compiler
+    _phase_cache = PhaseCache(cache_dir, cache_bytes) if cache_bytes else None
+    _file_compiler = ParallelCompiler(split_jobs) if split_jobs > 1 else None
+
+
+def collect_sources(paths, pattern):
+    sources = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    if _matches(name, pattern):
+                        sources.append(os.path.join(root, name))
+        elif os.path.isfile(path):
+            sources.append(path)
+        else:
+            raise FileNotFoundError(f"No such file or directory: {path!r}")
+    return sources
+
+
+def _matches(name, pattern):
+    return any(fnmatch.fnmatch(name, p) for p in pattern.split(","))
+
+
+def output_dir_for(source, root, outdir):
+    rel = os.path.relpath(os.path.abspath(source), root)
+    return os.path.join(outdir, rel)
+
+
+def compile_file(job):
+    source, outdir, profile, run, emit_ir, load_ir = job
+    profiler = Profiler() if profile else None
+    start = time.perf_counter()
+    result = {"source": source, "status": "ok", "phase": None, "error": None, "cached": False}
+    phase = None
+    try:
+        if outdir:
+            os.makedirs(outdir, exist_ok=True)
+        cached = None
+        if load_ir:
+            # A binary phase file resumes the pipeline at the phase it holds
+            phases = pipeline.resume_phases(*irfile.load(source))
+        else:
+            with open(source, encoding="utf-8") as f:
+                code = f.read()
+            if _phase_cache is not None:
+                # Unchanged sources skip straight to the cached outputs they need
+                needed = pipeline.PHASES if outdir else STATUS_PHASES + (RUN_PHASES if run else [])
+                cached = _phase_cache.load(code, [p for p in pipeline.PHASES if p in needed])
+            if cached is not None:
+                phases = pipeline.PhaseStream(cached.items(), cached)
+            else:
+                phases = pipeline.iter_phases(code, compiler=_file_compiler)
+        result["cached"] = cached is not None
+        computed = {}
+        if profiler is not None:
+            phases = profiler.run(phases)
+        for phase, value in phases:
+            computed[phase] = value
+            if outdir:
+                with open(os.path.join(outdir, PHASE_FILES[phase]), "w", encoding="utf-8") as f:
+                    f.write(pipeline.format_phase(phase, value))
+                    f.write("\n")
+                if emit_ir and phase in BINARY_FILES:
+                    irfile.save(os.path.join(outdir, BINARY_FILES[phase]), phase, value)
+            if phase == "semantics":
+                result["diagnostics"] = [d.as_dict() for d in value]
+                if pipeline.has_semantic_errors(value):
+                    result["status"] = "semantic-error"
+                    result["phase"] = phase
+                    result["error"] = "\n".join(map(str, value.errors))
+        if _phase_cache is not None and cached is None and not load_ir:
+            _phase_cache.store(code, computed)
+        if run and result["status"] == "ok":
+            result["run"] = run_program(computed, outdir)
+    except Exception as e:
+        result["status"] = "error"
+        result["phase"] = _next_phase(phase)
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["seconds"] = round(time.perf_counter() - start, 6)
+    if profiler is not None:
+        result["profile"] = profiler.report()
+    return result
+
+
+def run_program(phases, outdir):
+    # Executed instruction counts before and after optimization show what the passes saved
+    # (a loaded optimized IR file has no unoptimized program to compare against)
+    try:
+        before = vm.run(phases["ir"]) if "ir" in phases else None
+        after = vm.run(phases["optimized"])
+    except vm.VMError as e:
+        return {"error": str(e)}
+    if outdir:
+        with open(os.path.join(outdir, "run.txt"), "w", encoding="utf-8") as f:
+            f.write(f"{after}\n")
+    report = {"optimized": after.as_dict()}
+    if before is not None:
+        report["ir"] = before.as_dict()
+    return report
+
+
+def _next_phase(phase):
+    # The phase that raised is the one after the last phase that completed
+    if phase is None:
+        return pipeline.PHASES[0]
+    index = pipeline.PHASES.index(phase) + 1
+    return pipeline.PHASES[min(index, len(pipeline.PHASES) - 1)]
+
+
+def run_jobs(jobs, workers, cache_dir=None, cache_bytes=DEFAULT_MAX_BYTES, split_jobs=1):
+    if split_jobs > 1:
+        # Each file already uses split_jobs processes, so files are taken one at a time
+        workers = 1
+    if workers == 1 or len(jobs) <= 1:
+        init_worker(cache_dir, cache_bytes, split_jobs)
+        try:
+            return [compile_file(job) for job in jobs]
+        finally:
+            if _file_compiler is not None:
+                _file_compiler.close()
+    chunksize = max(1, len(jobs) // (workers * 8))
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                             initargs=(cache_dir, cache_bytes)) as pool:
+        return list(pool.map(compile_file, jobs, chunksize=chunksize))
+
+
+def summarize(results, seconds):
+    counts = {"ok": 0, "semantic-error": 0, "error": 0}
+    cache_hits = 0
+    warnings = 0
+    for result in results:
+        counts[result["status"]] += 1
+        cache_hits += result["cached"]
+        warnings += sum(d["severity"] == "warning" for d in result.get("diagnostics", ()))
+    failed = counts["semantic-error"] + counts["error"]
+    return {
+        "files": len(results),
+        "ok": counts["ok"],
+        "semantic_errors": counts["semantic-error"],
+        "errors": counts["error"],
+        "warnings": warnings,
+        "cache_hits": cache_hits,
+        "cache_misses": len(results) - cache_hits,
+        "seconds": round(seconds, 6),
+        "exit_code": EXIT_FAILED if failed else EXIT_OK,
+        "results": results,
+    }
+
+
+def profile_report(results):
+    # Per-file phase records plus totals per phase across all files
+    totals = {phase: {"wall_seconds": 0.0, "cpu_seconds": 0.0, "peak_bytes": 0} for phase in pipeline.PHASES}
+    files = []
+    for result in results:
+        profile = result.get("profile")
+        if profile is None:
+            continue
+        files.append({"source": result["source"], "cached": result["cached"], **profile})
+        for record in profile["phases"]:
+            total = totals[record["phase"]]
+            total["wall_seconds"] += record["wall_seconds"]
+            total["cpu_seconds"] += record["cpu_seconds"]
+            total["peak_bytes"] = max(total["peak_bytes"], record["peak_bytes"] or 0)
+    return {"totals": totals, "files": files}
+
+
+def print_summary(report, stream):
+    for result in report["results"]:
+        for d in result.get("diagnostics", ()):
+            print(f"{result['source']}:{d['line']}:{d['column']}: {d['severity']}: {d['message']}", file=stream)
+        run = result.get("run")
+        if run is not None:
+            if "error" in run:
+                print(f"{result['source']}: run failed: {run['error']}", file=stream)
+            else:
+                unoptimized = f" ({run['ir']['instructions']} unoptimized)" if "ir" in run else ""
+                print(f"{result['source']}: executed {run['optimized']['instructions']} instructions"
+                      f"{unoptimized} in {run['optimized']['seconds'] * 1000:.2f} ms", file=stream)
+        if result["status"] != "ok":
+            print(f"{result['source']}: {result['status']} in {result['phase']}: "
+                  f"{result['error'].splitlines()[0]}", file=stream)
+    print(f"{report['files']} file(s): {report['ok']} ok, {report['semantic_errors']} with semantic errors, "
+          f"{report['warnings']} warning(s), {report['errors']} failed in {report['seconds']:.2f}s "
+          f"(cache: {report['cache_hits']} hit, {report['cache_misses']} miss)", file=stream)
+
+
+def build_arg_parser():
+    ap = argparse.ArgumentParser(prog="python -m compiler",
+                                 description="Compile source files without the GUI.")
+    ap.add_argument("paths", nargs="+", help="source files or directories to compile")
+    ap.add_argument("-o", "--output-dir", help="write per-phase outputs for each file under this directory")
+    ap.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                    help="number of worker processes (default: all cores)")
+    ap.add_argument("--split-jobs", type=int, default=1, metavar="N",
+                    help="compile each file in N processes, split at statement boundaries; "
+                         "files are then compiled one after another")
+    ap.add_argument("--pattern",
+                    help=f"comma-separated file name patterns used when scanning directories "
+                         f"(default: {SOURCE_PATTERN}, or {BINARY_PATTERN} with --load-ir)")
+    ap.add_argument("--report", help="write the summary report as JSON to this file")
+    ap.add_argument("--profile", metavar="FILE",
+                    help="record time, CPU, peak memory and sizes per phase and write them as JSON")
+    ap.add_argument("--run", action="store_true",
+                    help="execute each program on the bytecode VM and report instructions executed and time")
+    ap.add_argument("--emit-ir", action="store_true",
+                    help="also write the AST, IR and optimized IR in the binary format (needs -o)")
+    ap.add_argument("--load-ir", action="store_true",
+                    help="the paths are binary AST or IR files written by --emit-ir; resume compiling from them")
+    ap.add_argument("--no-cache", action="store_true", help="do not read or write the phase cache")
+    ap.add_argument("--cache-dir", help="phase cache directory (default: ~/.cache/mini-cpp-compiler)")
+    ap.add_argument("--cache-size", type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024),
+                    help="phase cache size cap in MB (default: %(default)s)")
+    return ap
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    if args.emit_ir and not args.output_dir:
+        print("error: --emit-ir needs an output directory (-o)", file=sys.stderr)
+        return EXIT_FAILED
+    pattern = args.pattern or (BINARY_PATTERN if args.load_ir else SOURCE_PATTERN)
+    try:
+        sources = collect_sources(args.paths, pattern)
+    except FileNotFoundError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return EXIT_FAILED
+
+    root = os.path.commonpath([os.path.dirname(os.path.abspath(s)) for s in sources]) if sources else ""
+    jobs = [(s, output_dir_for(s, root, args.output_dir) if args.output_dir else None, bool(args.profile), args.run,
+             args.emit_ir, args.load_ir)
+            for s in sources]
+
+    start = time.perf_counter()
+    cache_bytes = 0 if args.no_cache else args.cache_size * 1024 * 1024
+    results = run_jobs(jobs, max(1, args.jobs), args.cache_dir, cache_bytes, max(1, args.split_jobs))
+    report = summarize(results, time.perf_counter() - start)
+
+    print_summary(report, sys.stdout)
+    if args.profile:
+        with open(args.profile, "w", encoding="utf-8") as f:
+            json.dump(profile_report(results), f, indent=2)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return report["exit_code"]
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,339 @@
+from array import array
+
+
+class Node:
+    # Expression nodes (Num, Var, BinOp) are hash-consed by NodeFactory, so one node
+    # stands for every occurrence of its subexpression and has no position of its own;
+    # a statement records where each occurrence of its expression is (see Declare).
+    # `nid` numbers the nodes of one factory, so equal nids mean the same node.
+    __slots__ = ('nid',)
+    _fields = ()
+    # Attributes that carry a node's position, rebuilt along with its fields
+    _extra = ()
+    line = None
+    column = None
+
+    def __init__(self, *values, nid=None):
+        for name, value in zip(self._fields, values):
+            setattr(self, name, value)
+        self.nid = nid
+
+    def children(self):
+        for name in self._fields:
+            value = getattr(self, name)
+            if isinstance(value, Node):
+                yield value
+
+    def __eq__(self, other):
+        # Structural equality; positions are not part of a node's identity. Compared
+        # with an explicit stack so deeply nested trees do not hit the recursion limit.
+        if self.__class__ is not other.__class__:
+            return NotImplemented
+        stack = [(self, other)]
+        while stack:
+            a, b = stack.pop()
+            if a is b:
+                continue
+            if a.__class__ is not b.__class__:
+                return False
+            for name in a._fields:
+                x = getattr(a, name)
+                y = getattr(b, name)
+                if isinstance(x, Node):
+                    stack.append((x, y))
+                elif x != y:
+                    return False
+        return True
+
+    __hash__ = None
+
+    def __repr__(self):
+        # Built iteratively for the same reason; pieces are (is_text, value) pairs
+        parts = []
+        stack = [(False, self)]
+        while stack:
+            is_text, item = stack.pop()
+            if is_text:
+                parts.append(item)
+            elif isinstance(item, Node):
+                parts.append(item.__class__.__name__ + "(")
+                stack.append((True, ")"))
+                fields = item._fields
+                for i in range(len(fields) - 1, -1, -1):
+                    stack.append((False, getattr(item, fields[i])))
+                    if i:
+                        stack.append((True, ", "))
+            else:
+                parts.append(repr(item))
+        return "".join(parts)
+
+    def __reduce__(self):
+        # Pickle (for the phase cache) recurses once per level, so a tree is stored as
+        # a flat post-order list and rebuilt by _unflatten
+        return _unflatten, (_flatten(self),)
+
+
+def _flatten(root):
+    # Records are (class, values, links, nid, extra); child nodes become indexes of
+    # earlier records, listed in `links`. Shared nodes are stored once.
+    records = []
+    index = {}
+    stack = [(root, False)]
+    while stack:
+        node, expanded = stack.pop()
+        if id(node) in index:
+            continue
+        if not expanded:
+            stack.append((node, True))
+            stack.extend((child, False) for child in node.children())
+            continue
+        values = []
+        links = []
+        for i, name in enumerate(node._fields):
+            value = getattr(node, name)
+            if isinstance(value, Node):
+                value = index[id(value)]
+                links.append(i)
+            values.append(value)
+        index[id(node)] = len(records)
+        extra = tuple(getattr(node, name) for name in node._extra)
+        records.append((node.__class__, tuple(values), tuple(links), node.nid, extra))
+    return records
+
+
+def _unflatten(records):
+    nodes = []
+    for cls, values, links, nid, extra in records:
+        if links:
+            values = list(values)
+            for i in links:
+                values[i] = nodes[values[i]]
+        nodes.append(cls(*values, nid=nid, **dict(zip(cls._extra, extra))))
+    return nodes[-1]
+
+
+class Declare(Node):
+    # A statement has its own position plus `positions`, an int32 (line, column) pair
+    # for every occurrence in `expr` in post order (left subtree, right subtree, node),
+    # the order the parser builds them in. Pairs are relative to the statement: on its
+    # first line the line is 0 and the column an offset from the statement's column, on
+    # later lines the line is an offset and the column absolute. Moving a statement
+    # only changes its own line and column.
+    __slots__ = ('type_name', 'name', 'expr', 'line', 'column', 'positions')
+    _fields = ('type_name', 'name', 'expr')
+    _extra = ('line', 'column', 'positions')
+
+    def __init__(self, type_name, name, expr, line=None, column=None, positions=None, nid=None):
+        super().__init__(type_name, name, expr, nid=nid)
+        self.line = line
+        self.column = column
+        self.positions = positions
+
+    def position(self, k):
+        # Source position of occurrence k, or (None, None) when it is unknown
+        positions = self.positions
+        if positions is None or self.line is None or 2 * k + 1 >= len(positions):
+            return None, None
+        line, column = positions[2 * k], positions[2 * k + 1]
+        if line == 0:
+            return self.line, self.column + column
+        return self.line + line, column
+
+    def moved(self, line, column):
+        # The same statement at another position; the expression and its relative
+        # positions are shared with this one
+        return Declare(self.type_name, self.name, self.expr, line, column, self.positions, self.nid)
+
+
+class BinOp(Node):
+    __slots__ = ('op', 'left', 'right')
+    _fields = ('op', 'left', 'right')
+
+
+class Num(Node):
+    __slots__ = ('value',)
+    _fields = ('value',)
+
+
+class Var(Node):
+    __slots__ = ('name',)
+    _fields = ('name',)
+
+
+class NodeFactory:
+    # Hash-consing constructors: a structurally identical subexpression comes back as
+    # the node already built for it, so a program's expressions form one DAG and each
+    # distinct subexpression is stored once. Nodes get consecutive `nid`s as they are
+    # created; a BinOp is keyed by its operator and its children's nids. Positions stay
+    # out of the shared nodes: every constructor call is one occurrence, and its
+    # position is appended to the current statement's table, which declare() hands to
+    # the Declare it builds. The table keeps every distinct node alive, so its size
+    # follows the number of distinct subexpressions, not the length of the source.
+    def __init__(self):
+        self.ints = {}
+        self.floats = {}
+        self.vars = {}
+        self.binops = {}
+        self.created = 0
+        self.reused = 0
+        self.begin(None, None)
+
+    def begin(self, line, column):
+        # Start recording the occurrences of the statement at (line, column)
+        self.line = line
+        self.column = column
+        self.positions = array('i')
+
+    def record(self, line, column):
+        if line is None or self.line is None:
+            self.line = None
+        elif line == self.line:
+            self.positions.append(0)
+            self.positions.append(column - self.column)
+        else:
+            self.positions.append(line - self.line)
+            self.positions.append(column)
+
+    def num(self, value, line=None, column=None):
+        self.record(line, column)
+        # 1 and 1.0 compare equal, as do 0.0 and -0.0, so floats are keyed by repr
+        if value.__class__ is int:
+            table, key = self.ints, value
+        else:
+            table, key = self.floats, (value.__class__, repr(value))
+        node = table.get(key)
+        if node is None:
+            node = table[key] = Num(value, nid=self.next_nid())
+        else:
+            self.reused += 1
+        return node
+
+    def var(self, name, line=None, column=None):
+        self.record(line, column)
+        node = self.vars.get(name)
+        if node is None:
+            node = self.vars[name] = Var(name, nid=self.next_nid())
+        else:
+            self.reused += 1
+        return node
+
+    def binop(self, op, left, right, line=None, column=None):
+        self.record(line, column)
+        key = (op, left.nid, right.nid)
+        node = self.binops.get(key)
+        if node is None:
+            node = self.binops[key] = BinOp(op, left, right, nid=self.next_nid())
+        else:
+            self.reused += 1
+        return node
+
+    def declare(self, type_name, name, expr, line=None, column=None):
+        positions = self.positions if self.line is not None else None
+        self.begin(None, None)
+        return Declare(type_name, name, expr, line, column, positions)
+
+    def next_nid(self):
+        nid = self.created
+        self.created += 1
+        return nid
+
+    def intern(self, node):
+        # The shared node equal to `node`, whose children are already interned; used to
+        # rebuild the DAG (and its nids) from a loaded AST. Statements are returned as is.
+        cls = node.__class__
+        if cls is Num:
+            if node.value.__class__ is int:
+                table, key = self.ints, node.value
+            else:
+                table, key = self.floats, (node.value.__class__, repr(node.value))
+        elif cls is Var:
+            table, key = self.vars, node.name
+        elif cls is BinOp:
+            table, key = self.binops, (node.op, node.left.nid, node.right.nid)
+        else:
+            return node
+        shared = table.get(key)
+        if shared is None:
+            node.nid = self.next_nid()
+            shared = table[key] = node
+        return shared
+
+
+def expression_size(expr):
+    # Number of occurrences in an expression, counting a shared subtree once per use
+    count = 0
+    stack = [expr]
+    while stack:
+        node = stack.pop()
+        count += 1
+        if node.__class__ is BinOp:
+            stack.append(node.left)
+            stack.append(node.right)
+    return count
+
+
+def occurrences(statement):
+    # (node, line, column) for every occurrence in a statement's expression, in post
+    # order. The walk visits node, right, left and is reversed at the end, which is post
+    # order with left subtrees first.
+    found = []
+    stack = [statement.expr]
+    while stack:
+        node = stack.pop()
+        found.append(node)
+        if node.__class__ is BinOp:
+            stack.append(node.left)
+            stack.append(node.right)
+    found.reverse()
+    return [(node, *statement.position(k)) for k, node in enumerate(found)]
+
+
+class NodeVisitor:
+    # visit() looks the handler up once per node class and caches it on the visitor
+    # class, so walking millions of nodes costs one dict lookup per node
+    _dispatch = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._dispatch = {}
+
+    def visit(self, node):
+        try:
+            method = self._dispatch[node.__class__]
+        except KeyError:
+            method = self._resolve(node.__class__)
+        return method(self, node)
+
+    @classmethod
+    def _resolve(cls, node_class):
+        method = None
+        for klass in node_class.__mro__:
+            method = getattr(cls, 'visit_' + klass.__name__, None)
+            if method is not None:
+                break
+        cls._dispatch[node_class] = method = method or cls.generic_visit
+        return method
+
+    def generic_visit(self, node):
+        for child in node.children():
+            self.visit(child)
+
+
+class NodeTransformer(NodeVisitor):
+    # Handlers return the replacement node; generic_visit rebuilds a node only
+    # when one of its children actually changed
+    def generic_visit(self, node):
+        values = []
+        changed = False
+        for name in node._fields:
+            value = getattr(node, name)
+            if isinstance(value, Node):
+                new_value = self.visit(value)
+                changed = changed or new_value is not value
+                value = new_value
+            values.append(value)
+        if not changed:
+            return node
+        # A rebuilt statement's occurrences may have changed, so only its own position is kept
+        extra = {name: getattr(node, name) for name in node._extra if name != 'positions'}
+        return node.__class__(*values, **extra)
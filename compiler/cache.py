@@ -0,0 +1,153 @@
+import hashlib
+import os
+import pickle
+import shutil
+import tempfile
+import zlib
+
+from compiler import __version__
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def default_cache_dir():
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "mini-cpp-compiler")
+
+
+class PhaseCache:
+    # Content-addressed store of phase results keyed by sha256(compiler version + source).
+    # Every phase is its own zlib-compressed pickle, so a caller that only needs the
+    # target code reads just that file. Entries are evicted least recently used first
+    # once the directory grows past max_bytes.
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory or default_cache_dir()
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.write_errors = 0
+        self._size = None
+
+    def key(self, code):
+        digest = hashlib.sha256(__version__.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(code.encode("utf-8"))
+        return digest.hexdigest()
+
+    def entry_dir(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def load(self, code, phases):
+        entry = self.entry_dir(self.key(code))
+        results = {}
+        try:
+            for phase in phases:
+                path = os.path.join(entry, phase + ".bin")
+                with open(path, "rb") as f:
+                    data = f.read()
+                try:
+                    results[phase] = pickle.loads(zlib.decompress(data))
+                except Exception:
+                    # A damaged file, or one pickled by a compiler whose classes have
+                    # since changed (AttributeError, ImportError, TypeError, ...), is a
+                    # miss; it is removed so the next store replaces it
+                    self.discard(path, len(data))
+                    self.misses += 1
+                    return None
+            # Directory mtime is the LRU clock
+            os.utime(entry)
+        except OSError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return results
+
+    def discard(self, path, size):
+        try:
+            os.remove(path)
+        except OSError:
+            return
+        if self._size is not None:
+            self._size -= size
+
+    def store(self, code, results):
+        # A cache that cannot be written (not a directory, read-only, disk full) only
+        # costs the next run a recompile, so the write is skipped instead of failing.
+        # The size is taken before writing, so the files written are counted once.
+        size = self.size()
+        entry = self.entry_dir(self.key(code))
+        tmp = None
+        try:
+            os.makedirs(entry, exist_ok=True)
+            for phase, value in results.items():
+                data = zlib.compress(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+                target = os.path.join(entry, phase + ".bin")
+                # Write then rename so concurrent readers never see a partial file
+                fd, tmp = tempfile.mkstemp(dir=entry, suffix=".tmp")
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                # Overwriting an entry replaces its old file rather than adding to it
+                try:
+                    size -= os.path.getsize(target)
+                except OSError:
+                    pass
+                os.replace(tmp, target)
+                tmp = None
+                size += len(data)
+        except OSError:
+            self.write_errors += 1
+            if tmp is not None:
+                try:
+                    os.remove(tmp)
+                except OSError:
+                    pass
+            # Some phases may have been written; count from disk next time
+            self._size = None
+            return False
+        self._size = size
+        if size > self.max_bytes:
+            self.evict()
+        return True
+
+    def entries(self):
+        # (mtime, bytes, path) for every entry on disk
+        found = []
+        if not os.path.isdir(self.directory):
+            return found
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                try:
+                    size = sum(f.stat().st_size for f in os.scandir(entry.path))
+                    found.append((entry.stat().st_mtime, size, entry.path))
+                except OSError:
+                    continue
+        return found
+
+    def size(self):
+        if self._size is None:
+            self._size = sum(size for _, size, _ in self.entries())
+        return self._size
+
+    def evict(self):
+        # Drop the least recently used entries until the cache is back under 80% of its cap
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.8
+        for _, size, path in entries:
+            if total <= target:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            self.evictions += 1
+        self._size = total
+
+    def clear(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+        self._size = 0
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "write_errors": self.write_errors}
@@ -0,0 +1,101 @@
+import argparse
+import json
+import os
+import socket
+import sys
+
+# Thin client for the compile server (python -m compiler.server). It only needs the
+# standard library, so editors and build scripts skip importing the compiler itself.
+
+# Same order as pipeline.PHASES, repeated here to keep the client import-light
+PHASE_NAMES = ["tokens", "ast", "semantics", "ir", "optimized", "target"]
+
+
+def default_socket_path():
+    runtime = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime:
+        return os.path.join(runtime, "mini-cpp-compiler.sock")
+    return f"/tmp/mini-cpp-compiler-{os.getuid()}.sock"
+
+
+def request(payload, socket_path=None, timeout=None):
+    # One newline-terminated JSON request, one JSON response line back
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path or default_socket_path())
+        sock.sendall(json.dumps(payload).encode("utf-8") + b"\n")
+        with sock.makefile("rb") as stream:
+            line = stream.readline()
+    if not line:
+        raise ConnectionError("compile server closed the connection without replying")
+    return json.loads(line)
+
+
+def compile_source(source, phases=None, document=None, socket_path=None, timeout=None):
+    payload = {"op": "compile", "source": source, "phases": phases or ["semantics", "target"]}
+    if document is not None:
+        payload["document"] = document
+    return request(payload, socket_path, timeout)
+
+
+def print_response(response, source_name, stream, errors):
+    for d in response.get("diagnostics", ()):
+        print(f"{source_name}:{d['line']}:{d['column']}: {d['severity']}: {d['message']}", file=errors)
+    if response.get("status") == "error":
+        print(f"{source_name}: error in {response['phase']}: {response['error']}", file=errors)
+    phases = response.get("phases", {})
+    for phase, text in phases.items():
+        if len(phases) > 1:
+            print(f"== {phase} ==", file=stream)
+        print(text, file=stream)
+
+
+def build_arg_parser():
+    ap = argparse.ArgumentParser(prog="python -m compiler.client",
+                                 description="Compile through a running compile server.")
+    ap.add_argument("paths", nargs="*", help="source files to compile ('-' reads standard input)")
+    ap.add_argument("--phases", default="semantics,target",
+                    help="comma-separated phases to print (default: %(default)s)")
+    ap.add_argument("--socket", help="server socket (default: $XDG_RUNTIME_DIR/mini-cpp-compiler.sock)")
+    ap.add_argument("--timeout", type=float, default=None, help="seconds to wait for each reply")
+    ap.add_argument("--json", action="store_true", help="print the raw JSON responses")
+    ap.add_argument("--stats", action="store_true", help="print the server's cache and request counters")
+    ap.add_argument("--shutdown", action="store_true", help="ask the server to exit")
+    return ap
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    phases = [p for p in args.phases.split(",") if p]
+    unknown = [p for p in phases if p not in PHASE_NAMES]
+    if unknown:
+        print(f"error: unknown phase(s): {', '.join(unknown)}", file=sys.stderr)
+        return 1
+
+    failed = False
+    try:
+        if args.stats or args.shutdown:
+            response = request({"op": "stats" if args.stats else "shutdown"}, args.socket, args.timeout)
+            print(json.dumps(response, indent=2))
+        for path in args.paths:
+            if path == "-":
+                source, document = sys.stdin.read(), None
+            else:
+                with open(path, encoding="utf-8") as f:
+                    source = f.read()
+                # The server keeps per-statement results per document for fast re-edits
+                document = os.path.abspath(path)
+            response = compile_source(source, phases, document, args.socket, args.timeout)
+            if args.json:
+                print(json.dumps(response, indent=2))
+            else:
+                print_response(response, path, sys.stdout, sys.stderr)
+            failed = failed or response.get("status") != "ok"
+    except OSError as e:
+        print(f"error: cannot reach compile server: {e}", file=sys.stderr)
+        return 1
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,330 @@
-def generate_code(ir):
-    # Dummy code generator that outputs pseudo-assembly
-    lines = ir.splitlines()
-    asm = []
-    for line in lines:
-        if line.startswith("DECLARE"):
-            var = line.split()[1]
-            asm.append(f"; Declaring variable {var}")
-        elif line.startswith("ASSIGN"):
-            parts = line.split()
-            var = parts[1]
-            expr = " ".join(parts[2:])
-            asm.append(f"MOV {var}, {expr}")
-    return "\n".join(asm)
+import struct
+
+from compiler.ir import DECLARE, COPY, ADD, SUB, MUL, DIV, TEMP_PREFIX
+from compiler.optimizer import convert
+from compiler import peephole
+
+# x86-64 back end, Intel syntax for the GNU assembler. The program becomes `main`;
+# every declared variable is a global qword (int64 or double) named with VAR_PREFIX.
+# Values live in registers allocated by linear scan over the IR; a variable is stored
+# to its global whenever it is assigned, temporaries only touch memory when spilled.
+
+VAR_PREFIX = 'var_'
+
+# rax, rdx and r11 are scratch (idiv needs rax:rdx), xmm0 and xmm1 likewise. Caller-saved
+# registers come first so small programs need no saves in the prologue.
+INT_REGISTERS = ['rcx', 'rsi', 'rdi', 'r8', 'r9', 'r10', 'rbx', 'r12', 'r13', 'r14', 'r15']
+FLOAT_REGISTERS = [f'xmm{i}' for i in range(2, 16)]
+CALLEE_SAVED = ('rbx', 'r12', 'r13', 'r14', 'r15')
+
+INT_MNEMONICS = {ADD: 'add', SUB: 'sub', MUL: 'imul'}
+FLOAT_MNEMONICS = {ADD: 'addsd', SUB: 'subsd', MUL: 'mulsd', DIV: 'divsd'}
+
+IMM32_MIN, IMM32_MAX = -2 ** 31, 2 ** 31 - 1
+
+
+class Instr:
+    # One assembly instruction; operands are register names, immediates or memory
+    # operands as text. `comment` carries the IR instruction it was lowered from.
+    __slots__ = ('op', 'operands', 'comment')
+
+    def __init__(self, op, *operands, comment=None):
+        self.op = op
+        self.operands = operands
+        self.comment = comment
+
+    def __eq__(self, other):
+        return isinstance(other, Instr) and (self.op, self.operands) == (other.op, other.operands)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"Instr({self.op!r}, {', '.join(map(repr, self.operands))})"
+
+    def __str__(self):
+        text = f"    {self.op} {', '.join(self.operands)}" if self.operands else f"    {self.op}"
+        return f"{text:40} # {self.comment}" if self.comment else text
+
+
+class AsmProgram:
+    __slots__ = ('code', 'variables', 'constants', 'spill_slots', 'registers', 'peephole_stats')
+
+    def __init__(self, code, variables, constants, spill_slots, registers):
+        self.code = code
+        self.variables = variables
+        self.constants = constants
+        self.spill_slots = spill_slots
+        self.registers = registers
+        # Per-rule counters from the peephole pass, set by peephole.Peephole.run
+        self.peephole_stats = None
+
+    def __len__(self):
+        return len(self.code)
+
+    def __str__(self):
+        lines = ["    .intel_syntax noprefix", "    .text", "    .globl main", "main:"]
+        lines.extend(map(str, self.code))
+        if self.variables:
+            lines += ["", "    .bss", "    .align 8"]
+            for name in self.variables:
+                lines.append(f"    .globl {VAR_PREFIX}{name}")
+                lines.append(f"{VAR_PREFIX}{name}: .zero 8")
+        if self.constants:
+            lines += ["", "    .section .rodata", "    .align 8"]
+            for bits, label in self.constants.items():
+                value = struct.unpack('<d', struct.pack('<q', bits))[0]
+                lines.append(f"{label}: .quad {bits}  # {value!r}")
+        lines += ["", '    .section .note.GNU-stack,"",@progbits']
+        return "\n".join(lines)
+
+
+def is_register(operand):
+    return operand in REGISTER_NAMES
+
+
+def is_memory(operand):
+    return operand.endswith(']')
+
+
+def is_immediate(operand):
+    return not is_register(operand) and not is_memory(operand)
+
+
+REGISTER_NAMES = frozenset(INT_REGISTERS + FLOAT_REGISTERS + ['rax', 'eax', 'rdx', 'r11', 'rbp', 'rsp', 'xmm0', 'xmm1'])
+
+
+def live_intervals(ir):
+    # First and last instruction index at which each name is read or written
+    start = {}
+    end = {}
+    for i, (op, dst, a, b) in enumerate(ir.instructions()):
+        if op == DECLARE:
+            continue
+        operands = (a, dst) if op == COPY else (a, b, dst)
+        for name in operands:
+            if name >= 0:
+                if name not in start:
+                    start[name] = i
+                end[name] = i
+    return start, end
+
+
+def linear_scan(names, start, end, registers):
+    # Poletto and Sarkar's linear scan: walk intervals by start, free the registers of
+    # intervals that ended, and when none is free spill whichever interval ends last
+    location = {}
+    active = []
+    free = list(registers)
+    for name in sorted(names, key=start.__getitem__):
+        begin = start[name]
+        while active and end[active[0]] < begin:
+            free.append(location[active.pop(0)])
+        if free:
+            free.sort(key=registers.index)
+            location[name] = free.pop(0)
+        else:
+            victim = active[-1]
+            if end[victim] > end[name]:
+                location[name] = location.pop(victim)
+                active.pop()
+            else:
+                continue
+        # Keep `active` ordered by end point
+        k = len(active)
+        while k and end[active[k - 1]] > end[name]:
+            k -= 1
+        active.insert(k, name)
+    return location
+
+
+class CodeGenerator:
+    def __init__(self, ir):
+        self.ir = ir
+        self.code = []
+        self.constants = {}
+        self.comment = None
+        names = ir.names
+        self.is_temp = [n.startswith(TEMP_PREFIX) for n in names]
+        self.is_float = [t == 'float' for t in ir.types]
+        self.variables = [n for n, temp in zip(names, self.is_temp) if not temp]
+
+        start, end = live_intervals(ir)
+        ints = [n for n in start if not self.is_float[n]]
+        floats = [n for n in start if self.is_float[n]]
+        self.location = linear_scan(ints, start, end, INT_REGISTERS)
+        self.location.update(linear_scan(floats, start, end, FLOAT_REGISTERS))
+        # Spilled variables work on their global; spilled temporaries get a stack slot
+        self.saved = [r for r in CALLEE_SAVED if r in self.location.values()]
+        self.spill_slots = 0
+        for name in start:
+            if name not in self.location:
+                if self.is_temp[name]:
+                    self.spill_slots += 1
+                    offset = 8 * (len(self.saved) + self.spill_slots)
+                    self.location[name] = f"qword ptr [rbp - {offset}]"
+                else:
+                    self.location[name] = self.home(name)
+        # Variables read before any assignment start out in memory
+        self.loaded = set()
+
+    def home(self, name):
+        return f"qword ptr [rip + {VAR_PREFIX}{self.ir.names[name]}]"
+
+    def emit(self, op, *operands):
+        self.code.append(Instr(op, *operands, comment=self.comment))
+        self.comment = None
+
+    def float_constant(self, value):
+        # Keyed by bit pattern so 0.0 and -0.0 (and every NaN) keep their own constant
+        bits = struct.unpack('<q', struct.pack('<d', value))[0]
+        label = self.constants.get(bits)
+        if label is None:
+            label = self.constants[bits] = f".LC{len(self.constants)}"
+        return f"qword ptr [rip + {label}]"
+
+    def use(self, operand, as_float):
+        # Where operand's value can be read from, converted at compile time for
+        # constants; variables never assigned yet are loaded from their global first
+        if operand < 0:
+            value = convert(self.ir.consts[-1 - operand], 'float' if as_float else 'int')
+            if as_float:
+                return self.float_constant(value)
+            if IMM32_MIN <= value <= IMM32_MAX:
+                return str(value)
+            self.emit('mov', 'r11', str(value))
+            return 'r11'
+        location = self.location[operand]
+        if not self.is_temp[operand] and operand not in self.loaded and is_register(location):
+            self.emit('movsd' if self.is_float[operand] else 'mov', location, self.home(operand))
+        self.loaded.add(operand)
+        return location
+
+    def assigned(self, dst):
+        # Variables are kept in their globals as well as in registers
+        self.loaded.add(dst)
+        location = self.location[dst]
+        if not self.is_temp[dst] and is_register(location):
+            self.emit('movsd' if self.is_float[dst] else 'mov', self.home(dst), location)
+
+    def store_int(self, dst, register):
+        # Move an int64 result from `register` into dst, converting for float dsts
+        location = self.location[dst]
+        if self.is_float[dst]:
+            if is_register(location):
+                self.emit('cvtsi2sd', location, register)
+            else:
+                self.emit('cvtsi2sd', 'xmm0', register)
+                self.emit('movsd', location, 'xmm0')
+        elif location != register:
+            self.emit('mov', location, register)
+
+    def store_float(self, dst, register):
+        location = self.location[dst]
+        if not self.is_float[dst]:
+            if is_register(location):
+                self.emit('cvttsd2si', location, register)
+            else:
+                self.emit('cvttsd2si', 'rax', register)
+                self.emit('mov', location, 'rax')
+        elif location != register:
+            self.emit('movsd', location, register)
+
+    def copy(self, dst, a):
+        # Constants are converted to dst's type here rather than at run time
+        source_float = self.is_float[dst] if a < 0 else self.ir.operand_type(a) == 'float'
+        src = self.use(a, source_float)
+        location = self.location[dst]
+        if is_memory(src) and is_memory(location) and source_float == self.is_float[dst]:
+            # x86 has no memory-to-memory move
+            scratch = 'xmm0' if source_float else 'rax'
+            self.emit('movsd' if source_float else 'mov', scratch, src)
+            src = scratch
+        if source_float:
+            self.store_float(dst, src)
+        else:
+            self.store_int(dst, src)
+        self.assigned(dst)
+
+    def int_operation(self, op, dst, a, b):
+        location = self.location[dst]
+        # Work in dst's register unless that would overwrite b before it is read
+        work = location if is_register(location) and not self.is_float[dst] else 'rax'
+        if work != 'rax' and b >= 0 and b != a and self.location[b] == work:
+            work = 'rax'
+        if op == DIV:
+            work = 'rax'
+        src = self.use(a, False)
+        if src != work:
+            self.emit('mov', work, src)
+        rhs = self.use(b, False)
+        if op == DIV:
+            if is_immediate(rhs):
+                self.emit('mov', 'r11', rhs)
+                rhs = 'r11'
+            self.emit('cqo')
+            self.emit('idiv', rhs)
+        elif op == MUL and is_immediate(rhs):
+            self.emit('imul', work, work, rhs)
+        else:
+            self.emit(INT_MNEMONICS[op], work, rhs)
+        self.store_int(dst, work)
+
+    def float_operation(self, op, dst, a, b):
+        ir = self.ir
+        location = self.location[dst]
+        work = location if is_register(location) and self.is_float[dst] else 'xmm0'
+        if work != 'xmm0' and b >= 0 and b != a and self.location[b] == work:
+            work = 'xmm0'
+        src = self.use(a, True)
+        if a >= 0 and ir.operand_type(a) != 'float':
+            self.emit('cvtsi2sd', work, src)
+        elif src != work:
+            self.emit('movsd', work, src)
+        rhs = self.use(b, True)
+        if b >= 0 and ir.operand_type(b) != 'float':
+            self.emit('cvtsi2sd', 'xmm1', rhs)
+            rhs = 'xmm1'
+        self.emit(FLOAT_MNEMONICS[op], work, rhs)
+        self.store_float(dst, work)
+
+    def generate(self):
+        ir = self.ir
+        self.emit('push', 'rbp')
+        self.emit('mov', 'rbp', 'rsp')
+        for register in self.saved:
+            self.emit('push', register)
+        frame = 8 * self.spill_slots
+        if (len(self.saved) * 8 + frame) % 16:
+            frame += 8
+        if frame:
+            self.emit('sub', 'rsp', str(frame))
+
+        for i, (op, dst, a, b) in enumerate(ir.instructions()):
+            if op == DECLARE:
+                continue
+            self.comment = ir.format_instruction(i)
+            if op == COPY:
+                self.copy(dst, a)
+            else:
+                if ir.result_type(a, b) == 'float':
+                    self.float_operation(op, dst, a, b)
+                else:
+                    self.int_operation(op, dst, a, b)
+                self.assigned(dst)
+
+        if self.saved:
+            self.emit('lea', 'rsp', f"[rbp - {8 * len(self.saved)}]")
+            for register in reversed(self.saved):
+                self.emit('pop', register)
+        else:
+            self.emit('mov', 'rsp', 'rbp')
+        self.emit('pop', 'rbp')
+        self.emit('xor', 'eax', 'eax')
+        self.emit('ret')
+        registers = sorted({r for r in self.location.values() if is_register(r)})
+        return AsmProgram(self.code, self.variables, self.constants, self.spill_slots, registers)
+
+
+def generate_code(ir, optimize=True):
+    program = CodeGenerator(ir).generate()
+    return peephole.optimize(program) if optimize else program
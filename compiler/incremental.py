@@ -0,0 +1,324 @@
+import threading
+from bisect import bisect_right
+
+from compiler import lexer, parser, semantic_analyzer, intermediate_gen, optimizer, code_generator
+from compiler.ir import IRProgram, DECLARE, ADD, TEMP_PREFIX
+
+
+class Statement:
+    # Cached front-end results for one top-level statement. Tokens and IR do not depend
+    # on where the statement sits; AST positions are absolute for `base`.
+    __slots__ = ('text', 'base', 'tokens', 'node', 'ir')
+
+    def __init__(self, text, base):
+        self.text = text
+        self.base = base
+        self.tokens = None
+        self.node = None
+        self.ir = None
+
+
+def split_statements(code):
+    # Top-level statements end at ';' (the grammar has no strings or comments). Yields
+    # (text, line, column) with leading whitespace dropped from each statement.
+    line = 1
+    line_start = 0
+    pos = 0
+    length = len(code)
+    while pos < length:
+        end = code.find(';', pos)
+        end = length if end == -1 else end + 1
+        start = pos
+        while start < end and code[start] in ' \t\n':
+            start += 1
+        if start < end:
+            line += code.count('\n', pos, start)
+            newline = code.rfind('\n', pos, start)
+            if newline != -1:
+                line_start = newline + 1
+            yield code[start:end], line, start - line_start + 1
+            line += code.count('\n', start, end)
+            newline = code.rfind('\n', start, end)
+            if newline != -1:
+                line_start = newline + 1
+        pos = end
+
+
+def moved_position(node, old, new):
+    # Where a statement at node.line/node.column goes when its base moves from old to new
+    line, column = node.line, node.column
+    if line is None:
+        return line, column
+    if line == old[0]:
+        column += new[1] - old[1]
+    return line + new[0] - old[0], column
+
+
+def move(node, old, new):
+    # Move a freshly built statement from base `old` to base `new` in place; only for
+    # nodes nothing else references yet. Occurrence positions are relative to the
+    # statement, so only its own position changes.
+    node.line, node.column = moved_position(node, old, new)
+
+
+def rebase(node, old, new):
+    # The statement moved from base `old` to base `new`. Cached statements are also
+    # part of earlier compiles' ASTs, so the result is a new Declare sharing the
+    # expression and its relative positions; the cached one is never changed.
+    return node.moved(*moved_position(node, old, new))
+
+
+class MergedTokens:
+    # Read-only view over the statements' token buffers as one token sequence
+    def __init__(self, statements):
+        self.buffers = [s.tokens for s in statements]
+        self.bases = [s.base for s in statements]
+        self.offsets = []
+        total = 0
+        for buffer in self.buffers:
+            self.offsets.append(total)
+            total += len(buffer) - 1
+        self.length = total + 1
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self.length
+        if i == self.length - 1:
+            return ('EOF', None)
+        k = bisect_right(self.offsets, i) - 1
+        return self.buffers[k][i - self.offsets[k]]
+
+    def position(self, i):
+        # Absolute line and column; EOF sits where the last statement's buffer ends
+        if i < 0:
+            i += self.length
+        if not self.buffers:
+            return 1, 1
+        k = min(bisect_right(self.offsets, i), len(self.buffers)) - 1
+        return absolute(self.bases[k], *self.buffers[k].position(i - self.offsets[k]))
+
+    def __iter__(self):
+        for buffer in self.buffers:
+            for i in range(len(buffer) - 1):
+                yield buffer[i]
+        yield ('EOF', None)
+
+
+def merge_ir(statements):
+    # Concatenate per-statement IR, renumbering temporaries in program order. Temp types
+    # are recomputed because a statement is lowered without knowing other declarations.
+    return IRMerger().merge(statements)
+
+
+class IRMerger:
+    # merge_ir that remembers the merged program's state before each statement, so the
+    # next merge copies the IR of the unchanged leading statements instead of renumbering
+    # it again. Only the statements from the first changed one on are merged anew.
+    def __init__(self):
+        self.program = None
+        self.fragments = []
+        # (instructions, names, constants, temps, retyped) before each statement and at the end
+        self.checkpoints = [(0, 0, 0, 0, 0)]
+        # (name id, previous type) for each declaration that changed a name's type
+        self.retyped = []
+
+    def merge(self, statements):
+        fragments = [statement.ir for statement in statements]
+        old = self.fragments
+        k = 0
+        limit = min(len(fragments), len(old))
+        while k < limit and fragments[k] is old[k]:
+            k += 1
+        merged = self.restore(k)
+        checkpoints = self.checkpoints
+        del checkpoints[k:]
+        for fragment in fragments[k:]:
+            checkpoints.append(self.checkpoint(merged))
+            self.append(merged, fragment)
+        checkpoints.append(self.checkpoint(merged))
+        self.program = merged
+        self.fragments = fragments
+        return merged
+
+    def checkpoint(self, merged):
+        return len(merged.ops), len(merged.names), len(merged.consts), merged.temp_count, len(self.retyped)
+
+    def restore(self, k):
+        # A new program holding the merged IR of the first k statements. The previous
+        # program is part of an earlier compile's results and is left as it is.
+        if self.program is None or k == 0:
+            del self.retyped[:]
+            return IRProgram()
+        length, names, consts, temps, retyped = self.checkpoints[k]
+        merged = self.program.prefix(length, names, consts)
+        merged.temp_count = temps
+        types = merged.types
+        for index, previous in reversed(self.retyped[retyped:]):
+            if index < names:
+                types[index] = previous
+        del self.retyped[retyped:]
+        return merged
+
+    def append(self, merged, fragment):
+        ops, dsts, lhs, rhs = merged.ops.append, merged.dsts.append, merged.lhs.append, merged.rhs.append
+        name, const, new_temp, result_type = merged.name, merged.const, merged.new_temp, merged.result_type
+        names, consts = fragment.names, fragment.consts
+        mapping = [None] * len(names)
+        for op, dst, a, b in fragment.instructions():
+            if op == DECLARE:
+                declared = names[dst]
+                index = merged.lookup(declared)
+                if index is not None and merged.types[index] != fragment.types[dst]:
+                    self.retyped.append((index, merged.types[index]))
+                target = mapping[dst] = name(declared, fragment.types[dst])
+                a = b = 0
+            else:
+                if a < 0:
+                    a = const(consts[-1 - a])
+                else:
+                    a = mapping[a] if mapping[a] is not None else name(names[a])
+                if op >= ADD:
+                    if b < 0:
+                        b = const(consts[-1 - b])
+                    else:
+                        b = mapping[b] if mapping[b] is not None else name(names[b])
+                if names[dst].startswith(TEMP_PREFIX):
+                    target = mapping[dst] = new_temp(result_type(a, b))
+                else:
+                    target = mapping[dst] if mapping[dst] is not None else name(names[dst])
+            ops(op)
+            dsts(target)
+            lhs(a)
+            rhs(b)
+
+
+class IncrementalCompiler:
+    # Keeps each top-level statement's tokens, AST node and IR under its text, so a
+    # recompile only lexes, parses and lowers the statements that changed. Semantic
+    # checks and the IR merge resume after the longest run of leading statements that
+    # is unchanged since the last compile, so their cost follows the edit's position.
+    # Optimization and code generation always run over the whole merged program: the
+    # optimizer propagates constants across statements and registers are allocated
+    # globally, so on large files those two phases dominate a recompile.
+    def __init__(self):
+        self.cache = {}
+        self.lock = threading.Lock()
+        self.stats = {'statements': 0, 'reused': 0, 'compiled': 0}
+        self.checker = semantic_analyzer.SemanticChecker()
+        # Statements the checker has seen, in order, and its state before each one
+        self.checked = []
+        self.marks = []
+        self.merger = IRMerger()
+
+    def statements(self, code):
+        cache = self.cache
+        fresh = {}
+        result = []
+        reused = 0
+        for text, line, column in split_statements(code):
+            # Identical statements are cached separately so each keeps its own positions
+            key = text
+            occurrence = 0
+            while key in fresh:
+                occurrence += 1
+                key = (text, occurrence)
+            statement = cache.get(key)
+            if statement is None:
+                statement = Statement(text, (line, column))
+            else:
+                reused += 1
+                if statement.base != (line, column):
+                    # Earlier results still hold the old node, so the cached statement is
+                    # replaced by a copy at the new position rather than moved
+                    moved = Statement(text, (line, column))
+                    moved.tokens = statement.tokens
+                    moved.ir = statement.ir
+                    if statement.node is not None:
+                        moved.node = rebase(statement.node, statement.base, (line, column))
+                    statement = moved
+            fresh[key] = statement
+            result.append(statement)
+        self.cache = fresh
+        self.stats = {'statements': len(result), 'reused': reused, 'compiled': len(result) - reused}
+        return result
+
+    def iter_phases(self, code):
+        # The lock guards the statement cache but is never held across a yield, so a
+        # consumer that stops early (or never resumes) does not block the next compile
+        with self.lock:
+            statements = self.statements(code)
+
+            for statement in statements:
+                if statement.tokens is None:
+                    try:
+                        statement.tokens = lexer.tokenize_compact(statement.text)
+                    except lexer.LexError as e:
+                        line, column = absolute(statement.base, e.line, e.column)
+                        raise lexer.LexError(e.value, line, column) from None
+            tokens = MergedTokens(statements)
+        yield "tokens", tokens
+
+        with self.lock:
+            for statement in statements:
+                if statement.node is None:
+                    statement.node = parse_statement(statement)
+            ast = [statement.node for statement in statements]
+        yield "ast", ast
+
+        with self.lock:
+            semantics = self.analyze(ast)
+        yield "semantics", semantics
+
+        with self.lock:
+            for statement in statements:
+                if statement.ir is None:
+                    statement.ir = intermediate_gen.generate_ir([statement.node])
+            ir = self.merger.merge(statements)
+        yield "ir", ir
+
+        opt_ir = optimizer.optimize(ir)
+        yield "optimized", opt_ir
+
+        yield "target", code_generator.generate_code(opt_ir)
+
+    def analyze(self, ast):
+        # semantic_analyzer.analyze, resumed after the leading statements checked last time
+        checker, checked, marks = self.checker, self.checked, self.marks
+        k = 0
+        limit = min(len(ast), len(checked))
+        while k < limit and ast[k] is checked[k]:
+            k += 1
+        if k < len(checked):
+            checker.rollback(marks[k])
+            del checked[k:]
+            del marks[k:]
+        for node in ast[k:]:
+            marks.append(checker.mark())
+            checker.visit(node)
+            checked.append(node)
+        return semantic_analyzer.SemanticResult(list(checker.diagnostics), len(checker.symbols.names))
+
+    def compile(self, code):
+        return dict(self.iter_phases(code))
+
+
+def absolute(base, line, column):
+    if line == 1:
+        return base[0], base[1] + column - 1
+    return base[0] + line - 1, column
+
+
+def parse_statement(statement):
+    try:
+        node = parser.Parser(statement.tokens).parse()[0]
+    except SyntaxError as e:
+        if e.lineno is None:
+            raise
+        line, column = absolute(statement.base, e.lineno, e.offset)
+        raise SyntaxError(e.msg, (None, line, column, None)) from None
+    move(node, (1, 1), statement.base)
+    return node
+
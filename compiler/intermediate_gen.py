@@ -1,10 +1,71 @@
+from compiler.ast_nodes import NodeVisitor, BinOp
+from compiler.ir import IRProgram, DECLARE, COPY, BINARY_OPCODES
+
+
+class IRGenerator(NodeVisitor):
+    # Lower the AST to three-address code, flattening expressions into temporaries
+    def __init__(self):
+        self.program = IRProgram()
+        # Temporary holding each subexpression already lowered in the current statement,
+        # keyed by the parser's value number, so a repeated subexpression is reused with
+        # a dict lookup instead of being recomputed. Only temporaries are recorded and
+        # the table is emptied at every statement: nothing is assigned within one, so a
+        # temporary's value and type cannot change while it is in the table.
+        self.values = {}
+
+    def visit_Declare(self, node):
+        program = self.program
+        self.values.clear()
+        dst = program.name(node.name, node.type_name)
+        program.emit(DECLARE, dst)
+        if isinstance(node.expr, BinOp):
+            # The outermost operation writes straight into the variable
+            self.lower(node.expr, dst)
+        else:
+            program.emit(COPY, dst, self.visit(node.expr))
+
+    def visit_BinOp(self, node):
+        return self.lower(node)
+
+    def lower(self, expr, dst=None):
+        # Post-order walk with an explicit stack, so arbitrarily deep expressions lower
+        # without recursion; left subtrees are emitted first, as a recursive walk would
+        program = self.program
+        values = self.values
+        operands = []
+        stack = [(expr, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if node.__class__ is not BinOp:
+                operands.append(self.visit(node))
+            elif node.nid in values:
+                operands.append(values[node.nid])
+            elif not expanded:
+                stack.append((node, True))
+                stack.append((node.right, False))
+                stack.append((node.left, False))
+            else:
+                b = operands.pop()
+                a = operands.pop()
+                if node is expr and dst is not None:
+                    target = dst
+                else:
+                    target = program.new_temp(program.result_type(a, b))
+                    if node.nid is not None:
+                        values[node.nid] = target
+                program.emit(BINARY_OPCODES[node.op], target, a, b)
+                operands.append(target)
+        return operands[0]
+
+    def visit_Num(self, node):
+        return self.program.const(node.value)
+
+    def visit_Var(self, node):
+        return self.program.name(node.name)
+
+
 def generate_ir(ast):
-    # Generate a very basic IR representation as strings
-    ir_code = []
+    generator = IRGenerator()
     for node in ast:
-        if node[0] == 'declare':
-            var_name = node[1]
-            expr = node[2]
-            ir_code.append(f"DECLARE {var_name}")
-            ir_code.append(f"ASSIGN {var_name} {expr}")
-    return "\n".join(ir_code)
+        generator.visit(node)
+    return generator.program
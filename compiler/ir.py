@@ -0,0 +1,160 @@
+import math
+from array import array
+from itertools import islice
+
+# Three-address code. Every instruction is (opcode, dst, a, b) stored in parallel arrays;
+# the result of an instruction is converted to the type of its dst.
+DECLARE, COPY, ADD, SUB, MUL, DIV = range(6)
+OPCODE_NAMES = ['DECLARE', 'COPY', 'ADD', 'SUB', 'MUL', 'DIV']
+BINARY_OPCODES = {'+': ADD, '-': SUB, '*': MUL, '/': DIV}
+OPERATOR_SYMBOLS = {ADD: '+', SUB: '-', MUL: '*', DIV: '/'}
+
+# Temporaries get a prefix that cannot appear in a source identifier
+TEMP_PREFIX = '%t'
+
+
+def is_const(operand):
+    # Operands >= 0 index the name table, negative operands index the constant table
+    return operand < 0
+
+
+def const_operand(index):
+    return -1 - index
+
+
+def const_index(operand):
+    return -1 - operand
+
+
+def const_key(value):
+    # 1 and 1.0 compare equal, so the type is part of the key; so are 0.0 and -0.0,
+    # so a float's sign is too
+    if value.__class__ is float:
+        return (float, value, math.copysign(1.0, value))
+    return (value.__class__, value)
+
+
+class IRProgram:
+    __slots__ = ('ops', 'dsts', 'lhs', 'rhs', 'names', 'types', 'consts',
+                 '_name_ids', '_const_ids', 'temp_count', 'pass_stats')
+
+    def __init__(self):
+        self.ops = array('B')
+        self.dsts = array('i')
+        self.lhs = array('i')
+        self.rhs = array('i')
+        self.names = []
+        self.types = []
+        self.consts = []
+        self._name_ids = {}
+        self._const_ids = {}
+        self.temp_count = 0
+        self.pass_stats = None
+
+    def __len__(self):
+        return len(self.ops)
+
+    def name(self, name, type_name=None):
+        # Intern a variable name; a declaration fixes its type, uses default to int
+        index = self._name_ids.get(name)
+        if index is None:
+            index = self._name_ids[name] = len(self.names)
+            self.names.append(name)
+            self.types.append(type_name or 'int')
+        elif type_name is not None:
+            self.types[index] = type_name
+        return index
+
+    def lookup(self, name):
+        return self._name_ids.get(name)
+
+    def const(self, value):
+        key = const_key(value)
+        index = self._const_ids.get(key)
+        if index is None:
+            index = self._const_ids[key] = len(self.consts)
+            self.consts.append(value)
+        return const_operand(index)
+
+    def new_temp(self, type_name):
+        index = len(self.names)
+        name = f"{TEMP_PREFIX}{self.temp_count}"
+        self.temp_count += 1
+        self._name_ids[name] = index
+        self.names.append(name)
+        self.types.append(type_name)
+        return index
+
+    def is_temp(self, operand):
+        return operand >= 0 and self.names[operand].startswith(TEMP_PREFIX)
+
+    def operand_type(self, operand):
+        if operand < 0:
+            return 'float' if isinstance(self.consts[-1 - operand], float) else 'int'
+        return self.types[operand]
+
+    def result_type(self, a, b):
+        # Arithmetic is done in float if either side is float
+        if self.operand_type(a) == 'float' or self.operand_type(b) == 'float':
+            return 'float'
+        return 'int'
+
+    def emit(self, op, dst, a=0, b=0):
+        self.ops.append(op)
+        self.dsts.append(dst)
+        self.lhs.append(a)
+        self.rhs.append(b)
+
+    def instructions(self):
+        return zip(self.ops, self.dsts, self.lhs, self.rhs)
+
+    def derive(self):
+        # Empty program sharing this program's name and constant tables, for passes
+        # that rewrite the instruction stream
+        program = IRProgram.__new__(IRProgram)
+        program.ops = array('B')
+        program.dsts = array('i')
+        program.lhs = array('i')
+        program.rhs = array('i')
+        program.names = self.names
+        program.types = self.types
+        program.consts = self.consts
+        program._name_ids = self._name_ids
+        program._const_ids = self._const_ids
+        program.temp_count = self.temp_count
+        program.pass_stats = None
+        return program
+
+    def prefix(self, length, names, consts):
+        # Copy of the first `length` instructions with the first `names` names and
+        # `consts` constants. Both id tables are in index order, so their first entries
+        # are exactly the ids of the kept names and constants.
+        program = IRProgram()
+        program.ops = self.ops[:length]
+        program.dsts = self.dsts[:length]
+        program.lhs = self.lhs[:length]
+        program.rhs = self.rhs[:length]
+        program.names = self.names[:names]
+        program.types = self.types[:names]
+        program.consts = self.consts[:consts]
+        program._name_ids = dict(islice(self._name_ids.items(), names))
+        program._const_ids = dict(islice(self._const_ids.items(), consts))
+        return program
+
+    def operand_text(self, operand):
+        if operand < 0:
+            return repr(self.consts[-1 - operand])
+        return self.names[operand]
+
+    def format_instruction(self, i):
+        op = self.ops[i]
+        dst = self.names[self.dsts[i]]
+        if op == DECLARE:
+            return f"DECLARE {self.types[self.dsts[i]]} {dst}"
+        if op == COPY:
+            return f"{dst} = {self.operand_text(self.lhs[i])}"
+        return (f"{dst} = {self.operand_text(self.lhs[i])} "
+                f"{OPERATOR_SYMBOLS[op]} {self.operand_text(self.rhs[i])}")
+
+    def __str__(self):
+        return "\n".join(self.format_instruction(i) for i in range(len(self.ops)))
@@ -0,0 +1,389 @@
+import mmap
+import struct
+import sys
+from array import array
+
+from compiler import ast_nodes
+from compiler.ast_nodes import Node
+from compiler.ir import BINARY_OPCODES, IRProgram, OPCODE_NAMES, const_key
+
+# Binary files for the AST and IR phases, so another process can pick up a program at
+# the optimizer or code generator without running the front end again. Little-endian:
+#
+#   header    magic, format version, phase code, section count, extra word
+#   sections  (offset, count) per section; every section starts 8-byte aligned
+#   strings   count + 1 uint32 offsets into the UTF-8 blob that follows them
+#   AST:  nodes      fixed-width records in post order, children as earlier record indexes;
+#                    shared subexpressions are one record
+#         roots      uint32 index of each top-level statement's node
+#         spans      uint32 start of each statement's occurrence positions, plus the end
+#         positions  int32 (line, column) pairs, relative to their statement
+#   IR:   names   (name, type) string ids
+#         consts  tagged 64-bit values
+#         code    (op, dst, a, b) int32 records
+#
+# The IR's extra word is its temp count. Loading maps the file and reads it in place:
+# the IR instruction columns are strided views of the mapping, not copies.
+
+MAGIC = b'MCIR'
+# Bumped whenever the layout changes; older files are rejected, not misread
+FORMAT_VERSION = 2
+
+PHASE_CODES = {"ast": 1, "ir": 2, "optimized": 3}
+PHASE_NAMES = {code: phase for phase, code in PHASE_CODES.items()}
+
+HEADER = struct.Struct('<4sHHIQ')
+SECTION = struct.Struct('<QQ')
+NAME = struct.Struct('<II')
+CONST = struct.Struct('<B7xq')
+# Node record: class name id, line, column (0 when unknown), a tag per field, a value per field
+MAX_FIELDS = 3
+NODE = struct.Struct('<IiiBBBxqqq')
+INSTRUCTION = struct.Struct('<iiii')
+
+# Value tags. Floats are stored as their bit pattern; ints outside int64 as decimal text.
+NONE, NODE_REF, STRING, INT, FLOAT, BIG_INT = range(6)
+
+INT64_MIN, INT64_MAX = -2 ** 63, 2 ** 63 - 1
+# Types a name in a loaded IR or AST file may have
+IR_TYPES = ('int', 'float')
+# Node classes an AST file may contain, by the name stored in its records
+AST_CLASSES = {cls.__name__: cls for cls in (ast_nodes.Declare, ast_nodes.BinOp, ast_nodes.Num, ast_nodes.Var)}
+EXPRESSION_CLASSES = (ast_nodes.BinOp, ast_nodes.Num, ast_nodes.Var)
+FLOAT_BITS = struct.Struct('<d')
+BITS = struct.Struct('<q')
+
+
+class FormatError(RuntimeError):
+    pass
+
+
+class StringTable:
+    def __init__(self):
+        self.strings = []
+        self.ids = {}
+
+    def intern(self, text):
+        index = self.ids.get(text)
+        if index is None:
+            index = self.ids[text] = len(self.strings)
+            self.strings.append(text)
+        return index
+
+    def pack(self):
+        blob = [s.encode('utf-8') for s in self.strings]
+        offsets = array('I', [0])
+        for data in blob:
+            offsets.append(offsets[-1] + len(data))
+        return to_little(offsets) + b''.join(blob)
+
+
+def to_little(values):
+    if sys.byteorder != 'little':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def encode_value(value, strings, index):
+    if value is None:
+        return NONE, 0
+    if isinstance(value, Node):
+        return NODE_REF, index[id(value)]
+    if isinstance(value, str):
+        return STRING, strings.intern(value)
+    if isinstance(value, float):
+        return FLOAT, BITS.unpack(FLOAT_BITS.pack(value))[0]
+    if isinstance(value, int):
+        if INT64_MIN <= value <= INT64_MAX:
+            return INT, value
+        return BIG_INT, strings.intern(str(value))
+    raise FormatError(f"cannot store {type(value).__name__} value {value!r}")
+
+
+def decode_value(tag, raw, strings, nodes):
+    if tag == NODE_REF:
+        # Post order: a child is always an earlier record
+        if not 0 <= raw < len(nodes):
+            raise FormatError(f"node reference {raw} does not point at an earlier node")
+        return nodes[raw]
+    if tag == STRING:
+        return strings[raw]
+    if tag == INT:
+        return raw
+    if tag == FLOAT:
+        return FLOAT_BITS.unpack(BITS.pack(raw))[0]
+    if tag == BIG_INT:
+        return int(strings[raw])
+    if tag == NONE:
+        return None
+    raise FormatError(f"unknown value tag {tag}")
+
+
+def pack_ast(statements, strings):
+    # Post-order walk over every statement with one shared index, so a node reachable
+    # from several places is written once
+    records = []
+    index = {}
+    for root in statements:
+        stack = [(root, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if id(node) in index:
+                continue
+            if not expanded:
+                stack.append((node, True))
+                # Left child first, the order the parser builds nodes in
+                stack.extend((child, False) for child in reversed(list(node.children())))
+                continue
+            fields = node._fields
+            if len(fields) > MAX_FIELDS:
+                raise FormatError(f"{node.__class__.__name__} has more than {MAX_FIELDS} fields")
+            tags = [NONE] * MAX_FIELDS
+            raws = [0] * MAX_FIELDS
+            for i, name in enumerate(fields):
+                tags[i], raws[i] = encode_value(getattr(node, name), strings, index)
+            index[id(node)] = len(records)
+            records.append(NODE.pack(strings.intern(node.__class__.__name__),
+                                     node.line or 0, node.column or 0, *tags, *raws))
+    roots = array('I', (index[id(root)] for root in statements))
+    # A statement without positions gets an empty span; every expression has at least
+    # one occurrence, so an empty span cannot be a real table
+    spans = array('I', [0])
+    positions = array('i')
+    for root in statements:
+        table = getattr(root, 'positions', None)
+        if table is not None:
+            positions.extend(table)
+        spans.append(len(positions))
+    sections = [b''.join(records), to_little(roots), to_little(spans), to_little(positions)]
+    return sections, [len(records), len(roots), len(spans), len(positions)], 0
+
+
+def pack_ir(program, strings):
+    names = b''.join(NAME.pack(strings.intern(name), strings.intern(type_name or 'int'))
+                     for name, type_name in zip(program.names, program.types))
+    consts = []
+    for value in program.consts:
+        tag, raw = encode_value(value, strings, None)
+        consts.append(CONST.pack(tag, raw))
+    code = array('i')
+    for instruction in program.instructions():
+        code.extend(instruction)
+    sections = [names, b''.join(consts), to_little(code)]
+    return sections, [len(program.names), len(program.consts), len(program)], program.temp_count
+
+
+def dumps(phase, value):
+    if phase not in PHASE_CODES:
+        raise FormatError(f"phase {phase!r} has no binary format (expected one of {', '.join(PHASE_CODES)})")
+    strings = StringTable()
+    if phase == "ast":
+        sections, counts, extra = pack_ast(value, strings)
+    else:
+        sections, counts, extra = pack_ir(value, strings)
+    # The string table is packed last, once every section has interned its strings
+    sections.insert(0, strings.pack())
+    counts.insert(0, len(strings.strings))
+
+    out = bytearray(HEADER.pack(MAGIC, FORMAT_VERSION, PHASE_CODES[phase], len(sections), extra))
+    directory = len(out)
+    out += bytes(SECTION.size * len(sections))
+    for i, (data, count) in enumerate(zip(sections, counts)):
+        out += bytes(-len(out) % 8)
+        SECTION.pack_into(out, directory + i * SECTION.size, len(out), count)
+        out += data
+    return bytes(out)
+
+
+def save(path, phase, value):
+    with open(path, 'wb') as f:
+        f.write(dumps(phase, value))
+
+
+def read_sections(view):
+    if len(view) < HEADER.size:
+        raise FormatError("file is too short for a header")
+    magic, version, code, count, extra = HEADER.unpack_from(view)
+    if magic != MAGIC:
+        raise FormatError("not a compiler phase file (bad magic)")
+    if version != FORMAT_VERSION:
+        raise FormatError(f"format version {version} is not supported (expected {FORMAT_VERSION})")
+    phase = PHASE_NAMES.get(code)
+    if phase is None:
+        raise FormatError(f"unknown phase code {code}")
+    expected = 5 if phase == "ast" else 4
+    if count != expected:
+        raise FormatError(f"{phase} file has {count} sections, expected {expected}")
+    if len(view) < HEADER.size + count * SECTION.size:
+        raise FormatError("file is truncated in the section table")
+    sections = [SECTION.unpack_from(view, HEADER.size + i * SECTION.size) for i in range(count)]
+    return phase, sections, extra
+
+
+def section(view, offset, size, align=8):
+    if offset % align or offset + size > len(view):
+        raise FormatError(f"section at offset {offset} is misaligned or runs past the end of the file")
+    return view[offset:offset + size]
+
+
+def read_array(typecode, data):
+    # Copying reader for the small index tables (and for big-endian hosts)
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values
+
+
+def read_strings(view, offset, count):
+    table = section(view, offset, 4 * (count + 1))
+    offsets = read_array('I', table)
+    blob = section(view, offset + len(table), offsets[-1], align=1)
+    return [str(blob[offsets[i]:offsets[i + 1]], 'utf-8') for i in range(count)]
+
+
+def read_ast(view, sections, strings):
+    (nodes_offset, node_count), (roots_offset, root_count), (spans_offset, span_count), \
+        (positions_offset, position_count) = sections
+    nodes = []
+    append = nodes.append
+    classes = {}
+    # Expression nodes go through a NodeFactory, so the loaded program is one DAG again
+    # and its nids are the ones the parser gave it: records are in the same post order
+    intern = ast_nodes.NodeFactory().intern
+    for record in NODE.iter_unpack(section(view, nodes_offset, node_count * NODE.size)):
+        name_id = record[0]
+        cls = classes.get(name_id)
+        if cls is None:
+            cls = AST_CLASSES.get(strings[name_id])
+            if cls is None:
+                raise FormatError(f"unknown node class {strings[name_id]!r}")
+            classes[name_id] = cls
+        values = []
+        # Tags are record[3:6] and values record[6:9]; child links and names are
+        # resolved inline, everything else through decode_value
+        for i in range(3, 3 + len(cls._fields)):
+            tag, raw = record[i], record[i + MAX_FIELDS]
+            if tag == NODE_REF and 0 <= raw < len(nodes):
+                values.append(nodes[raw])
+            elif tag == STRING:
+                values.append(strings[raw])
+            else:
+                values.append(decode_value(tag, raw, strings, nodes))
+        check_node(cls, values, len(nodes))
+        if cls._extra:
+            append(cls(*values, line=record[1] or None, column=record[2] or None))
+        else:
+            append(intern(cls(*values)))
+    roots = [nodes[i] for i in read_array('I', section(view, roots_offset, 4 * root_count))]
+    for root in roots:
+        if root.__class__ is not ast_nodes.Declare:
+            raise FormatError(f"top-level node is a {root.__class__.__name__}, expected a Declare")
+    spans = read_array('I', section(view, spans_offset, 4 * span_count))
+    positions = read_array('i', section(view, positions_offset, 4 * position_count))
+    if len(spans) != len(roots) + 1:
+        raise FormatError(f"{len(spans)} position spans for {len(roots)} statements")
+    for i, root in enumerate(roots):
+        start, end = spans[i], spans[i + 1]
+        if start != end and hasattr(root, 'positions'):
+            root.positions = positions[start:end]
+    return roots
+
+
+def check_node(cls, values, index):
+    # Field checks for one AST record, so a bad file fails here rather than as a
+    # TypeError or KeyError in the semantic checker or IR generator
+    if cls is ast_nodes.BinOp:
+        op, *children = values
+        if op.__class__ is not str or op not in BINARY_OPCODES:
+            raise FormatError(f"node {index}: unknown operator {op!r}")
+    elif cls is ast_nodes.Num:
+        (value,) = values
+        if value.__class__ not in (int, float):
+            raise FormatError(f"node {index}: number has a {type(value).__name__} value")
+        children = ()
+    elif cls is ast_nodes.Var:
+        (name,) = values
+        if name.__class__ is not str:
+            raise FormatError(f"node {index}: variable name is a {type(name).__name__}")
+        children = ()
+    else:
+        type_name, name, *children = values
+        if type_name.__class__ is not str or type_name not in IR_TYPES:
+            raise FormatError(f"node {index}: unknown type {type_name!r}")
+        if name.__class__ is not str:
+            raise FormatError(f"node {index}: declared name is a {type(name).__name__}")
+    for child in children:
+        if not isinstance(child, EXPRESSION_CLASSES):
+            raise FormatError(f"node {index}: child is a {type(child).__name__}, expected an expression")
+
+
+def read_ir(view, sections, strings, temp_count):
+    (names_offset, name_count), (consts_offset, const_count), (code_offset, length) = sections
+    program = IRProgram()
+    for name_id, type_id in NAME.iter_unpack(section(view, names_offset, name_count * NAME.size)):
+        type_name = strings[type_id]
+        if type_name not in IR_TYPES:
+            raise FormatError(f"unknown type {type_name!r} for {strings[name_id]!r}")
+        program._name_ids[strings[name_id]] = len(program.names)
+        program.names.append(strings[name_id])
+        program.types.append(type_name)
+    for tag, raw in CONST.iter_unpack(section(view, consts_offset, const_count * CONST.size)):
+        if tag not in (INT, FLOAT, BIG_INT):
+            raise FormatError(f"constant {len(program.consts)} has value tag {tag}, expected a number")
+        value = decode_value(tag, raw, strings, None)
+        program._const_ids[const_key(value)] = len(program.consts)
+        program.consts.append(value)
+    program.temp_count = temp_count
+
+    code = section(view, code_offset, length * INSTRUCTION.size)
+    if sys.byteorder == 'little':
+        # Zero-copy: each column is every fourth int32 of the mapped records
+        code = code.cast('i')
+    else:
+        code = read_array('i', code)
+    program.ops, program.dsts, program.lhs, program.rhs = code[0::4], code[1::4], code[2::4], code[3::4]
+    check_instructions(program)
+    return program
+
+
+def check_instructions(program):
+    # Bounds are checked once per column with min/max, so a bad file fails here rather
+    # than as an IndexError deep in the optimizer, VM or code generator. Unused operands
+    # are 0, which is in range whenever there is an instruction (it has a dst name).
+    if not len(program.ops):
+        return
+    if min(program.ops) < 0 or max(program.ops) >= len(OPCODE_NAMES):
+        bad = next(op for op in program.ops if not 0 <= op < len(OPCODE_NAMES))
+        raise FormatError(f"unknown opcode {bad}")
+    names, consts = len(program.names), len(program.consts)
+    if min(program.dsts) < 0 or max(program.dsts) >= names:
+        raise FormatError(f"instruction destination outside the {names} names")
+    for column in (program.lhs, program.rhs):
+        if min(column) < -consts or max(column) >= names:
+            raise FormatError(f"instruction operand outside the {names} names and {consts} constants")
+
+
+def loads(buffer):
+    # (phase, value) from any buffer: bytes, a bytearray or a memory map
+    view = memoryview(buffer)
+    phase, sections, extra = read_sections(view)
+    (strings_offset, string_count), *rest = sections
+    try:
+        strings = read_strings(view, strings_offset, string_count)
+        if phase == "ast":
+            return phase, read_ast(view, rest, strings)
+        return phase, read_ir(view, rest, strings, extra)
+    except (IndexError, KeyError, ValueError, struct.error) as e:
+        raise FormatError(f"corrupt {phase} file: {e}") from None
+
+
+def load(path):
+    # The mapping stays open for as long as the loaded IR's instruction views are alive
+    with open(path, 'rb') as f:
+        try:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            raise FormatError(f"{path} is empty") from None
+    return loads(mapped)
@@ -1,4 +1,7 @@
 import re
+from collections import namedtuple
+
+from compiler.token_buffer import TokenBuffer, KIND_CODES
 
 token_specification = [
     ('NUMBER',   r'\d+'),
@@ -17,7 +20,81 @@ token_specification = [
 token_regex = '|'.join(f'(?P<{name}>{pattern})' for name, pattern in token_specification)
 keywords = {"int", "float"}
 
+# Tokens from the streaming lexer; kind and value stay at [0] and [1] like the plain tuples
+Token = namedtuple('Token', ['kind', 'value', 'line', 'column'])
+
+
+class LexError(RuntimeError):
+    def __init__(self, value, line, column):
+        super().__init__(f'Unexpected character {value!r} (line {line}, column {column})')
+        self.value = value
+        self.line = line
+        self.column = column
+
+    def __reduce__(self):
+        # Rebuilt from its fields so it survives the trip back from a worker process
+        return LexError, (self.value, self.line, self.column)
+
+
+def position(code, offset):
+    # 1-based line and column of a source offset
+    line = code.count('\n', 0, offset) + 1
+    return line, offset - (code.rfind('\n', 0, offset) + 1) + 1
+
+
+# Fast engine: one lexeme per match with whitespace skipped by the regex itself, then
+# a dict lookup on the whole lexeme (punctuation and keywords) or on its first character.
+# It accepts exactly the same language as token_specification.
+scan_regex = re.compile(r'\d+|[A-Za-z_]\w*|[^ \t\n]')
+punctuation = {
+    '=': 'ASSIGN', ';': 'SEMI',
+    '+': 'OP', '-': 'OP', '*': 'OP', '/': 'OP',
+    '(': 'LPAREN', ')': 'RPAREN',
+}
+identifier_start = frozenset('ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz_')
+
+
+def dispatch_table():
+    # Shared (kind, value) tuples for every fixed lexeme; the lexers add identifiers
+    # and numbers as they meet them, so repeated lexemes are classified once
+    table = {lexeme: (kind, lexeme) for lexeme, kind in punctuation.items()}
+    table.update((word, ('TYPE', word)) for word in keywords)
+    return table
+
+
+def classify(lexeme):
+    first = lexeme[0]
+    if first in identifier_start:
+        return 'ID'
+    if first.isdecimal():
+        return 'NUMBER'
+    return None
+
+
 def tokenize(code):
+    table = dispatch_table()
+    lookup = table.get
+    tokens = []
+    append = tokens.append
+    for lexeme in scan_regex.findall(code):
+        token = lookup(lexeme)
+        if token is None:
+            kind = classify(lexeme)
+            if kind == 'ID':
+                token = ('ID', lexeme)
+            elif kind == 'NUMBER':
+                token = ('NUMBER', int(lexeme))
+            else:
+                # Let the reference lexer raise, so the error carries a position
+                return tokenize_regex(code)
+            table[lexeme] = token
+        append(token)
+    append(('EOF', None))
+    return tokens
+
+
+def tokenize_regex(code):
+    # Reference lexer over token_specification; tokenize must match it exactly
     tokens = []
     for mo in re.finditer(token_regex, code):
         kind = mo.lastgroup
@@ -29,7 +106,53 @@ def tokenize(code):
         elif kind in ['SKIP', 'NEWLINE']:
             continue
         elif kind == 'MISMATCH':
-            raise RuntimeError(f'Unexpected character {value!r}')
+            raise LexError(value, *position(code, mo.start()))
         tokens.append((kind, value))
     tokens.append(('EOF', None))
     return tokens
+
+
+def iter_tokens(code):
+    # Streaming mode: yield positioned tokens one at a time instead of building a list
+    line = 1
+    line_start = 0
+    for mo in re.finditer(token_regex, code):
+        kind = mo.lastgroup
+        if kind == 'SKIP':
+            continue
+        if kind == 'NEWLINE':
+            line += 1
+            line_start = mo.end()
+            continue
+        value = mo.group()
+        column = mo.start() - line_start + 1
+        if kind == 'NUMBER':
+            value = int(value)
+        elif kind == 'ID' and value in keywords:
+            kind = 'TYPE'
+        elif kind == 'MISMATCH':
+            raise LexError(value, line, column)
+        yield Token(kind, value, line, column)
+    yield Token('EOF', None, line, len(code) - line_start + 1)
+
+
+def tokenize_compact(code):
+    # Same tokens as tokenize, stored as kind codes and source offsets in a TokenBuffer
+    buffer = TokenBuffer(code)
+    kinds, starts, ends = buffer.kinds.append, buffer.starts.append, buffer.ends.append
+    table = {lexeme: KIND_CODES[kind] for lexeme, (kind, _) in dispatch_table().items()}
+    lookup = table.get
+    for mo in scan_regex.finditer(code):
+        lexeme = mo.group()
+        kind_code = lookup(lexeme)
+        if kind_code is None:
+            kind = classify(lexeme)
+            if kind is None:
+                raise LexError(lexeme, *position(code, mo.start()))
+            kind_code = table[lexeme] = KIND_CODES[kind]
+        start, end = mo.span()
+        kinds(kind_code)
+        starts(start)
+        ends(end)
+    buffer.append(KIND_CODES['EOF'], len(code), len(code))
+    return buffer
@@ -1,3 +1,267 @@
+import time
+
+from compiler.ir import DECLARE, COPY, ADD, SUB, MUL, TEMP_PREFIX
+
+COMMUTATIVE = (ADD, MUL)
+
+
+# int is a 64-bit two's complement value, as on the x86-64 target
+INT_MIN = -2 ** 63
+
+
+def wrap(value):
+    return (value - INT_MIN) % 2 ** 64 + INT_MIN
+
+
+def convert(value, type_name):
+    if type_name == 'float':
+        return float(value)
+    if isinstance(value, float):
+        # Like cvttsd2si: truncate, and NaN or out-of-range values become INT_MIN
+        if value != value or not INT_MIN <= value < -INT_MIN:
+            return INT_MIN
+        return int(value)
+    return value
+
+
+def evaluate(op, x, y):
+    # x and y are already converted to the operation type; None means "do not fold"
+    if isinstance(x, float):
+        if op == ADD:
+            return x + y
+        if op == SUB:
+            return x - y
+        if op == MUL:
+            return x * y
+        return x / y if y != 0 else None
+    if op == ADD:
+        return wrap(x + y)
+    if op == SUB:
+        return wrap(x - y)
+    if op == MUL:
+        return wrap(x * y)
+    if y == 0 or (y == -1 and x == INT_MIN):
+        # Left for the program to trap on at run time, as the VM and idiv do
+        return None
+    # C++ integer division truncates toward zero
+    q = abs(x) // abs(y)
+    return wrap(q if (x < 0) == (y < 0) else -q)
+
+
+def fold_constants(program):
+    # Fold operations on constants, substituting variables whose value is a known
+    # constant on the way, so a whole chain of constant declarations folds in one sweep
+    out = program.derive()
+    consts, types = program.consts, program.types
+    known = {}
+    changes = 0
+    for op, dst, a, b in program.instructions():
+        if op != DECLARE:
+            value = known.get(a)
+            if value is not None:
+                a = value
+                changes += 1
+            if op >= ADD:
+                value = known.get(b)
+                if value is not None:
+                    b = value
+                    changes += 1
+        if op == COPY and a < 0:
+            value = consts[-1 - a]
+            converted = convert(value, types[dst])
+            if converted.__class__ is not value.__class__:
+                a = out.const(converted)
+                changes += 1
+        elif op >= ADD and a < 0 and b < 0:
+            result_type = program.result_type(a, b)
+            value = evaluate(op, convert(consts[-1 - a], result_type), convert(consts[-1 - b], result_type))
+            if value is not None:
+                op, a, b = COPY, out.const(convert(value, types[dst])), 0
+                changes += 1
+        if op == COPY and a < 0:
+            known[dst] = a
+        else:
+            known.pop(dst, None)
+        out.emit(op, dst, a, b)
+    return out, changes
+
+
+def simplify_algebra(program):
+    # x+0, x-0, x*1, x/1 become copies; int x*0 and int x-x become 0. Float x+0 is kept
+    # because -0.0 + 0 is +0.0
+    out = program.derive()
+    consts = program.consts
+    operand_type = program.operand_type
+
+    def is_value(operand, value):
+        return operand < 0 and consts[-1 - operand] == value
+
+    changes = 0
+    for op, dst, a, b in program.instructions():
+        if op >= ADD:
+            result_type = program.result_type(a, b)
+            kept = None
+            if op == ADD:
+                if result_type == 'int':
+                    kept = a if is_value(b, 0) else b if is_value(a, 0) else None
+            elif op == SUB:
+                if is_value(b, 0):
+                    kept = a
+                elif a == b and result_type == 'int':
+                    kept = out.const(0)
+            elif op == MUL:
+                kept = a if is_value(b, 1) else b if is_value(a, 1) else None
+                if kept is None and result_type == 'int' and (is_value(a, 0) or is_value(b, 0)):
+                    kept = out.const(0)
+            elif is_value(b, 1):
+                kept = a
+            # Only drop the operation when it would not have changed the operand's type
+            if kept is not None and operand_type(kept) == result_type:
+                op, a, b = COPY, kept, 0
+                changes += 1
+        out.emit(op, dst, a, b)
+    return out, changes
+
+
+def propagate_copies(program):
+    # Replace uses of x after "x = y" with y until either x or y is redefined
+    out = program.derive()
+    types = program.types
+    operand_type = program.operand_type
+    copies = {}
+    readers = {}
+    changes = 0
+    for op, dst, a, b in program.instructions():
+        if op != DECLARE:
+            source = copies.get(a)
+            if source is not None:
+                a = source
+                changes += 1
+            if op >= ADD:
+                source = copies.get(b)
+                if source is not None:
+                    b = source
+                    changes += 1
+        copies.pop(dst, None)
+        for reader in readers.pop(dst, ()):
+            if copies.get(reader) == dst:
+                del copies[reader]
+        if op == COPY and a != dst and operand_type(a) == types[dst]:
+            copies[dst] = a
+            if a >= 0:
+                readers.setdefault(a, []).append(dst)
+        out.emit(op, dst, a, b)
+    return out, changes
+
+
+def eliminate_common_subexpressions(program):
+    # Reuse the holder of an identical earlier operation while its inputs are unchanged
+    out = program.derive()
+    types = program.types
+    available = {}
+    users = {}
+    changes = 0
+    for op, dst, a, b in program.instructions():
+        key = None
+        if op >= ADD:
+            key = (op, b, a) if op in COMMUTATIVE and b < a else (op, a, b)
+            holder = available.get(key)
+            if holder is not None:
+                op, a, b = COPY, holder, 0
+                key = None
+                changes += 1
+        for stale in users.pop(dst, ()):
+            available.pop(stale, None)
+        if key is not None and dst != a and dst != b and types[dst] == program.result_type(a, b):
+            available[key] = dst
+            for name in (a, b, dst):
+                if name >= 0:
+                    users.setdefault(name, []).append(key)
+        out.emit(op, dst, a, b)
+    return out, changes
+
+
+def eliminate_dead_code(program):
+    # Backward liveness: variables are live at the end of the program, temporaries
+    # only while a later instruction reads them
+    live = bytearray(0 if name.startswith(TEMP_PREFIX) else 1 for name in program.names)
+    keep = bytearray(len(program))
+    ops, dsts, lhs, rhs = program.ops, program.dsts, program.lhs, program.rhs
+    for i in range(len(ops) - 1, -1, -1):
+        op = ops[i]
+        if op == DECLARE:
+            keep[i] = 1
+            continue
+        dst = dsts[i]
+        if not live[dst]:
+            continue
+        keep[i] = 1
+        live[dst] = 0
+        if lhs[i] >= 0:
+            live[lhs[i]] = 1
+        if op >= ADD and rhs[i] >= 0:
+            live[rhs[i]] = 1
+    out = program.derive()
+    for kept, (op, dst, a, b) in zip(keep, program.instructions()):
+        if kept:
+            out.emit(op, dst, a, b)
+    return out, len(program) - len(out)
+
+
+DEFAULT_PASSES = [
+    fold_constants,
+    simplify_algebra,
+    propagate_copies,
+    eliminate_common_subexpressions,
+    eliminate_dead_code,
+]
+
+
+class PassStats:
+    __slots__ = ('name', 'runs', 'changes', 'removed', 'seconds')
+
+    def __init__(self, name):
+        self.name = name
+        self.runs = 0
+        self.changes = 0
+        self.removed = 0
+        self.seconds = 0.0
+
+
+class PassManager:
+    # Runs every pass in order until a whole round changes nothing. Each pass is a
+    # single linear sweep and the number of rounds is capped, so the total is linear.
+    def __init__(self, passes=None, max_rounds=8):
+        self.passes = list(DEFAULT_PASSES if passes is None else passes)
+        self.max_rounds = max_rounds
+        self.stats = [PassStats(p.__name__) for p in self.passes]
+        self.rounds = 0
+
+    def run(self, program):
+        for _ in range(self.max_rounds):
+            self.rounds += 1
+            changed = False
+            for run_pass, stats in zip(self.passes, self.stats):
+                before = len(program)
+                start = time.perf_counter()
+                program, changes = run_pass(program)
+                stats.seconds += time.perf_counter() - start
+                stats.runs += 1
+                stats.changes += changes
+                stats.removed += before - len(program)
+                changed = changed or changes > 0
+            if not changed:
+                break
+        program.pass_stats = self.stats
+        return program
+
+
+def format_stats(stats):
+    lines = [f"; {'pass':34} {'runs':>4} {'changes':>8} {'removed':>8} {'time':>10}"]
+    for s in stats:
+        lines.append(f"; {s.name:34} {s.runs:4d} {s.changes:8d} {s.removed:8d} {s.seconds * 1000:7.2f} ms")
+    return "\n".join(lines)
+
+
 def optimize(ir):
-    # Dummy optimizer that just returns IR unchanged
-    return ir
+    return PassManager().run(ir)
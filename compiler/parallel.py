@@ -0,0 +1,154 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from compiler import lexer, parser, semantic_analyzer, intermediate_gen, optimizer, code_generator, irfile
+from compiler.incremental import Statement, MergedTokens, merge_ir, move, absolute
+
+# Chunks smaller than this cost more to ship between processes than to compile
+MIN_CHUNK_BYTES = 64 * 1024
+# Chunks per worker, so one slow chunk does not leave the other cores idle
+CHUNKS_PER_WORKER = 4
+
+
+def split_chunks(code, size):
+    # Cut the source after the first ';' at or past every `size` characters. Top-level
+    # statements are independent declarations, so each chunk compiles on its own.
+    # Yields (text, (line, column)) with the position where each chunk starts.
+    line = 1
+    column = 1
+    pos = 0
+    length = len(code)
+    while pos < length:
+        end = code.find(';', min(pos + size, length))
+        end = length if end == -1 else end + 1
+        yield code[pos:end], (line, column)
+        newlines = code.count('\n', pos, end)
+        if newlines:
+            line += newlines
+            column = end - code.rfind('\n', pos, end)
+        else:
+            column += end - pos
+        pos = end
+
+
+def compile_chunk(text, base):
+    # Front end for one chunk, with positions made absolute for `base`. Returns tokens,
+    # AST, IR, the chunk's SyntaxError (or None) and the seconds spent in each phase. A
+    # SyntaxError is returned rather than raised so the caller can report it in the AST
+    # phase, after every chunk's tokens; a LexError is raised, as it belongs to tokens.
+    start = time.perf_counter()
+    try:
+        tokens = lexer.tokenize_compact(text)
+    except lexer.LexError as e:
+        raise lexer.LexError(e.value, *absolute(base, e.line, e.column)) from None
+    lexed = time.perf_counter()
+    try:
+        ast = parser.Parser(tokens).parse()
+    except SyntaxError as e:
+        if e.lineno is not None:
+            line, column = absolute(base, e.lineno, e.offset)
+            e = SyntaxError(e.msg, (None, line, column, None))
+        return tokens, None, None, e, (lexed - start, time.perf_counter() - lexed, 0.0)
+    for node in ast:
+        move(node, (1, 1), base)
+    parsed = time.perf_counter()
+    ir = intermediate_gen.generate_ir(ast)
+    return tokens, ast, ir, None, (lexed - start, parsed - lexed, time.perf_counter() - parsed)
+
+
+def compile_chunk_packed(text, base):
+    # compile_chunk for a worker process. The AST travels in the binary AST format,
+    # which encodes and decodes about three times faster than pickling the nodes.
+    tokens, ast, ir, error, seconds = compile_chunk(text, base)
+    if ast is not None:
+        ast = irfile.dumps("ast", ast)
+    return tokens, ast, ir, error, seconds
+
+
+class ParallelCompiler:
+    # Splits one source at statement boundaries and lexes, parses and lowers the chunks
+    # in a process pool. Results are merged in source order; semantic checks run over
+    # the merged AST so duplicate and undeclared names are found across chunks, and the
+    # optimizer and code generator see the whole merged program.
+    #
+    # Only the front end is parallel. Merging, semantic checks, optimization and code
+    # generation run once in this process: the optimizer propagates constants across
+    # statements and the register allocator works on the whole program. In a serial
+    # compile of the medium and large workloads that tail (semantics, optimized and
+    # target) is about 40-45% of the time, so no number of workers gets past roughly
+    # 2.2-2.5x, and shipping chunks to the workers and back costs on top of that.
+    # benchmarks/bench_parallel.py prints the per-phase times of a serial compile and
+    # of this compiler with each worker count.
+    #
+    # The workers do all three front-end phases in one round trip, so the "tokens" phase
+    # covers the whole parallel front end; stats['seconds'] has the worker time spent
+    # in each of tokens, ast and ir. Errors still surface in the phase they belong to:
+    # a LexError before "tokens", the first SyntaxError in source order before "ast".
+    def __init__(self, workers=None, chunk_size=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.pool = None
+        self.stats = {'chunks': 0, 'workers': self.workers}
+
+    def chunks(self, code):
+        size = self.chunk_size or max(MIN_CHUNK_BYTES, len(code) // (self.workers * CHUNKS_PER_WORKER))
+        return [Statement(text, base) for text, base in split_chunks(code, size)]
+
+    def front_end(self, chunks):
+        if self.workers == 1 or len(chunks) <= 1:
+            return [compile_chunk(chunk.text, chunk.base) for chunk in chunks]
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        futures = [self.pool.submit(compile_chunk_packed, chunk.text, chunk.base) for chunk in chunks]
+        try:
+            # The first failing chunk in source order is the error the user sees
+            results = []
+            for future in futures:
+                tokens, ast, ir, error, seconds = future.result()
+                if ast is not None:
+                    ast = irfile.loads(ast)[1]
+                results.append((tokens, ast, ir, error, seconds))
+            return results
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def iter_phases(self, code):
+        chunks = self.chunks(code)
+        seconds = [0.0, 0.0, 0.0]
+        errors = []
+        for chunk, (tokens, ast, ir, error, spent) in zip(chunks, self.front_end(chunks)):
+            chunk.tokens = tokens
+            chunk.node = ast
+            chunk.ir = ir
+            if error is not None:
+                errors.append(error)
+            for i, value in enumerate(spent):
+                seconds[i] += value
+        self.stats = {'chunks': len(chunks), 'workers': self.workers,
+                      'seconds': dict(zip(("tokens", "ast", "ir"), seconds))}
+        yield "tokens", MergedTokens(chunks)
+
+        if errors:
+            raise errors[0]
+        ast = [node for chunk in chunks for node in chunk.node]
+        yield "ast", ast
+
+        yield "semantics", semantic_analyzer.analyze(ast)
+
+        ir = merge_ir(chunks)
+        yield "ir", ir
+
+        opt_ir = optimizer.optimize(ir)
+        yield "optimized", opt_ir
+
+        yield "target", code_generator.generate_code(opt_ir)
+
+    def compile(self, code):
+        return dict(self.iter_phases(code))
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
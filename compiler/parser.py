@@ -1,69 +1,135 @@
+from compiler.ast_nodes import NodeFactory
+
+EOF_TOKEN = ('EOF', None)
+
+# Binary operators and their precedence; all are left-associative
+BINARY_PRECEDENCE = {'+': 1, '-': 1, '*': 2, '/': 2}
+
+
 class Parser:
-    def __init__(self, tokens):
-        self.tokens = tokens
+    def __init__(self, tokens, factory=None):
+        # Tokens may be a list or a generator such as lexer.iter_tokens; only the
+        # current token is buffered, so streaming input is parsed in constant memory
+        self.tokens = iter(tokens)
+        # Expression nodes are hash-consed, so repeated subexpressions share one node
+        self.factory = factory if factory is not None else NodeFactory()
+        self.positions = getattr(tokens, 'position', None)
         self.pos = 0
+        self.lookahead = next(self.tokens, EOF_TOKEN)
 
     def current(self):
-        return self.tokens[self.pos] if self.pos < len(self.tokens) else ('EOF', None)
+        return self.lookahead
+
+    def advance(self):
+        self.pos += 1
+        self.lookahead = next(self.tokens, EOF_TOKEN)
 
     def match(self, expected_type):
-        if self.current()[0] == expected_type:
-            self.pos += 1
+        if self.lookahead[0] == expected_type:
+            self.advance()
         else:
-            raise SyntaxError(f"Expected {expected_type}, got {self.current()}")
+            raise self.error(f"Expected {expected_type}, got {self.describe(self.lookahead)}")
+
+    def describe(self, token):
+        return f"{token[0]} {token[1]!r}" if token[1] is not None else token[0]
+
+    def error(self, message):
+        # Positioned tokens give the error a line and column, like Python's own SyntaxError
+        token = self.lookahead
+        if len(token) >= 4:
+            return SyntaxError(message, (None, token[2], token[3], None))
+        if self.positions is not None:
+            return SyntaxError(message, (None, *self.positions(self.pos), None))
+        return SyntaxError(message)
+
+    def position(self):
+        # Line and column of the current token, when the token source records them
+        token = self.lookahead
+        if len(token) >= 4:
+            return token[2], token[3]
+        if self.positions is not None:
+            return self.positions(self.pos)
+        return None, None
 
     def parse(self):
-        ast = []
-        while self.current()[0] != 'EOF':
-            ast.append(self.statement())
-        return ast
+        return list(self.iter_parse())
+
+    def iter_parse(self):
+        # Yield each statement as soon as it is parsed
+        while self.lookahead[0] != 'EOF':
+            yield self.statement()
 
     def statement(self):
         if self.current()[0] == 'TYPE':
             return self.declaration()
         else:
-            raise SyntaxError(f"Invalid statement start: {self.current()}")
+            raise self.error(f"Invalid statement start: {self.describe(self.current())}")
 
     def declaration(self):
+        line, column = self.position()
+        type_name = self.current()[1]
         self.match('TYPE')
         var_name = self.current()[1]
         self.match('ID')
         self.match('ASSIGN')
+        self.factory.begin(line, column)
         expr = self.expression()
         self.match('SEMI')
-        return ('declare', var_name, expr)
+        return self.factory.declare(type_name, var_name, expr, line, column)
 
     def expression(self):
-        left = self.term()
-        while self.current()[0] == 'OP' and self.current()[1] in ('+', '-'):
-            op = self.current()[1]
-            self.match('OP')
-            right = self.term()
-            left = ('binop', op, left, right)
-        return left
-
-    def term(self):
-        left = self.factor()
-        while self.current()[0] == 'OP' and self.current()[1] in ('*', '/'):
-            op = self.current()[1]
-            self.match('OP')
-            right = self.factor()
-            left = ('binop', op, left, right)
-        return left
-
-    def factor(self):
-        if self.current()[0] == 'NUMBER':
-            val = self.current()[1]
-            self.match('NUMBER')
-            return ('num', val)
-        elif self.current()[0] == 'ID':
-            name = self.current()[1]
-            self.match('ID')
-            return ('var', name)
-        elif self.current()[0] == 'LPAREN':
-            self.match('LPAREN')
-            expr = self.expression()
-            self.match('RPAREN')
-            return expr
-        else:
-            raise SyntaxError(f"Unexpected token: {self.current()}")
+        # Precedence climbing with explicit operand and operator stacks instead of one
+        # Python call per grammar level, so nesting depth and chain length only cost
+        # stack entries. Builds the same tree as expression -> term -> factor.
+        num, var, binop = self.factory.num, self.factory.var, self.factory.binop
+        operands = []
+        operators = []
+        push = operands.append
+        pop = operands.pop
+        depth = 0
+        while True:
+            # Operand position: any number of '(' followed by a number or a name
+            while self.lookahead[0] == 'LPAREN':
+                operators.append(None)
+                depth += 1
+                self.advance()
+            kind, value = self.lookahead[0], self.lookahead[1]
+            if kind == 'NUMBER':
+                line, column = self.position()
+                push(num(value, line, column))
+            elif kind == 'ID':
+                line, column = self.position()
+                push(var(value, line, column))
+            else:
+                raise self.error(f"Unexpected token: {self.describe(self.lookahead)}")
+            self.advance()
+
+            # Operator position: close parentheses, then a binary operator or the end
+            kind = self.lookahead[0]
+            while kind == 'RPAREN' and depth:
+                operator = operators.pop()
+                while operator is not None:
+                    right = pop()
+                    push(binop(operator[1], pop(), right, operator[2], operator[3]))
+                    operator = operators.pop()
+                depth -= 1
+                self.advance()
+                kind = self.lookahead[0]
+            if kind == 'OP' and self.lookahead[1] in BINARY_PRECEDENCE:
+                op = self.lookahead[1]
+                precedence = BINARY_PRECEDENCE[op]
+                while operators and operators[-1] is not None and operators[-1][0] >= precedence:
+                    operator = operators.pop()
+                    right = pop()
+                    push(binop(operator[1], pop(), right, operator[2], operator[3]))
+                line, column = self.position()
+                operators.append((precedence, op, line, column))
+                self.advance()
+                continue
+            if depth:
+                self.match('RPAREN')
+            while operators:
+                operator = operators.pop()
+                right = pop()
+                push(binop(operator[1], pop(), right, operator[2], operator[3]))
+            return operands[0]
@@ -0,0 +1,197 @@
+import time
+
+from compiler import code_generator
+
+# Peephole pass over the generated assembly. Each rule looks at a fixed-width window of
+# instructions and returns its replacement, or None when it does not apply. Windows are
+# matched against the tail of the output as instructions are appended, so a rewrite is
+# O(1) and a replacement is matched again against the instructions before it. The code
+# generator never relies on flags between instructions, so rules may change which
+# flags an instruction sets.
+
+MOVES = ('mov', 'movsd')
+
+
+def is_move(instr):
+    return instr.op in MOVES and len(instr.operands) == 2
+
+
+def only_writes(instr, register):
+    # True when instr overwrites `register` without reading it first
+    operands = instr.operands
+    if not operands or operands[0] != register:
+        return False
+    if instr.op in MOVES or instr.op in ('cvtsi2sd', 'cvttsd2si'):
+        return len(operands) == 2 and register not in operands[1]
+    if instr.op == 'imul' and len(operands) == 3:
+        return register not in operands[1]
+    return False
+
+
+def writes(instr, operand):
+    # Conservative: any instruction other than a move or store may change registers it
+    # does not name (cqo and idiv write rax and rdx), and every store may alias memory
+    if code_generator.is_memory(operand):
+        return instr.op != 'mov' and instr.op != 'movsd' or code_generator.is_memory(instr.operands[0])
+    if instr.op in MOVES:
+        return instr.operands[0] == operand
+    return True
+
+
+def power_of_two(text):
+    try:
+        value = int(text)
+    except ValueError:
+        return None
+    if value > 1 and value & (value - 1) == 0:
+        return value.bit_length() - 1
+    return None
+
+
+def self_move(a):
+    # mov r, r
+    if is_move(a) and a.operands[0] == a.operands[1]:
+        return []
+    return None
+
+
+def redundant_load(a, b):
+    # mov M, r ; mov r, M  ->  mov M, r
+    if is_move(a) and b.op == a.op and b.operands == a.operands[::-1] and code_generator.is_memory(a.operands[0]):
+        return [a]
+    return None
+
+
+def redundant_store(a, b):
+    # mov r, M ; mov M, r  ->  mov r, M
+    if is_move(a) and b.op == a.op and b.operands == a.operands[::-1] and code_generator.is_memory(a.operands[1]):
+        return [a]
+    return None
+
+
+def dead_move(a, b):
+    # mov r, x ; op r, y  ->  op r, y  when op overwrites r without reading it
+    if is_move(a) and code_generator.is_register(a.operands[0]) and only_writes(b, a.operands[0]):
+        return [b]
+    return None
+
+
+def repeated_move(a, b, c):
+    # mov r, x ; i ; mov r, x  ->  mov r, x ; i  when i changes neither r nor x
+    if is_move(a) and c == a and code_generator.is_register(a.operands[0]):
+        dst, src = a.operands
+        if not writes(b, dst) and not writes(b, src):
+            return [a, b]
+    return None
+
+
+def multiply_by_power_of_two(a):
+    # imul r, r, 2^k  ->  shl r, k  (the low 64 bits of the product are the same)
+    if a.op == 'imul' and len(a.operands) == 3 and a.operands[0] == a.operands[1]:
+        shift = power_of_two(a.operands[2])
+        if shift is not None:
+            return [code_generator.Instr('shl', a.operands[0], str(shift))]
+    return None
+
+
+def identity_operation(a):
+    # imul r, r, 1 / add r, 0 / sub r, 0 / shl r, 0
+    operands = a.operands
+    if a.op == 'imul' and len(operands) == 3 and operands[0] == operands[1] and operands[2] == '1':
+        return []
+    if a.op in ('add', 'sub', 'shl') and len(operands) == 2 and operands[1] == '0':
+        return []
+    return None
+
+
+# (rule, window width) in the order they are tried against the tail of the output
+RULES = [
+    (self_move, 1),
+    (identity_operation, 1),
+    (multiply_by_power_of_two, 1),
+    (redundant_load, 2),
+    (redundant_store, 2),
+    (dead_move, 2),
+    (repeated_move, 3),
+]
+
+
+class RuleStats:
+    __slots__ = ('name', 'hits', 'removed')
+
+    def __init__(self, name):
+        self.name = name
+        self.hits = 0
+        self.removed = 0
+
+
+class Peephole:
+    def __init__(self, rules=None):
+        self.rules = list(RULES if rules is None else rules)
+        self.stats = [RuleStats(rule.__name__) for rule, _ in self.rules]
+        self.seconds = 0.0
+
+    def run(self, program):
+        start = time.perf_counter()
+        rules = list(zip(self.rules, self.stats))
+        out = []
+        # Each IR instruction's text is on the first instruction lowered from it. When a
+        # rewrite drops that instruction, the text moves to the instruction now in its
+        # place, or to the next one appended when nothing in the window follows it.
+        comment = None
+        for instr in program.code:
+            if comment is not None and instr.comment is None:
+                instr.comment = comment
+            comment = None
+            out.append(instr)
+            matched = True
+            while matched:
+                matched = False
+                for (rule, width), stats in rules:
+                    if len(out) < width:
+                        continue
+                    window = out[-width:]
+                    replacement = rule(*window)
+                    if replacement is None:
+                        continue
+                    stats.hits += 1
+                    stats.removed += width - len(replacement)
+                    del out[-width:]
+                    out.extend(replacement)
+                    for j, dropped in enumerate(window):
+                        if dropped.comment is not None and not any(dropped is kept for kept in replacement):
+                            after = following(window, j, replacement)
+                            if after is None:
+                                comment = dropped.comment
+                            elif after.comment is None:
+                                after.comment = dropped.comment
+                    matched = bool(out)
+                    break
+        program.code = out
+        program.peephole_stats = self.stats
+        self.seconds += time.perf_counter() - start
+        return program
+
+
+def following(window, j, replacement):
+    # The first instruction of `replacement` that is new or came after window[j]
+    for instr in replacement:
+        for k, original in enumerate(window):
+            if instr is original:
+                if k > j:
+                    return instr
+                break
+        else:
+            return instr
+    return None
+
+
+def format_stats(stats):
+    lines = [f"# {'peephole rule':34} {'hits':>8} {'removed':>8}"]
+    for s in stats:
+        lines.append(f"# {s.name:34} {s.hits:8d} {s.removed:8d}")
+    return "\n".join(lines)
+
+
+def optimize(program):
+    return Peephole().run(program)
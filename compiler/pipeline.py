@@ -0,0 +1,174 @@
+import threading
+
+from compiler import lexer, parser, semantic_analyzer, intermediate_gen, optimizer, code_generator, peephole
+
+# Phase names in pipeline order, shared by the GUI and the headless driver
+PHASES = ["tokens", "ast", "semantics", "ir", "optimized", "target"]
+
+
+class PhaseStream:
+    # Iterator of (phase, result) pairs that also lists the phases it will produce, in
+    # order, so an observer such as the profiler knows which phase runs next before
+    # asking for it
+    __slots__ = ('phases', '_items')
+
+    def __init__(self, items, phases):
+        self._items = iter(items)
+        self.phases = list(phases)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._items)
+
+
+def iter_phases(code, cache=None, compiler=None):
+    # Run the pipeline one phase at a time so callers can stop between phases. With a
+    # PhaseCache, a source compiled before is served from disk; `compiler` (for example
+    # an IncrementalCompiler) computes the phases on a miss.
+    return PhaseStream(_iter_phases(code, cache, compiler), PHASES)
+
+
+def _iter_phases(code, cache, compiler):
+    if cache is not None:
+        cached = cache.load(code, PHASES)
+        if cached is not None:
+            yield from cached.items()
+            return
+    run = compiler.iter_phases if compiler is not None else run_phases
+    results = {}
+    for phase, value in run(code):
+        results[phase] = value
+        yield phase, value
+    if cache is not None:
+        cache.store(code, results)
+
+
+class LazyPipeline:
+    # The phases of one source version, computed on demand and memoized. Asking for a
+    # phase runs the pipeline only as far as that phase; later requests resume where the
+    # previous one stopped. Safe to drive from one worker thread at a time per phase.
+    def __init__(self, code, cache=None, compiler=None):
+        self.code = code
+        self.cache = cache
+        self.compiler = compiler
+        self.results = {}
+        self.error = None
+        self.lock = threading.Lock()
+        self._phases = None
+
+    def done(self, phase):
+        return phase in self.results
+
+    def get(self, phase):
+        for name, value in self.iter_until(phase):
+            if name == phase:
+                return value
+
+    def iter_until(self, phase):
+        # Yield every phase up to and including `phase`, in order, computing only
+        # the ones not seen yet
+        wanted = PHASES[:PHASES.index(phase) + 1]
+        return PhaseStream(self._iter_until(wanted), wanted)
+
+    def _iter_until(self, wanted):
+        with self.lock:
+            missing = [name for name in wanted if name not in self.results]
+            if missing and self.cache is not None and self._phases is None:
+                cached = self.cache.load(self.code, missing)
+                if cached is not None:
+                    self.results.update(cached)
+        for name in wanted:
+            with self.lock:
+                if name not in self.results:
+                    self._advance(name)
+                value = self.results[name]
+            yield name, value
+
+    def _advance(self, phase):
+        # A failed phase fails the same way on every later request for this version
+        if self.error is not None:
+            raise self.error
+        if self._phases is None:
+            run = self.compiler.iter_phases if self.compiler is not None else run_phases
+            self._phases = run(self.code)
+        try:
+            for name, value in self._phases:
+                self.results[name] = value
+                if name == phase:
+                    break
+        except Exception as e:
+            self.error = e
+            raise
+        if self.cache is not None and len(self.results) == len(PHASES):
+            self.cache.store(self.code, self.results)
+
+
+def run_phases(code):
+    tokens = lexer.tokenize_compact(code)
+    yield "tokens", tokens
+
+    ast = parser.Parser(tokens).parse()
+    yield "ast", ast
+
+    yield "semantics", semantic_analyzer.analyze(ast)
+
+    ir = intermediate_gen.generate_ir(ast)
+    yield "ir", ir
+
+    opt_ir = optimizer.optimize(ir)
+    yield "optimized", opt_ir
+
+    yield "target", code_generator.generate_code(opt_ir)
+
+
+def resume_phases(phase, value):
+    # Continue from a phase result loaded from disk (see compiler.irfile): an AST goes
+    # through the middle end, IR through the optimizer, optimized IR only to the target
+    return PhaseStream(_resume_phases(phase, value), PHASES[PHASES.index(phase):])
+
+
+def _resume_phases(phase, value):
+    yield phase, value
+    if phase == "ast":
+        yield "semantics", semantic_analyzer.analyze(value)
+        value = intermediate_gen.generate_ir(value)
+        yield "ir", value
+    if phase != "optimized":
+        value = optimizer.optimize(value)
+        yield "optimized", value
+    yield "target", code_generator.generate_code(value)
+
+
+def compile_source(code):
+    return dict(iter_phases(code))
+
+
+def format_tokens(tokens):
+    return "\n".join(f"{i:3d}. {typ:15} → '{val}'" for i, (typ, val) in enumerate(tokens, 1))
+
+
+def format_phase(phase, result):
+    if phase == "tokens":
+        return format_tokens(result)
+    if phase == "ast":
+        return "\n".join(map(repr, result))
+    if phase == "optimized" and result.pass_stats:
+        return f"{result}\n\n{optimizer.format_stats(result.pass_stats)}"
+    if phase == "target" and result.peephole_stats:
+        return f"{result}\n\n{peephole.format_stats(result.peephole_stats)}"
+    return str(result)
+
+
+def error_position(error):
+    # Line and column of a lexer or parser error, or None when it carries none
+    if isinstance(error, SyntaxError):
+        return (error.lineno, error.offset) if error.lineno is not None else None
+    if isinstance(error, lexer.LexError):
+        return error.line, error.column
+    return None
+
+
+def has_semantic_errors(sem_result):
+    return bool(sem_result.errors)
@@ -0,0 +1,144 @@
+import json
+import time
+import tracemalloc
+
+from compiler.pipeline import PHASES
+
+# Hooks registered here run for every Profiler: pre(phase) before a phase starts and
+# post(phase, record, result) after it finishes
+_pre_hooks = []
+_post_hooks = []
+
+
+def add_hook(pre=None, post=None):
+    if pre is not None:
+        _pre_hooks.append(pre)
+    if post is not None:
+        _post_hooks.append(post)
+
+
+def remove_hook(pre=None, post=None):
+    if pre in _pre_hooks:
+        _pre_hooks.remove(pre)
+    if post in _post_hooks:
+        _post_hooks.remove(post)
+
+
+def count_nodes(ast):
+    # (occurrences, distinct nodes): expressions are hash-consed, so one node can stand
+    # for several occurrences
+    occurrences = 0
+    seen = set()
+    stack = list(ast)
+    while stack:
+        node = stack.pop()
+        occurrences += 1
+        seen.add(id(node))
+        stack.extend(node.children())
+    return occurrences, len(seen)
+
+
+def measure(phase, result):
+    # Size counters reported for each phase's result
+    if phase == "tokens":
+        return {"tokens": len(result)}
+    if phase == "ast":
+        occurrences, distinct = count_nodes(result)
+        return {"statements": len(result), "nodes": occurrences, "distinct_nodes": distinct}
+    if phase == "semantics":
+        return {"errors": len(result.errors), "warnings": len(result.warnings), "symbols": result.symbols}
+    if phase in ("ir", "optimized"):
+        return {"instructions": len(result)}
+    if phase == "target":
+        return {"instructions": len(result), "spill_slots": result.spill_slots}
+    return {}
+
+
+class PhaseRecord:
+    __slots__ = ('phase', 'wall_seconds', 'cpu_seconds', 'peak_bytes', 'counts')
+
+    def __init__(self, phase, wall_seconds, cpu_seconds, peak_bytes, counts):
+        self.phase = phase
+        self.wall_seconds = wall_seconds
+        self.cpu_seconds = cpu_seconds
+        self.peak_bytes = peak_bytes
+        self.counts = counts
+
+    def as_dict(self):
+        return {"phase": self.phase, "wall_seconds": self.wall_seconds, "cpu_seconds": self.cpu_seconds,
+                "peak_bytes": self.peak_bytes, "counts": self.counts}
+
+
+class Profiler:
+    # Wraps a phase generator such as pipeline.iter_phases and records wall time, CPU
+    # time of the running thread, tracemalloc peak and result sizes for every phase
+    def __init__(self, trace_memory=True):
+        self.trace_memory = trace_memory
+        self.records = []
+        self.pre_hooks = []
+        self.post_hooks = []
+
+    def add_hook(self, pre=None, post=None):
+        if pre is not None:
+            self.pre_hooks.append(pre)
+        if post is not None:
+            self.post_hooks.append(post)
+
+    def run(self, phases):
+        started_tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        # Pre-hooks are told the phase the stream will produce next: a PhaseStream lists
+        # its phases (a resumed or cached run covers only some of them), anything else is
+        # taken to run the whole pipeline
+        order = getattr(phases, 'phases', PHASES)
+        position = 0
+        try:
+            phases = iter(phases)
+            while True:
+                if position < len(order):
+                    for hook in _pre_hooks + self.pre_hooks:
+                        hook(order[position])
+                if self.trace_memory:
+                    tracemalloc.reset_peak()
+                    base = tracemalloc.get_traced_memory()[0]
+                wall = time.perf_counter()
+                cpu = time.thread_time()
+                try:
+                    phase, result = next(phases)
+                except StopIteration:
+                    return
+                cpu = time.thread_time() - cpu
+                wall = time.perf_counter() - wall
+                peak = tracemalloc.get_traced_memory()[1] - base if self.trace_memory else None
+                record = PhaseRecord(phase, wall, cpu, peak, measure(phase, result))
+                self.records.append(record)
+                position = order.index(phase) + 1 if phase in order else position + 1
+                for hook in _post_hooks + self.post_hooks:
+                    hook(phase, record, result)
+                yield phase, result
+        finally:
+            if started_tracing:
+                tracemalloc.stop()
+
+    def report(self):
+        return {
+            "phases": [record.as_dict() for record in self.records],
+            "wall_seconds": sum(r.wall_seconds for r in self.records),
+            "cpu_seconds": sum(r.cpu_seconds for r in self.records),
+            "peak_bytes": max((r.peak_bytes or 0 for r in self.records), default=0),
+        }
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.report(), **kwargs)
+
+    def format_table(self):
+        lines = [f"{'phase':10} {'wall ms':>10} {'cpu ms':>10} {'peak KiB':>10}  counts"]
+        for r in self.records:
+            peak = f"{r.peak_bytes / 1024:10.1f}" if r.peak_bytes is not None else f"{'-':>10}"
+            counts = ", ".join(f"{k}={v}" for k, v in r.counts.items())
+            lines.append(f"{r.phase:10} {r.wall_seconds * 1000:10.2f} {r.cpu_seconds * 1000:10.2f} {peak}  {counts}")
+        report = self.report()
+        lines.append(f"{'total':10} {report['wall_seconds'] * 1000:10.2f} {report['cpu_seconds'] * 1000:10.2f} "
+                     f"{report['peak_bytes'] / 1024:10.1f}")
+        return "\n".join(lines)
@@ -1,17 +1,208 @@
-def analyze(ast):
-    # Simple semantic analyzer: check for duplicate declarations
-    symbol_table = set()
-    errors = []
+from compiler.ast_nodes import NodeVisitor, BinOp, Num, Var, occurrences
+
+ERROR = "error"
+WARNING = "warning"
+
+
+class Diagnostic:
+    __slots__ = ('severity', 'message', 'line', 'column')
+
+    def __init__(self, severity, message, line=None, column=None):
+        self.severity = severity
+        self.message = message
+        self.line = line
+        self.column = column
+
+    def as_dict(self):
+        return {"severity": self.severity, "message": self.message, "line": self.line, "column": self.column}
+
+    def __str__(self):
+        prefix = "Semantic Error" if self.severity == ERROR else "Semantic Warning"
+        where = f" (line {self.line}, column {self.column})" if self.line is not None else ""
+        return f"{prefix}: {self.message}{where}"
+
+    def __repr__(self):
+        return f"Diagnostic({self.severity!r}, {self.message!r}, {self.line!r}, {self.column!r})"
+
+
+class SemanticResult:
+    # Diagnostics in source order; str() gives the text shown in the Semantics tab
+    __slots__ = ('diagnostics', 'symbols')
+
+    def __init__(self, diagnostics, symbols=0):
+        self.diagnostics = diagnostics
+        self.symbols = symbols
+
+    @property
+    def errors(self):
+        return [d for d in self.diagnostics if d.severity == ERROR]
+
+    @property
+    def warnings(self):
+        return [d for d in self.diagnostics if d.severity == WARNING]
+
+    def __len__(self):
+        return len(self.diagnostics)
+
+    def __iter__(self):
+        return iter(self.diagnostics)
+
+    def __str__(self):
+        lines = [str(d) for d in self.diagnostics]
+        if not any(d.severity == ERROR for d in self.diagnostics):
+            lines.append("Semantic analysis passed.")
+        return "\n".join(lines)
+
+
+class Symbol:
+    __slots__ = ('id', 'type_name', 'line', 'column', 'depth')
+
+    def __init__(self, id, type_name, line, column, depth):
+        self.id = id
+        self.type_name = type_name
+        self.line = line
+        self.column = column
+        self.depth = depth
+
 
+class SymbolTable:
+    # Names are interned to integer ids. Each id keeps a stack of its visible bindings
+    # (innermost last) and each scope lists the ids it bound, so lookup, declare and
+    # leaving a scope cost O(1) per symbol regardless of nesting
+    def __init__(self):
+        self.ids = {}
+        self.names = []
+        self.bindings = []
+        self.scopes = [[]]
+
+    def intern(self, name):
+        id = self.ids.get(name)
+        if id is None:
+            id = self.ids[name] = len(self.names)
+            self.names.append(name)
+            self.bindings.append([])
+        return id
+
+    def enter_scope(self):
+        self.scopes.append([])
+
+    def exit_scope(self):
+        for id in self.scopes.pop():
+            self.bindings[id].pop()
+
+    def lookup(self, name):
+        id = self.ids.get(name)
+        if id is None:
+            return None
+        bindings = self.bindings[id]
+        return bindings[-1] if bindings else None
+
+    def mark(self):
+        # Global-scope state to return to with rollback(): names interned and bound so far
+        return len(self.names), len(self.scopes[0])
+
+    def rollback(self, mark):
+        # Undo every global declaration made since mark(); nested scopes must be closed
+        interned, bound = mark
+        for id in self.scopes[0][bound:]:
+            self.bindings[id].pop()
+        del self.scopes[0][bound:]
+        for name in self.names[interned:]:
+            del self.ids[name]
+        del self.names[interned:]
+        del self.bindings[interned:]
+
+    def declare(self, name, type_name, line=None, column=None):
+        # Returns the earlier binding in the same scope when the name is already taken
+        id = self.intern(name)
+        bindings = self.bindings[id]
+        depth = len(self.scopes) - 1
+        if bindings and bindings[-1].depth == depth:
+            return bindings[-1]
+        bindings.append(Symbol(id, type_name, line, column, depth))
+        self.scopes[-1].append(id)
+        return None
+
+
+class SemanticChecker(NodeVisitor):
+    # One linear pass: each declaration's initializer is checked against the symbols
+    # declared before it, then the declared name is bound
+    def __init__(self):
+        self.symbols = SymbolTable()
+        self.diagnostics = []
+
+    def mark(self):
+        return len(self.diagnostics), self.symbols.mark()
+
+    def rollback(self, mark):
+        # Forget the diagnostics and declarations of every statement checked since mark()
+        reported, symbols = mark
+        del self.diagnostics[reported:]
+        self.symbols.rollback(symbols)
+
+    def report(self, severity, message, line=None, column=None):
+        self.diagnostics.append(Diagnostic(severity, message, line, column))
+
+    def visit_Declare(self, node):
+        expr_type = self.expression_type(node.expr, node)
+        if node.type_name == "int" and expr_type == "float":
+            self.report(WARNING, f"Implicit conversion from float to int narrows the value of '{node.name}'.",
+                        node.line, node.column)
+        previous = self.symbols.declare(node.name, node.type_name, node.line, node.column)
+        if previous is not None:
+            where = f" at line {previous.line}" if previous.line is not None else ""
+            self.report(ERROR, f"Variable '{node.name}' already declared{where}.", node.line, node.column)
+
+    def expression_type(self, expr, statement=None):
+        # Arithmetic is float if any operand is; walked with a stack like the parser.
+        # Shared nodes are visited once per occurrence. Positions live in the statement,
+        # so undeclared names are reported by a second walk that numbers occurrences.
+        lookup = self.symbols.lookup
+        result = "int"
+        undeclared = False
+        stack = [expr]
+        while stack:
+            node = stack.pop()
+            cls = node.__class__
+            if cls is BinOp:
+                stack.append(node.right)
+                stack.append(node.left)
+            elif cls is Var:
+                symbol = lookup(node.name)
+                if symbol is None:
+                    undeclared = True
+                elif symbol.type_name == "float":
+                    result = "float"
+            elif cls is Num:
+                if isinstance(node.value, float):
+                    result = "float"
+        if undeclared:
+            self.report_undeclared(expr, statement)
+        return result
+
+    def report_undeclared(self, expr, statement):
+        if statement is None:
+            found = [(node, None, None) for node in walk_leaves(expr)]
+        else:
+            found = occurrences(statement)
+        for node, line, column in found:
+            if node.__class__ is Var and self.symbols.lookup(node.name) is None:
+                self.report(ERROR, f"Variable '{node.name}' used before declaration.", line, column)
+
+
+def walk_leaves(expr):
+    stack = [expr]
+    while stack:
+        node = stack.pop()
+        if node.__class__ is BinOp:
+            stack.append(node.right)
+            stack.append(node.left)
+        else:
+            yield node
+
+
+def analyze(ast):
+    checker = SemanticChecker()
     for node in ast:
-        if node[0] == 'declare':
-            var_name = node[1]
-            if var_name in symbol_table:
-                errors.append(f"Semantic Error: Variable '{var_name}' already declared.")
-            else:
-                symbol_table.add(var_name)
-
-    if errors:
-        return "\n".join(errors)
-    else:
-        return "Semantic analysis passed."
+        checker.visit(node)
+    return SemanticResult(checker.diagnostics, len(checker.symbols.names))
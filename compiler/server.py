@@ -0,0 +1,232 @@
+import argparse
+import asyncio
+import json
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from compiler import pipeline
+from compiler.cache import PhaseCache, DEFAULT_MAX_BYTES
+from compiler.client import default_socket_path
+from compiler.incremental import IncrementalCompiler
+
+# Requests and replies are single lines of JSON. A compile request looks like
+#   {"op": "compile", "source": "...", "phases": ["semantics", "target"], "document": "a.cpp"}
+# and is answered with the formatted text of each requested phase plus diagnostics.
+# "stats" returns the counters below and "shutdown" stops the server.
+
+# A whole source file fits in one request line
+LINE_LIMIT = 256 * 1024 * 1024
+
+
+class LRU:
+    # Small thread-safe LRU map; the pool threads share the server's warm state
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get_or_create(self, key, factory):
+        with self.lock:
+            value = self.items.get(key)
+            if value is None:
+                value = self.items[key] = factory()
+                if len(self.items) > self.capacity:
+                    self.items.popitem(last=False)
+            else:
+                self.items.move_to_end(key)
+            return value
+
+    def __len__(self):
+        return len(self.items)
+
+
+class CompileServer:
+    # Keeps the memoized phases of recently compiled sources and an IncrementalCompiler
+    # per document warm between requests; compiles run on a bounded thread pool
+    def __init__(self, socket_path=None, workers=4, cache=None, max_sources=64, max_documents=16):
+        self.socket_path = socket_path or default_socket_path()
+        self.workers = workers
+        self.cache = cache
+        self.sources = LRU(max_sources)
+        self.documents = LRU(max_documents)
+        self.stats = {"requests": 0, "errors": 0, "memo_hits": 0}
+        self.executor = None
+        self.slots = None
+        self.server = None
+        self.stopping = None
+
+    def pipeline_for(self, source, document):
+        # Each document gets its own IncrementalCompiler so edits reuse unchanged statements
+        compiler = None
+        if document is not None:
+            compiler = self.documents.get_or_create(document, IncrementalCompiler)
+        return self.sources.get_or_create((document, source),
+                                          lambda: pipeline.LazyPipeline(source, self.cache, compiler))
+
+    def compile(self, request):
+        start = time.perf_counter()
+        source = request.get("source")
+        if not isinstance(source, str):
+            raise ValueError("compile request needs a 'source' string")
+        phases = request.get("phases") or pipeline.PHASES
+        unknown = [p for p in phases if p not in pipeline.PHASES]
+        if unknown:
+            raise ValueError(f"unknown phase(s): {', '.join(unknown)}")
+        lazy = self.pipeline_for(source, request.get("document"))
+        last = max(phases, key=pipeline.PHASES.index)
+        if lazy.done(last):
+            self.stats["memo_hits"] += 1
+
+        result = {"ok": True, "status": "ok", "phase": None, "error": None, "phases": {}, "diagnostics": []}
+        phase = None
+        try:
+            for phase, value in lazy.iter_until(last):
+                if phase == "semantics":
+                    result["diagnostics"] = [d.as_dict() for d in value]
+                    if pipeline.has_semantic_errors(value):
+                        result["status"] = "semantic-error"
+                        result["phase"] = phase
+                if phase in phases:
+                    result["phases"][phase] = pipeline.format_phase(phase, value)
+        except Exception as e:
+            done = pipeline.PHASES.index(phase) + 1 if phase else 0
+            result["status"] = "error"
+            result["phase"] = pipeline.PHASES[min(done, len(pipeline.PHASES) - 1)]
+            result["error"] = f"{type(e).__name__}: {e}"
+            position = pipeline.error_position(e)
+            if position is not None:
+                result["line"], result["column"] = position
+        result["seconds"] = round(time.perf_counter() - start, 6)
+        return result
+
+    def server_stats(self):
+        stats = dict(self.stats, sources=len(self.sources), documents=len(self.documents), workers=self.workers)
+        if self.cache is not None:
+            stats["cache"] = self.cache.stats()
+        return {"ok": True, **stats}
+
+    async def handle(self, request):
+        op = request.get("op", "compile")
+        if op == "stats":
+            return self.server_stats()
+        if op == "shutdown":
+            self.stopping.set()
+            return {"ok": True}
+        if op != "compile":
+            raise ValueError(f"unknown op: {op!r}")
+        # At most `workers` compiles run at once; further requests wait here
+        async with self.slots:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, self.compile, request)
+
+    async def serve_client(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                self.stats["requests"] += 1
+                request = {}
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("request must be a JSON object")
+                    reply = await self.handle(request)
+                except Exception as e:
+                    self.stats["errors"] += 1
+                    reply = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+                if isinstance(request, dict) and "id" in request:
+                    reply["id"] = request["id"]
+                writer.write(json.dumps(reply).encode("utf-8") + b"\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError):
+            pass
+        except asyncio.CancelledError:
+            # Idle connections are cancelled when the server shuts down
+            pass
+        finally:
+            writer.close()
+
+    async def run(self):
+        remove_stale_socket(self.socket_path)
+        sock = bind_private(self.socket_path)
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="compile")
+        self.slots = asyncio.Semaphore(self.workers)
+        self.stopping = asyncio.Event()
+        self.server = await asyncio.start_unix_server(self.serve_client, sock=sock, limit=LINE_LIMIT)
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, self.stopping.set)
+        try:
+            async with self.server:
+                await self.stopping.wait()
+        finally:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+
+def remove_stale_socket(path):
+    # A socket file left by a crashed server is removed; a live server is an error
+    if not os.path.exists(path):
+        return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(path)
+        except (ConnectionRefusedError, FileNotFoundError):
+            os.unlink(path)
+            return
+    raise RuntimeError(f"a compile server is already listening on {path}")
+
+
+def bind_private(path):
+    # The socket file is created owner-only by binding under a restrictive umask; a
+    # chmod after bind would leave a window in which other users could connect
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    umask = os.umask(0o177)
+    try:
+        sock.bind(path)
+    except OSError:
+        sock.close()
+        raise
+    finally:
+        os.umask(umask)
+    return sock
+
+
+def build_arg_parser():
+    ap = argparse.ArgumentParser(prog="python -m compiler.server",
+                                 description="Serve compile requests over a Unix domain socket.")
+    ap.add_argument("--socket", help="socket path (default: $XDG_RUNTIME_DIR/mini-cpp-compiler.sock)")
+    ap.add_argument("-j", "--workers", type=int, default=os.cpu_count() or 1,
+                    help="compiles run at the same time (default: all cores)")
+    ap.add_argument("--max-sources", type=int, default=64,
+                    help="recently compiled sources kept in memory (default: %(default)s)")
+    ap.add_argument("--no-cache", action="store_true", help="do not read or write the phase cache")
+    ap.add_argument("--cache-dir", help="phase cache directory (default: ~/.cache/mini-cpp-compiler)")
+    ap.add_argument("--cache-size", type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024),
+                    help="phase cache size cap in MB (default: %(default)s)")
+    return ap
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    cache = None if args.no_cache else PhaseCache(args.cache_dir, args.cache_size * 1024 * 1024)
+    server = CompileServer(args.socket, max(1, args.workers), cache, max_sources=args.max_sources)
+    print(f"compile server listening on {server.socket_path}", file=sys.stderr)
+    try:
+        asyncio.run(server.run())
+    except RuntimeError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
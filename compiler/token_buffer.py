@@ -0,0 +1,76 @@
+from array import array
+from bisect import bisect_right
+
+# Small integer code for every token kind the parser can see
+KIND_NAMES = ['NUMBER', 'ID', 'ASSIGN', 'SEMI', 'OP', 'LPAREN', 'RPAREN', 'TYPE', 'EOF']
+KIND_CODES = {name: code for code, name in enumerate(KIND_NAMES)}
+NUMBER, ID, ASSIGN, SEMI, OP, LPAREN, RPAREN, TYPE, EOF = range(len(KIND_NAMES))
+
+
+class TokenBuffer:
+    # Array-backed token store: one byte of kind plus start/end offsets per token.
+    # Values are sliced out of the source only when a token is read.
+    __slots__ = ('source', 'kinds', 'starts', 'ends', '_line_starts')
+
+    def __init__(self, source):
+        self.source = source
+        offset_type = 'I' if len(source) < 2 ** 32 else 'Q'
+        self.kinds = array('B')
+        self.starts = array(offset_type)
+        self.ends = array(offset_type)
+        self._line_starts = None
+
+    def append(self, kind_code, start, end):
+        self.kinds.append(kind_code)
+        self.starts.append(start)
+        self.ends.append(end)
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def kind(self, i):
+        return KIND_NAMES[self.kinds[i]]
+
+    def text(self, i):
+        return self.source[self.starts[i]:self.ends[i]]
+
+    def value(self, i):
+        code = self.kinds[i]
+        if code == EOF:
+            return None
+        text = self.source[self.starts[i]:self.ends[i]]
+        return int(text) if code == NUMBER else text
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self.kinds)
+        return (KIND_NAMES[self.kinds[i]], self.value(i))
+
+    def __iter__(self):
+        # Same (kind, value) tuples as lexer.tokenize, built one at a time
+        names = KIND_NAMES
+        source = self.source
+        for code, start, end in zip(self.kinds, self.starts, self.ends):
+            if code == NUMBER:
+                yield ('NUMBER', int(source[start:end]))
+            elif code == EOF:
+                yield ('EOF', None)
+            else:
+                yield (names[code], source[start:end])
+
+    def position(self, i):
+        # 1-based line and column of token i; the line index is built on first use
+        if self._line_starts is None:
+            starts = array(self.starts.typecode, [0])
+            find = self.source.find
+            nl = find('\n')
+            while nl != -1:
+                starts.append(nl + 1)
+                nl = find('\n', nl + 1)
+            self._line_starts = starts
+        offset = self.starts[i]
+        line = bisect_right(self._line_starts, offset)
+        return line, offset - self._line_starts[line - 1] + 1
+
+    def nbytes(self):
+        return sum(a.itemsize * len(a) for a in (self.kinds, self.starts, self.ends))
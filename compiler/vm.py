@@ -0,0 +1,183 @@
+import math
+import time
+from array import array
+
+from compiler.ir import DECLARE, COPY, ADD, SUB, MUL, DIV, TEMP_PREFIX, const_key
+from compiler.optimizer import convert, INT_MIN
+
+# Bytecode for the IR: four ints per instruction (opcode, dst, a, b) where operands are
+# slots of one value table. Constants are preloaded into slots after the names, and
+# opcodes are specialized by type, so the interpreter loop never inspects a value.
+(MOVE, IADD, ISUB, IMUL, IDIV, FADD, FSUB, FMUL, FDIV, I2F, F2I) = range(11)
+OPCODE_NAMES = ['MOVE', 'IADD', 'ISUB', 'IMUL', 'IDIV', 'FADD', 'FSUB', 'FMUL', 'FDIV', 'I2F', 'F2I']
+INT_OPCODES = {ADD: IADD, SUB: ISUB, MUL: IMUL, DIV: IDIV}
+FLOAT_OPCODES = {ADD: FADD, SUB: FSUB, MUL: FMUL, DIV: FDIV}
+
+INT_MAX = -INT_MIN - 1
+WIDTH = 2 ** 64
+
+
+class VMError(RuntimeError):
+    pass
+
+
+class Bytecode:
+    __slots__ = ('code', 'initial', 'names', 'variables')
+
+    def __init__(self, code, initial, names, variables):
+        self.code = code
+        self.initial = initial
+        self.names = names
+        self.variables = variables
+
+    def __len__(self):
+        return len(self.code) // 4
+
+    def nbytes(self):
+        return self.code.itemsize * len(self.code)
+
+    def __str__(self):
+        lines = []
+        code, names = self.code, self.names
+        for i in range(0, len(code), 4):
+            op, dst, a, b = code[i:i + 4]
+            operands = [names[dst], names[a]] if op in (MOVE, I2F, F2I) else [names[dst], names[a], names[b]]
+            lines.append(f"{OPCODE_NAMES[op]:5} {', '.join(operands)}")
+        return "\n".join(lines)
+
+
+class RunResult:
+    __slots__ = ('values', 'executed', 'seconds')
+
+    def __init__(self, values, executed, seconds):
+        self.values = values
+        self.executed = executed
+        self.seconds = seconds
+
+    def as_dict(self):
+        return {"instructions": self.executed, "seconds": self.seconds}
+
+    def __str__(self):
+        lines = [f"{name} = {value!r}" for name, value in self.values.items()]
+        lines.append(f"; executed {self.executed} instructions in {self.seconds * 1000:.3f} ms")
+        return "\n".join(lines)
+
+
+def assemble(ir):
+    # Lower IR to bytecode. Mixed-type operations get explicit I2F/F2I instructions into
+    # scratch slots, mirroring how the IR converts operands and results.
+    names = list(ir.names)
+    types = ir.types
+    initial = [0.0 if t == 'float' else 0 for t in types]
+    const_slots = {}
+    scratch = {}
+    code = array('i')
+    emit = code.extend
+
+    def const_slot(value):
+        key = const_key(value)
+        slot = const_slots.get(key)
+        if slot is None:
+            slot = const_slots[key] = len(initial)
+            initial.append(value)
+            names.append(repr(value))
+        return slot
+
+    def scratch_slot(type_name, k):
+        slot = scratch.get((type_name, k))
+        if slot is None:
+            slot = scratch[(type_name, k)] = len(initial)
+            initial.append(0.0 if type_name == 'float' else 0)
+            names.append(f"%{type_name[0]}{k}")
+        return slot
+
+    def operand(x, type_name, k):
+        # Slot holding x as type_name: constants are converted now, names at run time
+        if x < 0:
+            return const_slot(convert(ir.consts[-1 - x], type_name))
+        if (types[x] == 'float') == (type_name == 'float'):
+            return x
+        slot = scratch_slot(type_name, k)
+        emit((I2F if type_name == 'float' else F2I, slot, x, 0))
+        return slot
+
+    for op, dst, a, b in ir.instructions():
+        if op == DECLARE:
+            continue
+        is_float = types[dst] == 'float'
+        if op == COPY:
+            emit((MOVE, dst, operand(a, 'float' if is_float else 'int', 0), 0))
+            continue
+        result_type = ir.result_type(a, b)
+        x = operand(a, result_type, 0)
+        y = operand(b, result_type, 1)
+        opcode = (FLOAT_OPCODES if result_type == 'float' else INT_OPCODES)[op]
+        if (result_type == 'float') == is_float:
+            emit((opcode, dst, x, y))
+        else:
+            slot = scratch_slot(result_type, 2)
+            emit((opcode, slot, x, y))
+            emit((I2F if is_float else F2I, dst, slot, 0))
+    variables = [i for i, n in enumerate(ir.names) if not n.startswith(TEMP_PREFIX)]
+    return Bytecode(code, initial, names, variables)
+
+
+def execute(bytecode):
+    regs = list(bytecode.initial)
+    code = bytecode.code
+    start = time.perf_counter()
+    pc = 0
+    end = len(code)
+    while pc < end:
+        op = code[pc]
+        dst = code[pc + 1]
+        x = regs[code[pc + 2]]
+        if op == MOVE:
+            regs[dst] = x
+        elif op <= IDIV:
+            y = regs[code[pc + 3]]
+            if op == IADD:
+                r = x + y
+            elif op == ISUB:
+                r = x - y
+            elif op == IMUL:
+                r = x * y
+            else:
+                if y == 0:
+                    raise VMError(f"integer division by zero in {bytecode.names[dst]}")
+                if y == -1 and x == INT_MIN:
+                    # The quotient does not fit in int64; idiv traps on it like on a zero
+                    raise VMError(f"integer division overflow in {bytecode.names[dst]}")
+                # C++ division truncates toward zero
+                r = abs(x) // abs(y)
+                if (x < 0) != (y < 0):
+                    r = -r
+            if r < INT_MIN or r > INT_MAX:
+                r = (r - INT_MIN) % WIDTH + INT_MIN
+            regs[dst] = r
+        elif op <= FDIV:
+            y = regs[code[pc + 3]]
+            if op == FADD:
+                regs[dst] = x + y
+            elif op == FSUB:
+                regs[dst] = x - y
+            elif op == FMUL:
+                regs[dst] = x * y
+            elif y != 0:
+                regs[dst] = x / y
+            else:
+                # IEEE division by zero, which Python raises on
+                regs[dst] = math.nan if x == 0 or x != x else math.copysign(math.inf, x) * math.copysign(1.0, y)
+        elif op == I2F:
+            regs[dst] = float(x)
+        else:
+            regs[dst] = convert(x, 'int')
+        pc += 4
+    seconds = time.perf_counter() - start
+    names = bytecode.names
+    values = {names[i]: regs[i] for i in bytecode.variables}
+    return RunResult(values, pc // 4, seconds)
+
+
+def run(ir):
+    return execute(assemble(ir))
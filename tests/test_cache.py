@@ -0,0 +1,123 @@
+import os
+import pickle
+import zlib
+
+import pytest
+
+from compiler import pipeline
+from compiler.__main__ import main
+from compiler.cache import PhaseCache
+
+
+SOURCE = "int a = 1;\nint b = a + 2;\n"
+
+
+def test_store_then_load(tmp_path):
+    cache = PhaseCache(str(tmp_path / "cache"))
+    results = pipeline.compile_source(SOURCE)
+    assert cache.store(SOURCE, results)
+    loaded = cache.load(SOURCE, pipeline.PHASES)
+    assert str(loaded["target"]) == str(results["target"])
+    assert cache.stats()["hits"] == 1
+
+
+def test_store_into_a_file_is_skipped(tmp_path):
+    blocker = tmp_path / "cache"
+    blocker.write_text("not a directory")
+    cache = PhaseCache(str(blocker))
+    assert not cache.store(SOURCE, pipeline.compile_source(SOURCE))
+    assert cache.stats()["write_errors"] == 1
+    assert cache.load(SOURCE, pipeline.PHASES) is None
+
+
+def test_failed_write_leaves_no_temp_file(tmp_path, monkeypatch):
+    cache = PhaseCache(str(tmp_path / "cache"))
+
+    def fail(src, dst):
+        raise OSError(28, "No space left on device")
+
+    monkeypatch.setattr(os, "replace", fail)
+    assert not cache.store(SOURCE, pipeline.compile_source(SOURCE))
+    leftovers = [name for _, _, files in os.walk(tmp_path) for name in files if name.endswith(".tmp")]
+    assert leftovers == []
+
+
+def test_unwritable_cache_does_not_fail_the_compile(tmp_path):
+    source = tmp_path / "main.cpp"
+    source.write_text(SOURCE)
+    blocker = tmp_path / "cache"
+    blocker.write_text("not a directory")
+    code = main([str(source), "-j", "1", "--cache-dir", str(blocker), "-o", str(tmp_path / "out")])
+    assert code == 0
+    assert (tmp_path / "out" / "main.cpp" / "target.asm").exists()
+
+
+def disk_size(cache):
+    return sum(size for _, size, _ in cache.entries())
+
+
+def test_overwriting_an_entry_keeps_the_size_right(tmp_path):
+    cache = PhaseCache(str(tmp_path / "cache"))
+    results = pipeline.compile_source(SOURCE)
+    cache.store(SOURCE, results)
+    first = cache.size()
+    assert first == disk_size(cache)
+    for _ in range(3):
+        cache.store(SOURCE, results)
+    assert cache.size() == first == disk_size(cache)
+    other = "int z = 9;\n"
+    cache.store(other, pipeline.compile_source(other))
+    assert cache.size() == disk_size(cache) > first
+
+
+def test_overwrites_do_not_evict(tmp_path):
+    results = pipeline.compile_source(SOURCE)
+    probe = PhaseCache(str(tmp_path / "probe"))
+    probe.store(SOURCE, results)
+    # Room for one entry but not two
+    cache = PhaseCache(str(tmp_path / "cache"), max_bytes=probe.size() * 3 // 2)
+    for _ in range(5):
+        cache.store(SOURCE, results)
+    assert cache.evictions == 0
+    assert cache.load(SOURCE, pipeline.PHASES) is not None
+
+
+class Unloadable:
+    # Pickles to a call that fails when the pickle is loaded
+    def __init__(self, function, *args):
+        self.function = function
+        self.args = args
+
+    def __reduce__(self):
+        return self.function, self.args
+
+
+@pytest.mark.parametrize("data", [
+    # A class that no longer exists, and a module that no longer exists
+    zlib.compress(b"ccompiler.cache\nNoSuchClass\n."),
+    zlib.compress(b"cno_such_module_anywhere\nThing\n."),
+    # Constructors whose arguments no longer fit
+    zlib.compress(pickle.dumps(Unloadable(int, "not a number"))),
+    zlib.compress(pickle.dumps(Unloadable(len, 1, 2))),
+    # Damaged files
+    zlib.compress(b"\x80\x05garbage"),
+    b"not zlib at all",
+    b"",
+])
+def test_unloadable_entry_is_a_miss_and_removed(tmp_path, data):
+    cache = PhaseCache(str(tmp_path / "cache"))
+    results = pipeline.compile_source(SOURCE)
+    cache.store(SOURCE, results)
+    path = os.path.join(cache.entry_dir(cache.key(SOURCE)), "ir.bin")
+    with open(path, "wb") as f:
+        f.write(data)
+    cache._size = None
+    cache.size()
+    assert cache.load(SOURCE, pipeline.PHASES) is None
+    assert cache.stats()["misses"] == 1
+    assert not os.path.exists(path)
+    assert cache.size() == disk_size(cache)
+    # Phases that did load fine are still served, and a store repairs the entry
+    assert cache.load(SOURCE, ["tokens"]) is not None
+    cache.store(SOURCE, results)
+    assert str(cache.load(SOURCE, pipeline.PHASES)["ir"]) == str(results["ir"])
@@ -0,0 +1,161 @@
+import os
+import random
+import shutil
+import struct
+import subprocess
+
+import pytest
+
+from compiler import code_generator, intermediate_gen, lexer, optimizer, parser, vm
+from compiler.code_generator import VAR_PREFIX, linear_scan
+
+
+def lower(source):
+    return intermediate_gen.generate_ir(parser.Parser(lexer.tokenize_compact(source)).parse())
+
+
+def allocate(intervals, registers):
+    start = {name: begin for name, (begin, _) in intervals.items()}
+    end = {name: finish for name, (_, finish) in intervals.items()}
+    return linear_scan(list(intervals), start, end, registers)
+
+
+def test_disjoint_intervals_share_a_register():
+    location = allocate({0: (0, 2), 1: (3, 5), 2: (6, 9)}, ['r1', 'r2'])
+    assert location == {0: 'r1', 1: 'r1', 2: 'r1'}
+
+
+def test_overlapping_intervals_get_registers_in_list_order():
+    location = allocate({0: (0, 9), 1: (1, 4), 2: (2, 3)}, ['r1', 'r2', 'r3'])
+    assert location == {0: 'r1', 1: 'r2', 2: 'r3'}
+
+
+def test_freed_register_is_reused_lowest_first():
+    # 1 ends before 3 starts, so 3 gets 1's register back even though r3 is free too
+    location = allocate({0: (0, 9), 1: (1, 2), 2: (1, 8), 3: (4, 6)}, ['r1', 'r2', 'r3'])
+    assert location[3] == location[1] == 'r2'
+
+
+def test_spills_the_interval_that_ends_last():
+    # Three overlapping intervals and two registers: 0 ends last and loses its register
+    location = allocate({0: (0, 9), 1: (1, 5), 2: (2, 6)}, ['r1', 'r2'])
+    assert location == {1: 'r2', 2: 'r1'}
+
+
+def test_spills_the_new_interval_when_it_ends_last():
+    location = allocate({0: (0, 5), 1: (1, 6), 2: (2, 9)}, ['r1', 'r2'])
+    assert location == {0: 'r1', 1: 'r2'}
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_random_intervals_never_share_a_live_register(seed):
+    rng = random.Random(seed)
+    intervals = {}
+    for name in range(40):
+        begin = rng.randrange(100)
+        intervals[name] = (begin, begin + rng.randrange(30))
+    registers = ['r1', 'r2', 'r3', 'r4']
+    location = allocate(intervals, registers)
+    assert set(location.values()) <= set(registers)
+    for a in location:
+        for b in location:
+            if a < b and location[a] == location[b]:
+                (a_begin, a_end), (b_begin, b_end) = intervals[a], intervals[b]
+                assert a_end < b_begin or b_end < a_begin
+
+
+def pressure_program(count):
+    # The right operand nests, so the left product of every level is a temporary that
+    # stays live until the innermost level is done, and every variable stays live
+    # until the final statement
+    names = [f"v{i}" for i in range(count)]
+    lines = [f"int {name} = {i + 1};" for i, name in enumerate(names)]
+    expr = names[-1]
+    for name in reversed(names[:-1]):
+        expr = f"({name} * {name}) + ({expr})"
+    lines.append(f"int total = {expr};")
+    return "\n".join(lines) + "\n"
+
+
+def test_register_pressure_spills_temporaries_and_variables():
+    program = code_generator.generate_code(lower(pressure_program(30)))
+    assert len(program.registers) == len(code_generator.INT_REGISTERS)
+    assert program.spill_slots > 0
+    text = str(program)
+    assert "qword ptr [rbp - " in text
+    assert "qword ptr [rip + var_v" in text
+
+
+def random_program(rng, count):
+    # Many live names and long expressions, so both register files run out; divisors
+    # are nonzero constants so neither side traps
+    names = {}
+    lines = []
+    for i in range(count):
+        def operand():
+            if names and rng.random() < 0.8:
+                return rng.choice(sorted(names))
+            return str(rng.randint(1, 9))
+        expr = operand()
+        for _ in range(rng.randint(0, 8)):
+            op = rng.choice('+-*/')
+            if op == '/':
+                term = str(rng.randint(1, 9))
+            elif rng.random() < 0.2:
+                term = f"({expr})"
+            else:
+                term = operand()
+            expr = f"{expr} {op} {term}"
+        name = f"v{i % 11}" if rng.random() < 0.2 else f"n{i}"
+        type_name = rng.choice(("int", "float"))
+        lines.append(f"{type_name} {name} = {expr};")
+        names[name] = type_name
+    return "\n".join(lines) + "\n"
+
+
+def run_native(program, workdir):
+    # Assemble the program next to a C driver that prints every variable's 64 bits;
+    # the program's `main` is renamed so the driver can call it
+    text = str(program).replace("    .globl main\nmain:", "    .globl compiled_main\ncompiled_main:")
+    names = program.variables
+    driver = ["#include <stdio.h>", "int compiled_main(void);"]
+    driver += [f"extern unsigned long long {VAR_PREFIX}{name};" for name in names]
+    driver.append("int main(void) {\n    compiled_main();")
+    driver += [f'    printf("%llx\\n", {VAR_PREFIX}{name});' for name in names]
+    driver.append("    return 0;\n}")
+    with open(os.path.join(workdir, "program.s"), "w") as f:
+        f.write(text + "\n")
+    with open(os.path.join(workdir, "driver.c"), "w") as f:
+        f.write("\n".join(driver) + "\n")
+    binary = os.path.join(workdir, "program")
+    subprocess.run(["gcc", "-o", binary, os.path.join(workdir, "driver.c"), os.path.join(workdir, "program.s")],
+                   check=True, capture_output=True)
+    output = subprocess.run([binary], check=True, capture_output=True, text=True).stdout.split()
+    return dict(zip(names, (int(word, 16) for word in output)))
+
+
+def bits(value):
+    if isinstance(value, float):
+        return struct.unpack('<Q', struct.pack('<d', value))[0]
+    return value % 2 ** 64
+
+
+def assert_native_matches_vm(source, workdir):
+    # Unoptimized IR keeps every temporary, so it puts the most pressure on the registers
+    for program in (lower(source), optimizer.optimize(lower(source))):
+        expected = {name: bits(value) for name, value in vm.run(program).values.items()}
+        assert run_native(code_generator.generate_code(program), workdir) == expected
+
+
+needs_gcc = pytest.mark.skipif(shutil.which("gcc") is None, reason="needs gcc to assemble and link")
+
+
+@needs_gcc
+@pytest.mark.parametrize("seed", range(12))
+def test_native_code_matches_vm(seed, tmp_path):
+    assert_native_matches_vm(random_program(random.Random(seed), 60), str(tmp_path))
+
+
+@needs_gcc
+def test_native_code_with_spills_matches_vm(tmp_path):
+    assert_native_matches_vm(pressure_program(30), str(tmp_path))
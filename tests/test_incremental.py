@@ -0,0 +1,114 @@
+import random
+
+import pytest
+
+from compiler import intermediate_gen, lexer, parser, pipeline, vm
+from compiler.ast_nodes import occurrences
+from compiler.incremental import IncrementalCompiler, IRMerger, Statement, merge_ir, rebase, split_statements
+
+SOURCE = ("int a = 1;\nfloat b = a / 2;\nint c = b * 4 + a;\n"
+          "int a = c * 2;\nfloat d = (a + b) * (a + b);\nint e = d / 3 - c;\n")
+
+EDITS = [
+    # (description, edit function)
+    ("change a value", lambda s: s.replace("int a = 1;", "int a = 7;")),
+    ("retype a name", lambda s: s.replace("int c = b", "float c = b")),
+    ("insert a line", lambda s: s.replace("int a = c * 2;", "int x = 5;\nint a = c * 2;")),
+    ("shift a column", lambda s: s.replace("float b", "  float b")),
+    ("undeclared use", lambda s: s.replace("a / 2", "q / 2")),
+    ("redeclare", lambda s: s.replace("float d", "float e")),
+    ("delete a statement", lambda s: s.replace("int a = c * 2;\n", "")),
+    ("append", lambda s: s + "float f = e * e;\n"),
+]
+
+
+def snapshot(phases):
+    return {
+        "ast": repr(phases["ast"]),
+        "positions": [(n.line, n.column, occurrences(n)) for n in phases["ast"]],
+        "semantics": [repr(d) for d in phases["semantics"]],
+        "symbols": phases["semantics"].symbols,
+        "ir": str(phases["ir"]),
+        "types": list(phases["ir"].types),
+        "values": vm.run(phases["optimized"]).values,
+        "target": str(phases["target"]),
+    }
+
+
+def full(source):
+    return snapshot(dict(pipeline.iter_phases(source)))
+
+
+@pytest.mark.parametrize("description, edit", EDITS, ids=[d for d, _ in EDITS])
+def test_edit_matches_full_compile(description, edit):
+    compiler = IncrementalCompiler()
+    compiler.compile(SOURCE)
+    edited = edit(SOURCE)
+    assert snapshot(compiler.compile(edited)) == full(edited)
+    # and back again, resuming from the edited state
+    assert snapshot(compiler.compile(SOURCE)) == full(SOURCE)
+
+
+def test_random_edit_sequence_matches_full_compile():
+    rng = random.Random(5)
+    compiler = IncrementalCompiler()
+    source = SOURCE
+    for _ in range(30):
+        description, edit = rng.choice(EDITS)
+        edited = edit(source)
+        if rng.random() < 0.3:
+            edited = source
+        source = edited
+        assert snapshot(compiler.compile(source)) == full(source), description
+
+
+def test_older_results_are_not_changed():
+    compiler = IncrementalCompiler()
+    first = compiler.compile(SOURCE)
+    before = snapshot(first)
+    # Moving every statement down a line rebases all the cached nodes
+    compiler.compile("\n" + SOURCE.replace("int a = 1;", "int a = 2;"))
+    compiler.compile("  " + SOURCE)
+    assert snapshot(first) == before
+
+
+def test_unchanged_prefix_is_reused():
+    compiler = IncrementalCompiler()
+    compiler.compile(SOURCE)
+    nodes = list(compiler.checked)
+    compiler.compile(SOURCE + "int z = 1;\n")
+    assert compiler.stats['compiled'] == 1
+    assert all(a is b for a, b in zip(nodes, compiler.checked))
+
+
+def test_rebase_returns_a_moved_statement():
+    node = parser.Parser(lexer.tokenize_compact("int b = (a + 1) *\n (a + 1);")).parse()[0]
+    before = occurrences(node)
+    moved = rebase(node, (1, 1), (3, 5))
+    assert moved == node and moved is not node
+    assert moved.expr is node.expr
+    assert occurrences(node) == before
+    assert [(line, column) for _, line, column in before] == \
+        [(1, 10), (1, 14), (1, 12), (2, 3), (2, 7), (2, 5), (1, 17)]
+    assert [(line, column) for _, line, column in occurrences(moved)] == \
+        [(3, 14), (3, 18), (3, 16), (4, 3), (4, 7), (4, 5), (3, 21)]
+
+
+def test_merger_resumes_after_retyped_names():
+    def statements(source):
+        result = []
+        for text, line, column in split_statements(source):
+            statement = Statement(text, (line, column))
+            statement.ir = intermediate_gen.generate_ir(parser.Parser(lexer.tokenize_compact(text)).parse())
+            result.append(statement)
+        return result
+
+    old = statements("int a = 1;\nfloat a = 2;\nint b = a / 4;\n")
+    merger = IRMerger()
+    first = merger.merge(old)
+    first_text = str(first)
+    new = old[:1] + statements("int b = a / 4;\n")
+    merged = merger.merge(new)
+    assert str(merged) == str(merge_ir(new))
+    assert list(merged.types) == list(merge_ir(new).types)
+    assert str(first) == first_text
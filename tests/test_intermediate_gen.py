@@ -0,0 +1,108 @@
+import pickle
+
+import pytest
+
+from compiler import intermediate_gen, irfile, lexer, parser, pipeline, semantic_analyzer, vm
+from compiler.ast_nodes import BinOp, occurrences
+from compiler.incremental import IncrementalCompiler
+
+# Programs that repeat a subexpression across statements that reassign or convert it
+PROGRAMS = {
+    "float into int": "float five = 5;\nfloat f = five / 4;\nint a = f * 2;\nint b = (f * 2) * 2;\n",
+    "int into float": "int i = 7;\nfloat g = i / 2;\nint h = i / 2;\nfloat k = (i / 2) * 3 + i / 2;\n",
+    "redeclaration": "int a = 1;\nint b = (a + 1) * (a + 1);\nint a = 10;\nint c = (a + 1) * (a + 1);\n",
+    "redeclared type": "int x = 3;\nint y = x / 2 + x / 2;\nfloat x = 3;\nfloat z = x / 2 + x / 2;\n",
+    "self reference": "int a = 2;\nint a = a * a + a * a;\nint b = a * a;\n",
+}
+
+
+def parse(source):
+    return parser.Parser(lexer.tokenize_compact(source)).parse()
+
+
+def walk(node):
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(node.children())
+
+
+def values(program):
+    return {name: repr(value) for name, value in vm.run(program).values.items()}
+
+
+@pytest.mark.parametrize("name", sorted(PROGRAMS))
+def test_reused_subexpressions_match_plain_lowering(name):
+    ast = parse(PROGRAMS[name])
+    expected = intermediate_gen.generate_ir(ast)
+    for statement in ast:
+        for node in walk(statement):
+            node.nid = None
+    plain = intermediate_gen.generate_ir(ast)
+    assert values(expected) == values(plain)
+
+
+def test_float_expression_reused_in_int_statement():
+    result = values(intermediate_gen.generate_ir(parse(PROGRAMS["float into int"])))
+    assert result["a"] == "2"
+    assert result["b"] == "5"
+
+
+def test_repeated_subexpression_lowered_once_per_statement():
+    program = intermediate_gen.generate_ir(parse("int a = 3;\nint b = (a + 1) * (a + 1);\n"))
+    assert sum(1 for op in program.ops if op == intermediate_gen.BINARY_OPCODES['+']) == 1
+
+
+def test_equal_subexpressions_share_one_node_with_positions_per_occurrence():
+    (statement,) = parse("int b = (a + 1) * (a + 1);")
+    left, right = statement.expr.left, statement.expr.right
+    assert left is right
+    assert statement.expr.nid != left.nid
+    assert [(line, column) for _, line, column in occurrences(statement)] == \
+        [(1, 10), (1, 14), (1, 12), (1, 20), (1, 24), (1, 22), (1, 17)]
+
+
+def test_numbers_are_stable_across_parses_and_ast_files():
+    source = PROGRAMS["int into float"]
+    first = [node.nid for statement in parse(source) for node in walk(statement)]
+    second = [node.nid for statement in parse(source) for node in walk(statement)]
+    loaded = irfile.loads(irfile.dumps("ast", parse(source)))[1]
+    assert first == second == [node.nid for statement in loaded for node in walk(statement)]
+
+
+def test_float_and_int_constants_numbered_apart():
+    (statement,) = parse("float a = 1 + 1;")
+    assert statement.expr.left.nid == statement.expr.right.nid
+    program = intermediate_gen.generate_ir(parse("float a = 1;\nfloat b = a / 2 + 1 / 2;\n"))
+    assert values(program)["b"] == "0.5"
+
+
+def test_rebuilt_node_is_not_numbered():
+    (statement,) = parse("int a = 1 + 2;")
+    rebuilt = BinOp('+', statement.expr.left, statement.expr.right)
+    assert rebuilt.nid is None
+
+
+def test_each_undeclared_use_reported_at_its_own_position():
+    source = "int a = b + 1;\nint c = 2 * (b + 1);\n"
+    full = semantic_analyzer.analyze(parse(source))
+    positions = [(d.line, d.column) for d in full.errors]
+    assert positions == [(1, 9), (2, 14)]
+    incremental = dict(IncrementalCompiler().iter_phases(source))["semantics"]
+    assert [(d.line, d.column) for d in incremental.errors] == positions
+    assert [(d.line, d.column) for d in pipeline.compile_source(source)["semantics"].errors] == positions
+
+
+def test_nodes_shared_across_statements():
+    first, second = parse("int a = x * 2;\nint b = x;\n")
+    assert first.expr.left is second.expr
+    assert occurrences(second) == [(second.expr, 2, 9)]
+
+
+def test_pickled_ast_keeps_sharing_and_positions():
+    ast = parse(PROGRAMS["int into float"])
+    loaded = pickle.loads(pickle.dumps(ast))
+    assert loaded == ast
+    assert [occurrences(n) for n in loaded] == [occurrences(n) for n in ast]
+    assert loaded[3].expr.left.left is loaded[3].expr.right
@@ -0,0 +1,183 @@
+import random
+import struct
+
+import pytest
+
+from compiler import irfile, pipeline, vm
+from compiler.ast_nodes import occurrences
+from compiler.irfile import FormatError, HEADER, SECTION, INSTRUCTION, NAME, NODE
+
+SOURCE = "int a = 7;\nfloat b = a / 2;\nint c = (a + b) * (a - 3);\nint d = c * c + a;\n"
+
+
+def dumped(phase):
+    return bytearray(irfile.dumps(phase, pipeline.compile_source(SOURCE)[phase]))
+
+
+def section_offsets(data):
+    _, _, _, count, _ = HEADER.unpack_from(data)
+    return [SECTION.unpack_from(data, HEADER.size + i * SECTION.size) for i in range(count)]
+
+
+def test_ir_round_trip():
+    program = pipeline.compile_source(SOURCE)["ir"]
+    phase, loaded = irfile.loads(irfile.dumps("ir", program))
+    assert phase == "ir"
+    assert str(loaded) == str(program)
+    assert str(vm.run(loaded)).splitlines()[:4] == str(vm.run(program)).splitlines()[:4]
+
+
+def test_ast_round_trip():
+    ast = pipeline.compile_source(SOURCE)["ast"]
+    phase, loaded = irfile.loads(irfile.dumps("ast", ast))
+    assert phase == "ast"
+    assert loaded == ast
+    assert [(n.line, n.column) for n in loaded] == [(n.line, n.column) for n in ast]
+    assert [occurrences(n) for n in loaded] == [occurrences(n) for n in ast]
+    # Shared subexpressions come back shared, with the parser's numbers
+    assert loaded[3].expr.left.left is loaded[3].expr.left.right
+    assert [n.expr.nid for n in loaded] == [n.expr.nid for n in ast]
+
+
+@pytest.mark.parametrize("phase", ["ast", "ir"])
+def test_truncated_files_are_rejected(phase):
+    data = bytes(dumped(phase))
+    for length in range(len(data)):
+        with pytest.raises(FormatError):
+            irfile.loads(data[:length])
+
+
+@pytest.mark.parametrize("phase", ["ast", "ir", "optimized"])
+def test_random_corruption_raises_only_format_error(phase):
+    original = dumped(phase)
+    rng = random.Random(phase)
+    for _ in range(2000):
+        data = bytearray(original)
+        for _ in range(rng.randint(1, 4)):
+            data[rng.randrange(len(data))] = rng.randrange(256)
+        try:
+            loaded_phase, value = irfile.loads(bytes(data))
+        except FormatError:
+            continue
+        # Whatever loads must also run and compile; an AST goes through the middle end first
+        phases = dict(pipeline.resume_phases(loaded_phase, value))
+        for program in (phases.get("ir"), phases["optimized"]):
+            if program is None:
+                continue
+            try:
+                vm.run(program)
+            except vm.VMError:
+                pass
+
+
+def test_invalid_utf8_in_string_table():
+    data = dumped("ir")
+    strings_offset, count = section_offsets(data)[0]
+    blob = strings_offset + 4 * (count + 1)
+    data[blob] = 0xff
+    with pytest.raises(FormatError):
+        irfile.loads(bytes(data))
+
+
+def test_string_table_running_past_the_end():
+    data = dumped("ir")
+    strings_offset, count = section_offsets(data)[0]
+    struct.pack_into('<I', data, strings_offset + 4 * count, 1 << 30)
+    with pytest.raises(FormatError):
+        irfile.loads(bytes(data))
+
+
+def patch_instruction(data, field, value):
+    code_offset, _ = section_offsets(data)[3]
+    struct.pack_into('<i', data, code_offset + INSTRUCTION.size + 4 * field, value)
+
+
+def test_unknown_opcode():
+    data = dumped("ir")
+    patch_instruction(data, 0, 42)
+    with pytest.raises(FormatError, match="opcode"):
+        irfile.loads(bytes(data))
+
+
+def test_destination_out_of_range():
+    data = dumped("ir")
+    patch_instruction(data, 1, 1000)
+    with pytest.raises(FormatError, match="destination"):
+        irfile.loads(bytes(data))
+
+
+def test_operand_out_of_range():
+    data = dumped("ir")
+    patch_instruction(data, 2, -1000)
+    with pytest.raises(FormatError, match="operand"):
+        irfile.loads(bytes(data))
+
+
+def test_unknown_type_name():
+    data = dumped("ir")
+    (strings_offset, _), (names_offset, _) = section_offsets(data)[:2]
+    # Point the first name's type at its own name string
+    name_id, _ = NAME.unpack_from(data, names_offset)
+    NAME.pack_into(data, names_offset, name_id, name_id)
+    with pytest.raises(FormatError, match="unknown type"):
+        irfile.loads(bytes(data))
+
+
+@pytest.mark.parametrize("old, new, message", [
+    (b"Var", b"Foo", "unknown node class"),
+    (b"int", b"str", "unknown type"),
+])
+def test_bad_node_strings(old, new, message):
+    data = dumped("ast")
+    data[data.index(old):data.index(old) + 3] = new
+    with pytest.raises(FormatError, match=message):
+        irfile.loads(bytes(data))
+
+
+def node_records(data, class_name):
+    # Offsets of the records of one node class in an AST file
+    (strings_offset, string_count), (nodes_offset, node_count) = section_offsets(data)[:2]
+    strings = irfile.read_strings(memoryview(bytes(data)), strings_offset, string_count)
+    offsets = (nodes_offset + i * NODE.size for i in range(node_count))
+    return [(offset - nodes_offset) // NODE.size for offset in offsets
+            if strings[NODE.unpack_from(data, offset)[0]] == class_name]
+
+
+def patch_node(data, index, field, tag, raw):
+    offset = section_offsets(data)[1][0] + index * NODE.size
+    record = list(NODE.unpack_from(data, offset))
+    record[3 + field], record[3 + irfile.MAX_FIELDS + field] = tag, raw
+    NODE.pack_into(data, offset, *record)
+
+
+@pytest.mark.parametrize("class_name, field, tag, raw, message", [
+    ("BinOp", 0, irfile.INT, 1, "unknown operator"),
+    ("Num", 0, irfile.STRING, 0, "number has a str value"),
+    ("Num", 0, irfile.NONE, 0, "number has a NoneType value"),
+    ("Var", 0, irfile.INT, 3, "variable name is a int"),
+    ("Declare", 1, irfile.FLOAT, 0, "declared name is a float"),
+    ("Declare", 0, irfile.INT, 0, "unknown type"),
+    ("BinOp", 1, irfile.INT, 0, "expected an expression"),
+    ("Declare", 2, irfile.NONE, 0, "expected an expression"),
+])
+def test_bad_node_fields(class_name, field, tag, raw, message):
+    data = dumped("ast")
+    patch_node(data, node_records(data, class_name)[0], field, tag, raw)
+    with pytest.raises(FormatError, match=message):
+        irfile.loads(bytes(data))
+
+
+def test_statement_used_as_an_expression():
+    data = dumped("ast")
+    first, second = node_records(data, "Declare")[:2]
+    patch_node(data, second, 2, irfile.NODE_REF, first)
+    with pytest.raises(FormatError, match="child is a Declare"):
+        irfile.loads(bytes(data))
+
+
+def test_loaded_root_must_be_a_statement():
+    data = dumped("ast")
+    roots_offset, _ = section_offsets(data)[2]
+    struct.pack_into('<I', data, roots_offset, 0)
+    with pytest.raises(FormatError, match="expected a Declare"):
+        irfile.loads(bytes(data))
@@ -0,0 +1,85 @@
+import pickle
+import random
+
+import pytest
+
+from compiler import lexer
+from compiler.lexer import LexError
+
+SOURCES = [
+    "",
+    "int a = 1;",
+    "float f = a / 2;\nint b = (f + 3) * f - 7;\n",
+    "int\tx=1;int y=x*x;",
+    "intx = int_y + floaty;",
+    "int a = 123abc;",
+    "  \n\n  int a = 0;\n\t\n",
+    "int a = 00042;",
+    # Unicode letters and digits are word and digit characters to both engines
+    "int café = ٣ + 1;",
+]
+
+ERRORS = [
+    ("int a = 1 $ 2;", ('$', 1, 11)),
+    ("int a = 1;\n  int b = a # 2;", ('#', 2, 13)),
+    ("int a = 1;\r\n", ('\r', 1, 11)),
+    ("int a = 1.5;", ('.', 1, 10)),
+    ("@", ('@', 1, 1)),
+]
+
+ALPHABET = "ab_z09 \t\n=;+-*/()intfloat$.#\r"
+
+
+def lex(tokenize, source):
+    # Tokens, or the error's fields when lexing fails
+    try:
+        return list(tokenize(source))
+    except LexError as e:
+        return (e.value, e.line, e.column)
+
+
+@pytest.mark.parametrize("source", SOURCES)
+def test_fast_lexer_matches_reference(source):
+    expected = lexer.tokenize_regex(source)
+    assert lexer.tokenize(source) == expected
+    assert list(lexer.tokenize_compact(source)) == expected
+    assert [token[:2] for token in lexer.iter_tokens(source)] == expected
+
+
+@pytest.mark.parametrize("source, error", ERRORS)
+def test_errors_match_reference(source, error):
+    for tokenize in (lexer.tokenize_regex, lexer.tokenize, lexer.tokenize_compact, lexer.iter_tokens):
+        assert lex(tokenize, source) == error, tokenize.__name__
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_random_sources_match_reference(seed):
+    rng = random.Random(seed)
+    for _ in range(200):
+        source = "".join(rng.choice(ALPHABET) for _ in range(rng.randrange(40)))
+        expected = lex(lexer.tokenize_regex, source)
+        assert lex(lexer.tokenize, source) == expected, source
+        assert lex(lexer.tokenize_compact, source) == expected, source
+        streamed = lex(lexer.iter_tokens, source)
+        if isinstance(streamed, list):
+            streamed = [token[:2] for token in streamed]
+        assert streamed == expected, source
+
+
+def test_keywords_and_numbers():
+    tokens = lexer.tokenize("float x = 10 * int_;")
+    assert tokens == [('TYPE', 'float'), ('ID', 'x'), ('ASSIGN', '='), ('NUMBER', 10),
+                      ('OP', '*'), ('ID', 'int_'), ('SEMI', ';'), ('EOF', None)]
+
+
+def test_positions_match_streaming_lexer():
+    source = "int a = 1;\n  float b =\n a * 2;"
+    buffer = lexer.tokenize_compact(source)
+    assert [buffer.position(i) for i in range(len(buffer))] == \
+        [(token.line, token.column) for token in lexer.iter_tokens(source)]
+
+
+def test_lex_error_survives_pickling():
+    error = pickle.loads(pickle.dumps(LexError('$', 3, 7)))
+    assert (error.value, error.line, error.column, str(error)) == \
+        ('$', 3, 7, "Unexpected character '$' (line 3, column 7)")
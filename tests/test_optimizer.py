@@ -0,0 +1,86 @@
+import random
+
+import pytest
+
+from compiler import intermediate_gen, lexer, optimizer, parser, vm
+from compiler.optimizer import (PassManager, fold_constants, simplify_algebra, propagate_copies,
+                                eliminate_common_subexpressions, eliminate_dead_code)
+
+PASSES = [fold_constants, simplify_algebra, propagate_copies, eliminate_common_subexpressions, eliminate_dead_code]
+
+PROGRAMS = {
+    "folding": "int a = 2 + 3 * 4;\nfloat b = a / 4;\nint c = b * 3;\nint d = 7 / 2 - 9 / 4;\n",
+    "algebra": "int a = 5;\nint b = a * 1 + 0;\nint c = b - 0;\nint d = c * 0 + a;\nfloat e = d / 1;\n",
+    "copies": "int a = 3;\nint b = a;\nint c = b;\nfloat d = c;\nint e = d * 2 + c;\n",
+    "common subexpressions": "int a = 3;\nint b = 4;\nint c = (a + b) * (a + b);\nint d = (a + b) * 2 + (a + b) * 2;\n",
+    "redeclaration": "int a = 1;\nint b = a + 1;\nint a = 10;\nint c = a + 1;\nint d = b + c;\n",
+    "mixed types": "float f = 5;\nfloat g = f / 4;\nint a = g * 2;\nint b = (g * 2) * 2;\nfloat h = a / 3;\n",
+    "overflow": "int a = 3037000500;\nint b = a * a;\nint c = b * 4 + b;\n",
+    "negative division": "int a = 0 - 7;\nint b = a / 2;\nint c = 7 / (0 - 2);\nfloat d = a / 2;\n",
+}
+
+
+def lower(source):
+    return intermediate_gen.generate_ir(parser.Parser(lexer.tokenize_compact(source)).parse())
+
+
+def values(program):
+    # repr keeps 0.0 and -0.0 (and NaN) distinguishable
+    return {name: repr(value) for name, value in vm.run(program).values.items()}
+
+
+def assert_same_result(source, passes=None):
+    expected = values(lower(source))
+    program = PassManager(passes).run(lower(source))
+    assert values(program) == expected
+
+
+@pytest.mark.parametrize("name", sorted(PROGRAMS))
+def test_optimize_preserves_results(name):
+    assert_same_result(PROGRAMS[name])
+
+
+@pytest.mark.parametrize("single", PASSES, ids=[p.__name__ for p in PASSES])
+@pytest.mark.parametrize("name", sorted(PROGRAMS))
+def test_each_pass_alone_preserves_results(single, name):
+    assert_same_result(PROGRAMS[name], [single])
+
+
+def test_optimize_shrinks_constant_program():
+    program = optimizer.optimize(lower(PROGRAMS["folding"]))
+    assert len(program) < len(lower(PROGRAMS["folding"]))
+    assert [s.name for s in program.pass_stats] == [p.__name__ for p in PASSES]
+
+
+def random_program(rng, statements):
+    declared = []
+    lines = []
+    for i in range(statements):
+        def operand():
+            if declared and rng.random() < 0.6:
+                return rng.choice(declared)
+            return str(rng.choice([0, 1, 2, 3, 4, 7, 16, 1000]))
+
+        terms = [operand()]
+        for _ in range(rng.randint(0, 5)):
+            op = rng.choice("+-*/")
+            term = operand()
+            if op == "/" and rng.random() < 0.5:
+                term = f"({term} + 1)"
+            if rng.random() < 0.3:
+                term = f"({term} {rng.choice('+-*')} {operand()})"
+            terms.append(f" {op} {term}")
+        name = rng.choice(declared) if declared and rng.random() < 0.1 else f"v{i}"
+        lines.append(f"{rng.choice(['int', 'float'])} {name} = {''.join(terms)};")
+        declared.append(name)
+    return "\n".join(lines) + "\n"
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_random_programs(seed):
+    source = random_program(random.Random(seed), 25)
+    try:
+        expected = values(lower(source))
+    except vm.VMError:
+        pytest.skip("the unoptimized program divides by zero")
+    assert values(optimizer.optimize(lower(source))) == expected
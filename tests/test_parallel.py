@@ -0,0 +1,155 @@
+import random
+
+import pytest
+
+from compiler import intermediate_gen, lexer, parser, pipeline, vm
+from compiler.incremental import Statement, merge_ir, split_statements
+from compiler.parallel import ParallelCompiler, split_chunks
+
+MIXED = "float five = 5; float f = five / 4;\nint a = f * 2; int b = (f * 2) * 2;\n"
+
+
+def random_program(rng, count):
+    names = {}
+    lines = []
+    for i in range(count):
+        def operand():
+            if names and rng.random() < 0.7:
+                return rng.choice(sorted(names))
+            return str(rng.randint(1, 9))
+        expr = operand()
+        for _ in range(rng.randint(0, 3)):
+            op = rng.choice('+-*/')
+            if op == '/':
+                # Constant divisors, so few programs trap on a zero
+                term = str(rng.randint(1, 9))
+            elif rng.random() < 0.3:
+                # Repeat the expression so far, as a shared subexpression
+                term = f"({expr})"
+            else:
+                term = operand()
+            expr = f"{expr} {op} {term}"
+        name = f"v{i % 7}" if rng.random() < 0.2 else f"n{i}"
+        type_name = rng.choice(("int", "float"))
+        lines.append(f"{type_name} {name} = {expr};")
+        names[name] = type_name
+    return "\n".join(lines) + "\n"
+
+
+def results(phases):
+    # repr keeps 0.0 and -0.0 apart
+    return {phase: {name: repr(value) for name, value in vm.run(phases[phase]).values.items()}
+            for phase in ("ir", "optimized")}
+
+
+def serial(source):
+    return dict(pipeline.iter_phases(source))
+
+
+def parallel(source, chunk_size, workers=1):
+    compiler = ParallelCompiler(workers, chunk_size)
+    try:
+        return compiler.compile(source)
+    finally:
+        compiler.close()
+
+
+def test_split_chunks_positions():
+    code = "int a = 1;\nint b = 2; int c = 3;\nint d = 4;"
+    chunks = list(split_chunks(code, 5))
+    assert "".join(text for text, _ in chunks) == code
+    assert [base for _, base in chunks] == [(1, 1), (1, 11), (2, 11), (2, 22)]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 15, 30, 1000])
+def test_mixed_types_across_chunks(chunk_size):
+    expected = serial(MIXED)
+    got = parallel(MIXED, chunk_size)
+    assert results(got) == results(expected)
+    assert results(got)["ir"]["b"] == "5"
+    assert str(got["semantics"]) == str(expected["semantics"])
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_random_programs_match_serial(seed):
+    rng = random.Random(seed)
+    source = random_program(rng, 40)
+    expected = serial(source)
+    try:
+        values = results(expected)
+    except vm.VMError:
+        pytest.skip("program traps (division by zero)")
+    for chunk_size in (1, rng.randint(2, 60), 200):
+        got = parallel(source, chunk_size)
+        assert results(got) == values
+        assert got["ast"] == expected["ast"]
+        assert [(d.line, d.column) for d in got["semantics"]] == \
+               [(d.line, d.column) for d in expected["semantics"]]
+
+
+def test_worker_processes_match_serial():
+    source = random_program(random.Random(99), 60)
+    expected = serial(source)
+    got = parallel(source, 40, workers=2)
+    assert results(got) == results(expected)
+    assert [(n.line, n.column) for n in got["ast"]] == [(n.line, n.column) for n in expected["ast"]]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_syntax_error_in_later_chunk(workers):
+    source = "int a = 1;\nint b = a + 2;\nint c = (b * ;\nint d = 4;\n"
+    with pytest.raises(SyntaxError) as serial_error:
+        serial(source)
+    compiler = ParallelCompiler(workers, 10)
+    try:
+        phases = compiler.iter_phases(source)
+        phase, _ = next(phases)
+        assert phase == "tokens"
+        with pytest.raises(SyntaxError) as error:
+            next(phases)
+    finally:
+        compiler.close()
+    assert (error.value.lineno, error.value.offset) == (serial_error.value.lineno, serial_error.value.offset) == (3, 14)
+    assert error.value.msg == serial_error.value.msg
+
+
+def test_first_syntax_error_in_source_order_wins():
+    source = "int a = 1;\nint b = ;\nint c = 3;\nint d = );\n"
+    with pytest.raises(SyntaxError) as error:
+        parallel(source, 5)
+    assert error.value.lineno == 2
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_lex_error_in_later_chunk(workers):
+    source = "int a = 1;\nint b = (a;\nint c = 2 $ 3;\n"
+    with pytest.raises(lexer.LexError) as serial_error:
+        serial(source)
+    compiler = ParallelCompiler(workers, 5)
+    try:
+        with pytest.raises(lexer.LexError) as error:
+            next(compiler.iter_phases(source))
+    finally:
+        compiler.close()
+    assert str(error.value) == str(serial_error.value)
+    assert (error.value.line, error.value.column) == (3, 11)
+
+
+def test_phase_seconds_recorded():
+    compiler = ParallelCompiler(1, 20)
+    compiler.compile(MIXED)
+    assert compiler.stats['chunks'] == 3
+    assert set(compiler.stats['seconds']) == {"tokens", "ast", "ir"}
+
+
+def test_merge_ir_retypes_temporaries():
+    statements = []
+    for text, line, column in split_statements(MIXED):
+        statement = Statement(text, (line, column))
+        statement.ir = intermediate_gen.generate_ir(parser.Parser(lexer.tokenize_compact(text)).parse())
+        statements.append(statement)
+    merged = merge_ir(statements)
+    whole = intermediate_gen.generate_ir(parser.Parser(lexer.tokenize_compact(MIXED)).parse())
+    assert vm.run(merged).values == vm.run(whole).values
+    assert merged.temp_count == whole.temp_count
+    assert [merged.types[dst] for dst in merged.dsts] == [whole.types[dst] for dst in whole.dsts]
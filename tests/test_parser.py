@@ -0,0 +1,180 @@
+import random
+
+import pytest
+
+from compiler import lexer, parser
+from compiler.ast_nodes import BinOp, Declare, Num, Var
+
+
+def parse(source, tokenize=lexer.tokenize_compact):
+    return parser.Parser(tokenize(source)).parse()
+
+
+def expression(source):
+    (statement,) = parse(f"int x = {source};")
+    return render(statement.expr)
+
+
+def render(node):
+    # Fully parenthesized text of an expression, built without recursion
+    parts = []
+    stack = [node]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            parts.append(item)
+        elif item.__class__ is BinOp:
+            stack.extend([")", item.right, f" {item.op} ", item.left, "("])
+        elif item.__class__ is Num:
+            parts.append(str(item.value))
+        else:
+            parts.append(item.name)
+    return "".join(parts)
+
+
+def reference(tokens):
+    # Recursive descent over expression -> term -> factor, the grammar the parser's
+    # operator stacks stand in for; returns the rendered tree
+    pos = 0
+
+    def factor():
+        nonlocal pos
+        kind, value = tokens[pos]
+        pos += 1
+        if kind == 'LPAREN':
+            inner = expression()
+            pos += 1
+            return inner
+        return str(value)
+
+    def level(operand, operators):
+        nonlocal pos
+        left = operand()
+        while tokens[pos][0] == 'OP' and tokens[pos][1] in operators:
+            op = tokens[pos][1]
+            pos += 1
+            left = f"({left} {op} {operand()})"
+        return left
+
+    def term():
+        return level(factor, '*/')
+
+    def expression():
+        return level(term, '+-')
+
+    return expression()
+
+
+@pytest.mark.parametrize("source, expected", [
+    ("1 + 2 * 3", "(1 + (2 * 3))"),
+    ("1 * 2 + 3", "((1 * 2) + 3)"),
+    ("a - b / c * d + e", "((a - ((b / c) * d)) + e)"),
+    ("(1 + 2) * 3", "((1 + 2) * 3)"),
+    ("a * (b + c) / d", "((a * (b + c)) / d)"),
+    ("((a))", "a"),
+])
+def test_precedence(source, expected):
+    assert expression(source) == expected
+
+
+@pytest.mark.parametrize("source, expected", [
+    ("a - b - c", "((a - b) - c)"),
+    ("a / b / c", "((a / b) / c)"),
+    ("a - b + c - d", "(((a - b) + c) - d)"),
+    ("a / b * c / d", "(((a / b) * c) / d)"),
+    ("a - (b - c)", "(a - (b - c))"),
+])
+def test_left_associativity(source, expected):
+    assert expression(source) == expected
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_random_expressions_match_recursive_descent(seed):
+    rng = random.Random(seed)
+
+    def build(depth):
+        if depth == 0 or rng.random() < 0.3:
+            return rng.choice(["a", "b", "1", "2", "37"])
+        text = build(depth - 1)
+        for _ in range(rng.randint(1, 3)):
+            text += f" {rng.choice('+-*/')} {build(depth - 1)}"
+        return f"({text})" if rng.random() < 0.4 else text
+
+    source = build(5)
+    tokens = lexer.tokenize(f"{source};")
+    assert expression(source) == reference(tokens)
+
+
+def test_deep_nesting_does_not_recurse():
+    depth = 50000
+    (statement,) = parse("int x = " + "(" * depth + "1" + ")" * depth + ";")
+    assert statement.expr == Num(1)
+    # A long right-nested chain builds a tree as deep as the chain
+    chain = "int x = " + "a - (" * depth + "a" + ")" * depth + ";"
+    (statement,) = parse(chain)
+    node, levels = statement.expr, 0
+    while node.__class__ is BinOp:
+        node, levels = node.right, levels + 1
+    assert levels == depth
+    assert repr(statement).count("BinOp") == depth
+    assert statement == parse(chain)[0]
+
+
+def test_long_chain():
+    (statement,) = parse("int x = " + " + ".join(["1"] * 100000) + ";")
+    node, levels = statement.expr, 0
+    while node.__class__ is BinOp:
+        node, levels = node.left, levels + 1
+    assert levels == 99999
+
+
+def test_statements_and_positions():
+    statements = parse("int a = 1;\n  float b = a * 2;")
+    assert statements == [Declare('int', 'a', Num(1)), Declare('float', 'b', BinOp('*', Var('a'), Num(2)))]
+    assert [(s.line, s.column) for s in statements] == [(1, 1), (2, 3)]
+
+
+def test_token_sources_build_the_same_tree():
+    source = "int a = 1;\nfloat b = (a + 2) * a / 3;\n"
+    compact = parse(source)
+    assert parse(source, lexer.tokenize) == compact
+    assert parse(source, lexer.iter_tokens) == compact
+    assert [(s.line, s.column) for s in parse(source, lexer.iter_tokens)] == [(s.line, s.column) for s in compact]
+
+
+ERRORS = [
+    ("int a = ;", "Unexpected token: SEMI ';'", (1, 9)),
+    ("int a = 1 +;", "Unexpected token: SEMI ';'", (1, 12)),
+    ("int a = (1 + 2;", "Expected RPAREN, got SEMI ';'", (1, 15)),
+    ("int a = 1 + 2);", "Expected SEMI, got RPAREN ')'", (1, 14)),
+    ("int a = 1\nint b = 2;", "Expected SEMI, got TYPE 'int'", (2, 1)),
+    ("int = 1;", "Expected ID, got ASSIGN '='", (1, 5)),
+    ("int a 1;", "Expected ASSIGN, got NUMBER 1", (1, 7)),
+    ("a = 1;", "Invalid statement start: ID 'a'", (1, 1)),
+    ("int a = 1;\n\n   float b = (a * ", "Unexpected token: EOF", (3, 19)),
+    ("int a = 1 2;", "Expected SEMI, got NUMBER 2", (1, 11)),
+]
+
+
+@pytest.mark.parametrize("source, message, position", ERRORS, ids=[e[1] for e in ERRORS])
+def test_error_messages_and_positions(source, message, position):
+    for tokenize in (lexer.tokenize_compact, lexer.iter_tokens):
+        with pytest.raises(SyntaxError) as error:
+            parse(source, tokenize)
+        assert error.value.msg == message
+        assert (error.value.lineno, error.value.offset) == position, tokenize.__name__
+
+
+def test_plain_tokens_give_errors_without_positions():
+    with pytest.raises(SyntaxError) as error:
+        parse("int a = ;", lexer.tokenize)
+    assert error.value.msg == "Unexpected token: SEMI ';'"
+    assert error.value.lineno is None
+
+
+def test_iter_parse_yields_statements_before_an_error():
+    statements = parser.Parser(lexer.tokenize_compact("int a = 1;\nint b = 2;\nint c = ;")).iter_parse()
+    assert next(statements).name == "a"
+    assert next(statements).name == "b"
+    with pytest.raises(SyntaxError):
+        next(statements)
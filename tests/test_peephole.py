@@ -0,0 +1,122 @@
+import pytest
+
+from compiler import code_generator, intermediate_gen, lexer, parser, peephole
+from compiler.code_generator import AsmProgram, Instr
+
+M = "qword ptr [rip + var_a]"
+N = "qword ptr [rip + var_b]"
+SLOT = "qword ptr [rbp - 8]"
+
+
+def optimize(*code, rules=None):
+    program = AsmProgram(list(code), [], {}, 0, [])
+    return peephole.Peephole(rules).run(program)
+
+
+def hits(program):
+    return {s.name: s.hits for s in program.peephole_stats if s.hits}
+
+
+# (rule, input, expected output); each rule has one case it rewrites and at least one
+# it must leave alone
+CASES = [
+    ("self_move", [Instr('mov', 'rcx', 'rcx')], []),
+    ("self_move", [Instr('movsd', 'xmm2', 'xmm2')], []),
+    ("self_move", [Instr('mov', 'rcx', 'rsi')], None),
+
+    ("identity_operation", [Instr('add', 'rcx', '0'), Instr('imul', 'rsi', 'rsi', '1')], []),
+    ("identity_operation", [Instr('sub', 'rcx', '1')], None),
+    ("identity_operation", [Instr('imul', 'rsi', 'rcx', '1')], None),
+
+    ("multiply_by_power_of_two", [Instr('imul', 'rcx', 'rcx', '8')], [Instr('shl', 'rcx', '3')]),
+    ("multiply_by_power_of_two", [Instr('imul', 'rcx', 'rcx', '6')], None),
+    ("multiply_by_power_of_two", [Instr('imul', 'rcx', 'rsi', '8')], None),
+
+    ("redundant_load", [Instr('mov', M, 'rcx'), Instr('mov', 'rcx', M)], [Instr('mov', M, 'rcx')]),
+    # rcx changes between the store and the load
+    ("redundant_load", [Instr('mov', M, 'rcx'), Instr('add', 'rcx', 'rsi'), Instr('mov', 'rcx', M)], None),
+    # M is overwritten in between
+    ("redundant_load", [Instr('mov', M, 'rcx'), Instr('mov', M, 'rsi'), Instr('mov', 'rcx', M)], None),
+
+    ("redundant_store", [Instr('mov', 'rcx', M), Instr('mov', M, 'rcx')], [Instr('mov', 'rcx', M)]),
+    ("redundant_store", [Instr('mov', 'rcx', M), Instr('imul', 'rcx', 'rcx', '3'), Instr('mov', M, 'rcx')], None),
+    ("redundant_store", [Instr('movsd', 'xmm2', M), Instr('mov', M, 'xmm2')], None),
+
+    ("dead_move", [Instr('mov', 'rcx', M), Instr('mov', 'rcx', 'rsi')], [Instr('mov', 'rcx', 'rsi')]),
+    # The second instruction reads rcx
+    ("dead_move", [Instr('mov', 'rcx', M), Instr('add', 'rcx', 'rsi')], None),
+    ("dead_move", [Instr('mov', 'rcx', M), Instr('imul', 'rcx', 'rcx', '3')], None),
+    # rcx is read in between
+    ("dead_move", [Instr('mov', 'rcx', M), Instr('mov', 'rsi', 'rcx'), Instr('mov', 'rcx', N)], None),
+    # A store to memory is never dead
+    ("dead_move", [Instr('mov', SLOT, 'rcx'), Instr('mov', SLOT, 'rsi')], None),
+
+    ("repeated_move", [Instr('mov', 'rcx', M), Instr('mov', 'rsi', N), Instr('mov', 'rcx', M)],
+     [Instr('mov', 'rcx', M), Instr('mov', 'rsi', N)]),
+    # rcx changes in between
+    ("repeated_move", [Instr('mov', 'rcx', M), Instr('add', 'rcx', 'rsi'), Instr('mov', 'rcx', M)], None),
+    # M changes in between
+    ("repeated_move", [Instr('mov', 'rcx', M), Instr('mov', M, 'rsi'), Instr('mov', 'rcx', M)], None),
+]
+
+
+@pytest.mark.parametrize("name, code, expected", CASES, ids=[f"{c[0]}-{i}" for i, c in enumerate(CASES)])
+def test_rule(name, code, expected):
+    program = optimize(*code)
+    if expected is None:
+        assert program.code == code
+        assert hits(program) == {}
+    else:
+        assert program.code == expected
+        assert set(hits(program)) == {name}
+
+
+def test_every_rule_has_a_case():
+    assert {name for name, _, _ in CASES} == {rule.__name__ for rule, _ in peephole.RULES}
+
+
+def test_rules_can_be_selected():
+    code = [Instr('mov', 'rcx', 'rcx'), Instr('imul', 'rcx', 'rcx', '4')]
+    program = optimize(*code, rules=[(peephole.multiply_by_power_of_two, 1)])
+    assert program.code == [Instr('mov', 'rcx', 'rcx'), Instr('shl', 'rcx', '2')]
+    assert [s.name for s in program.peephole_stats] == ['multiply_by_power_of_two']
+
+
+def test_rewrite_is_matched_again_against_earlier_instructions():
+    # Dropping `add rcx, 0` brings the store and the load together
+    code = [Instr('mov', M, 'rcx'), Instr('add', 'rcx', '0'), Instr('mov', 'rcx', M)]
+    program = optimize(*code)
+    assert program.code == [Instr('mov', M, 'rcx')]
+    assert hits(program) == {'identity_operation': 1, 'redundant_load': 1}
+
+
+def test_stats_count_hits_and_removed_instructions():
+    code = [
+        Instr('mov', 'rcx', 'rcx'),
+        Instr('mov', 'rsi', 'rsi'),
+        Instr('imul', 'rdi', 'rdi', '2'),
+        Instr('mov', 'rcx', M),
+        Instr('mov', 'rsi', N),
+        Instr('mov', 'rcx', M),
+    ]
+    program = optimize(*code)
+    stats = {s.name: (s.hits, s.removed) for s in program.peephole_stats}
+    assert stats['self_move'] == (2, 2)
+    assert stats['multiply_by_power_of_two'] == (1, 0)
+    assert stats['repeated_move'] == (1, 1)
+    assert stats['dead_move'] == (0, 0)
+    text = peephole.format_stats(program.peephole_stats)
+    assert "self_move" in text and text.count("\n") == len(peephole.RULES)
+
+
+def test_comment_moves_to_the_next_instruction():
+    code = [Instr('mov', 'rcx', 'rcx', comment="a = b"), Instr('add', 'rsi', 'rcx')]
+    program = optimize(*code)
+    assert program.code == [Instr('add', 'rsi', 'rcx')]
+    assert program.code[0].comment == "a = b"
+
+
+def test_generated_code_has_stats():
+    ast = parser.Parser(lexer.tokenize_compact("int a = 3;\nint b = a * 4;\nint c = b + 0;\n")).parse()
+    program = code_generator.generate_code(intermediate_gen.generate_ir(ast))
+    assert [s.name for s in program.peephole_stats] == [rule.__name__ for rule, _ in peephole.RULES]
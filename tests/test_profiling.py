@@ -0,0 +1,42 @@
+from compiler import pipeline
+from compiler.profiling import Profiler
+
+SOURCE = "int a = 1;\nint b = a * 2;\n"
+
+
+def profile(phases):
+    profiler = Profiler(trace_memory=False)
+    started = []
+    finished = []
+    profiler.add_hook(pre=started.append, post=lambda phase, record, result: finished.append(phase))
+    for _ in profiler.run(phases):
+        pass
+    return started, finished
+
+
+def test_hooks_see_every_phase_of_a_full_run():
+    started, finished = profile(pipeline.iter_phases(SOURCE))
+    assert started == pipeline.PHASES
+    assert finished == pipeline.PHASES
+
+
+def test_hooks_follow_a_resumed_run():
+    ir = pipeline.compile_source(SOURCE)["ir"]
+    started, finished = profile(pipeline.resume_phases("ir", ir))
+    assert started == ["ir", "optimized", "target"]
+    assert finished == ["ir", "optimized", "target"]
+
+
+def test_hooks_stop_at_the_requested_phase():
+    lazy = pipeline.LazyPipeline(SOURCE)
+    started, finished = profile(lazy.iter_until("semantics"))
+    assert started == ["tokens", "ast", "semantics"]
+    assert finished == started
+
+
+def test_hooks_follow_cached_phases():
+    results = pipeline.compile_source(SOURCE)
+    cached = {phase: results[phase] for phase in ("semantics", "target")}
+    started, finished = profile(pipeline.PhaseStream(cached.items(), cached))
+    assert started == ["semantics", "target"]
+    assert finished == ["semantics", "target"]
@@ -0,0 +1,116 @@
+from compiler import lexer, parser, semantic_analyzer
+from compiler.semantic_analyzer import ERROR, WARNING, SemanticChecker, SymbolTable
+
+
+def parse(source):
+    return parser.Parser(lexer.tokenize_compact(source)).parse()
+
+
+def analyze(source):
+    return semantic_analyzer.analyze(parse(source))
+
+
+def summary(result):
+    return [(d.severity, d.line, d.column) for d in result]
+
+
+def test_clean_program_passes():
+    result = analyze("int a = 1;\nfloat b = a / 2;\nint c = a + 3;\n")
+    assert list(result) == []
+    assert result.symbols == 3
+    assert str(result) == "Semantic analysis passed."
+
+
+def test_redeclaration_points_at_the_first_declaration():
+    result = analyze("int a = 1;\nint b = 2;\n  float a = 3;\n")
+    assert summary(result) == [(ERROR, 3, 3)]
+    assert result.errors[0].message == "Variable 'a' already declared at line 1."
+    assert "Semantic analysis passed." not in str(result)
+
+
+def test_redeclaration_keeps_the_first_type():
+    # The later declaration is an error, so `a` stays an int and `b` needs no warning
+    result = analyze("int a = 1;\nfloat a = 2;\nint b = a * 2;\n")
+    assert summary(result) == [(ERROR, 2, 1)]
+
+
+def test_use_before_declaration():
+    result = analyze("int a = b + 1;\nint b = 2;\nint c = b;\n")
+    assert summary(result) == [(ERROR, 1, 9)]
+    assert result.errors[0].message == "Variable 'b' used before declaration."
+
+
+def test_declaration_cannot_read_itself():
+    assert summary(analyze("int a = a + 1;\n")) == [(ERROR, 1, 9)]
+
+
+def test_every_undeclared_use_is_reported_in_source_order():
+    result = analyze("int a = x * (y + x);\n")
+    assert [(d.message, d.column) for d in result] == [
+        ("Variable 'x' used before declaration.", 9),
+        ("Variable 'y' used before declaration.", 14),
+        ("Variable 'x' used before declaration.", 18),
+    ]
+
+
+def test_float_to_int_narrowing_warning():
+    result = analyze("float f = 3;\nint a = f * 2;\nint b = 1 + f;\nfloat c = a;\nint d = a / 2;\n")
+    assert summary(result) == [(WARNING, 2, 1), (WARNING, 3, 1)]
+    assert result.warnings[0].message == "Implicit conversion from float to int narrows the value of 'a'."
+    # Warnings alone still pass
+    assert str(result).endswith("Semantic analysis passed.")
+
+
+def test_mark_and_rollback_round_trip():
+    statements = parse("int a = 1;\nfloat b = a;\nint a = 2;\nint c = q;\nint d = b;\n")
+    checker = SemanticChecker()
+    for node in statements[:2]:
+        checker.visit(node)
+    mark = checker.mark()
+    before = (list(checker.diagnostics), dict(checker.symbols.ids), list(checker.symbols.names))
+    for node in statements[2:]:
+        checker.visit(node)
+    assert len(checker.diagnostics) == 3
+    checker.rollback(mark)
+    assert (checker.diagnostics, checker.symbols.ids, checker.symbols.names) == before
+    assert checker.symbols.lookup('c') is None
+    assert checker.symbols.lookup('a').type_name == 'int'
+    # Checking the same statements again gives what a fresh checker reports
+    for node in statements[2:]:
+        checker.visit(node)
+    fresh = semantic_analyzer.analyze(statements)
+    assert [repr(d) for d in checker.diagnostics] == [repr(d) for d in fresh]
+
+
+def test_rollback_to_an_empty_table():
+    table = SymbolTable()
+    mark = table.mark()
+    table.declare('a', 'int', 1, 1)
+    table.declare('b', 'float', 2, 1)
+    table.rollback(mark)
+    assert table.names == [] and table.ids == {} and table.bindings == []
+    assert table.declare('a', 'float') is None
+    assert table.lookup('a').type_name == 'float'
+
+
+def test_nested_scope_shadows_and_restores():
+    table = SymbolTable()
+    table.declare('a', 'int', 1, 1)
+    table.enter_scope()
+    assert table.declare('a', 'float', 2, 5) is None
+    assert table.lookup('a').type_name == 'float'
+    assert table.declare('b', 'int', 3, 5) is None
+    # Redeclaring in the same inner scope returns the inner binding
+    assert table.declare('a', 'int', 4, 5).line == 2
+    table.exit_scope()
+    assert table.lookup('a').type_name == 'int'
+    assert table.lookup('b') is None
+    # Leaving the scope unbinds its names; ids stay interned
+    assert 'b' in table.ids
+
+
+def test_declare_returns_the_earlier_binding():
+    table = SymbolTable()
+    assert table.declare('a', 'int', 1, 1) is None
+    previous = table.declare('a', 'float', 5, 3)
+    assert (previous.type_name, previous.line, previous.column) == ('int', 1, 1)
@@ -0,0 +1,134 @@
+import asyncio
+import json
+import os
+import socket
+import stat
+
+import pytest
+
+from compiler import client
+from compiler.server import CompileServer
+
+SOURCE = "int a = 7;\nfloat b = a / 2;\nint c = b * 2;\n"
+
+pytestmark = pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="needs Unix domain sockets")
+
+
+def serve(path, scenario, **options):
+    # Run the server on the event loop and `scenario(call)` against it, where `call`
+    # runs a blocking client function on a thread; returns what the scenario returns
+    server = CompileServer(path, **options)
+
+    async def main():
+        task = asyncio.ensure_future(server.run())
+        loop = asyncio.get_running_loop()
+        for _ in range(500):
+            if server.server is not None or task.done():
+                break
+            await asyncio.sleep(0.01)
+        if task.done():
+            task.result()
+
+        def call(function, *args):
+            return loop.run_in_executor(None, function, *args)
+
+        try:
+            return await scenario(call, server)
+        finally:
+            server.stopping.set()
+            await asyncio.wait_for(task, 10)
+
+    return asyncio.run(main())
+
+
+@pytest.fixture
+def socket_path(tmp_path):
+    return str(tmp_path / "compile.sock")
+
+
+def test_compile_round_trip(socket_path):
+    async def scenario(call, server):
+        mode = stat.S_IMODE(os.stat(socket_path).st_mode)
+        first = await call(client.compile_source, SOURCE, ["semantics", "target"], "a.cpp", socket_path, 10)
+        again = await call(client.compile_source, SOURCE, ["semantics", "target"], "a.cpp", socket_path, 10)
+        stats = await call(client.request, {"op": "stats"}, socket_path, 10)
+        return mode, first, again, stats
+
+    mode, first, again, stats = serve(socket_path, scenario, workers=2)
+    assert mode == 0o600
+    assert first["ok"] and first["status"] == "ok"
+    assert set(first["phases"]) == {"semantics", "target"}
+    assert "main:" in first["phases"]["target"]
+    assert [(d["severity"], d["line"], d["column"]) for d in first["diagnostics"]] == [("warning", 3, 1)]
+    assert again["phases"] == first["phases"]
+    assert stats["requests"] == 3 and stats["memo_hits"] == 1 and stats["documents"] == 1
+    assert not os.path.exists(socket_path)
+
+
+def test_errors_are_replies(socket_path):
+    async def scenario(call, server):
+        syntax = await call(client.compile_source, "int a = (1 + ;\n", ["target"], None, socket_path, 10)
+        semantic = await call(client.compile_source, "int a = b;\n", ["semantics"], None, socket_path, 10)
+        unknown = await call(client.request, {"op": "frobnicate", "id": 7}, socket_path, 10)
+        bad_phase = await call(client.request, {"source": "int a = 1;", "phases": ["linking"]}, socket_path, 10)
+        return syntax, semantic, unknown, bad_phase
+
+    syntax, semantic, unknown, bad_phase = serve(socket_path, scenario, workers=1)
+    assert syntax["status"] == "error" and syntax["phase"] == "ast"
+    assert (syntax["line"], syntax["column"]) == (1, 14)
+    assert semantic["status"] == "semantic-error"
+    assert semantic["diagnostics"][0]["message"] == "Variable 'b' used before declaration."
+    assert unknown == {"ok": False, "error": "ValueError: unknown op: 'frobnicate'", "id": 7}
+    assert not bad_phase["ok"] and "linking" in bad_phase["error"]
+
+
+def test_several_requests_on_one_connection(socket_path):
+    def exchange():
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(10)
+            sock.connect(socket_path)
+            with sock.makefile("rwb") as stream:
+                replies = []
+                for line in (b'{"source": "int a = 1;", "phases": ["ir"], "id": 1}\n', b'[1, 2]\n', b'not json\n'):
+                    stream.write(line)
+                    stream.flush()
+                    replies.append(json.loads(stream.readline()))
+                return replies
+
+    async def scenario(call, server):
+        return await call(exchange)
+
+    ir, not_object, not_json = serve(socket_path, scenario, workers=1)
+    assert ir["id"] == 1 and "a" in ir["phases"]["ir"]
+    assert not_object == {"ok": False, "error": "ValueError: request must be a JSON object"}
+    assert not not_json["ok"]
+
+
+def test_shutdown_request_stops_the_server(socket_path):
+    async def scenario(call, server):
+        reply = await call(client.request, {"op": "shutdown"}, socket_path, 10)
+        await asyncio.wait_for(server.stopping.wait(), 10)
+        return reply
+
+    assert serve(socket_path, scenario) == {"ok": True}
+    assert not os.path.exists(socket_path)
+
+
+def test_stale_socket_is_replaced(socket_path):
+    # A socket file nobody listens on, as a crashed server leaves behind
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.bind(socket_path)
+
+    async def scenario(call, server):
+        return await call(client.compile_source, SOURCE, ["ir"], None, socket_path, 10)
+
+    assert serve(socket_path, scenario)["status"] == "ok"
+
+
+def test_second_server_on_a_live_socket_fails(socket_path):
+    async def scenario(call, server):
+        with pytest.raises(RuntimeError, match="already listening"):
+            await CompileServer(socket_path).run()
+        return await call(client.request, {"op": "stats"}, socket_path, 10)
+
+    assert serve(socket_path, scenario)["ok"]
@@ -0,0 +1,51 @@
+import pytest
+
+from compiler import intermediate_gen, lexer, optimizer, parser, vm
+
+INT_MIN = "(0 - 9223372036854775807 - 1)"
+
+
+def lower(source):
+    return intermediate_gen.generate_ir(parser.Parser(lexer.tokenize_compact(source)).parse())
+
+
+def run(source, optimize=False):
+    program = lower(source)
+    if optimize:
+        program = optimizer.optimize(program)
+    return vm.run(program).values
+
+
+@pytest.mark.parametrize("optimize", [False, True])
+def test_integer_division_truncates_toward_zero(optimize):
+    values = run("int a = 0 - 7;\nint b = a / 2;\nint c = 7 / (0 - 2);\nint d = a / (0 - 2);\n", optimize)
+    assert (values["b"], values["c"], values["d"]) == (-3, -3, 3)
+
+
+@pytest.mark.parametrize("optimize", [False, True])
+def test_integer_overflow_wraps(optimize):
+    values = run("int a = 9223372036854775807;\nint b = a + 1;\nint c = a * 2;\n", optimize)
+    assert (values["b"], values["c"]) == (-2 ** 63, -2)
+
+
+@pytest.mark.parametrize("optimize", [False, True])
+@pytest.mark.parametrize("source, message", [
+    ("int a = 0;\nint b = 5 / a;\n", "division by zero in b"),
+    ("int a = 1 / 0;\n", "division by zero in a"),
+    (f"int m = {INT_MIN};\nint d = 0 - 1;\nint q = m / d;\n", "division overflow in q"),
+    (f"int q = {INT_MIN} / (0 - 1);\n", "division overflow in q"),
+])
+def test_division_traps(source, message, optimize):
+    with pytest.raises(vm.VMError, match=message):
+        run(source, optimize)
+
+
+def test_int_min_divided_by_other_values():
+    values = run(f"int m = {INT_MIN};\nint a = m / 1;\nint b = m / 2;\nint c = m / (0 - 2);\n")
+    assert (values["m"], values["a"], values["b"], values["c"]) == (-2 ** 63, -2 ** 63, -2 ** 62, 2 ** 62)
+
+
+def test_float_division_by_zero_follows_ieee():
+    values = run("float z = 0;\nfloat a = 1 / z;\nfloat b = (0 - 1) / z;\nfloat c = z / z;\n")
+    assert values["a"] == float("inf") and values["b"] == float("-inf")
+    assert values["c"] != values["c"]
@@ -0,0 +1,97 @@
+import threading
+
+from PyQt5.QtCore import QObject, QThread, pyqtSignal, pyqtSlot
+
+from compiler import pipeline, vm
+
+
+class CompileWorker(QObject):
+    # Every signal carries the generation so the UI can ignore stale runs
+    phase_done = pyqtSignal(int, str, object, str)
+    finished = pyqtSignal(int)
+    # generation, phase, message and the (line, column) of lexer and parser errors
+    failed = pyqtSignal(int, str, str, object)
+    cancelled = pyqtSignal(int)
+    stopped = pyqtSignal()
+
+    def __init__(self, lazy, until, generation, profiler=None, text_phases=None):
+        super().__init__()
+        # `lazy` is the LazyPipeline of one source version; only phases up to `until`
+        # run, and phases it already memoized are re-emitted without recomputing
+        self.lazy = lazy
+        self.until = until
+        self.generation = generation
+        self.profiler = profiler
+        # Phases whose results are shown as text; None formats every phase
+        self.text_phases = text_phases
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def is_cancelled(self):
+        return self._cancel.is_set()
+
+    def wants_text(self, phase):
+        return self.text_phases is None or phase in self.text_phases
+
+    @pyqtSlot()
+    def run(self):
+        phase = None
+        try:
+            phases = self.lazy.iter_until(self.until)
+            if self.profiler is not None:
+                phases = self.profiler.run(phases)
+            while not self._cancel.is_set():
+                try:
+                    phase, result = next(phases)
+                except StopIteration:
+                    self.finished.emit(self.generation)
+                    return
+                # Formatting large results is slow too, so it stays off the GUI thread
+                text = pipeline.format_phase(phase, result) if self.wants_text(phase) else ""
+                self.phase_done.emit(self.generation, phase, result, text)
+            self.cancelled.emit(self.generation)
+        except Exception as e:
+            failed_phase = pipeline.PHASES[pipeline.PHASES.index(phase) + 1] if phase else pipeline.PHASES[0]
+            self.failed.emit(self.generation, failed_phase, str(e), pipeline.error_position(e))
+        finally:
+            self.stopped.emit()
+
+
+class RunWorker(QObject):
+    # Executes the program before and after optimization on the bytecode VM
+    finished = pyqtSignal(int, str)
+    failed = pyqtSignal(int, str, str)
+    stopped = pyqtSignal()
+
+    def __init__(self, lazy, generation):
+        super().__init__()
+        self.lazy = lazy
+        self.generation = generation
+
+    @pyqtSlot()
+    def run(self):
+        try:
+            before = vm.run(self.lazy.get("ir"))
+            after = vm.run(self.lazy.get("optimized"))
+            saved = before.executed - after.executed
+            share = f" ({saved / before.executed:.0%})" if before.executed else ""
+            self.finished.emit(self.generation,
+                               f"{after}\n; unoptimized: executed {before.executed} instructions in "
+                               f"{before.seconds * 1000:.3f} ms\n; optimizer saved {saved} instructions{share}")
+        except Exception as e:
+            self.failed.emit(self.generation, "run", str(e))
+        finally:
+            self.stopped.emit()
+
+
+def start_worker(worker):
+    # Run the worker on its own QThread; the thread quits once the worker stops
+    thread = QThread()
+    worker.moveToThread(thread)
+    thread.started.connect(worker.run)
+    worker.stopped.connect(thread.quit)
+    thread.finished.connect(worker.deleteLater)
+    thread.start()
+    return thread
@@ -0,0 +1,99 @@
+import re
+
+from PyQt5.QtGui import QSyntaxHighlighter, QTextCharFormat, QColor, QFont
+
+from compiler import lexer
+
+# Highlights one text block (line) at a time with the lexer's own token_specification.
+# The state carried from line to line is the parenthesis depth plus whether a declared
+# name is still expected after a type keyword. Qt only re-runs the next block when a
+# block's end state changes, so an edit rescans its own line and, at most, the lines
+# whose state it actually alters.
+
+token_pattern = re.compile(lexer.token_regex)
+
+# Bit 0 of the block state: the previous token was a type keyword; the rest is the depth
+AFTER_TYPE = 1
+
+STYLES = {
+    'NUMBER': ("#D19A66", False),
+    'TYPE': ("#C678DD", True),
+    'DECLARED': ("#61AFEF", True),
+    'ASSIGN': ("#56B6C2", False),
+    'OP': ("#56B6C2", False),
+    'SEMI': ("#7F848E", False),
+}
+PAREN_COLORS = ["#E5C07B", "#C678DD", "#98C379"]
+ERROR_COLOR = "#E06C75"
+
+
+def scan_block(text, state):
+    # (start, length, style) spans for one line and the state after it. Identifiers
+    # keep the editor's default colour, so they need no span at all.
+    depth, after_type = state >> 1, state & AFTER_TYPE
+    spans = []
+    for mo in token_pattern.finditer(text):
+        kind = mo.lastgroup
+        if kind == 'SKIP':
+            continue
+        start = mo.start()
+        if kind == 'ID':
+            if mo.group() in lexer.keywords:
+                spans.append((start, mo.end() - start, 'TYPE'))
+                after_type = AFTER_TYPE
+                continue
+            if after_type:
+                spans.append((start, mo.end() - start, 'DECLARED'))
+        elif kind == 'LPAREN':
+            spans.append((start, 1, depth % len(PAREN_COLORS)))
+            depth += 1
+        elif kind == 'RPAREN':
+            if depth:
+                depth -= 1
+                spans.append((start, 1, depth % len(PAREN_COLORS)))
+            else:
+                spans.append((start, 1, 'MISMATCH'))
+        elif kind == 'MISMATCH':
+            spans.append((start, 1, 'MISMATCH'))
+        else:
+            if kind == 'SEMI':
+                # Parentheses never span statements, so a stray one does not colour the rest
+                depth = 0
+            spans.append((start, mo.end() - start, kind))
+        after_type = 0
+    return spans, depth << 1 | after_type
+
+
+class SourceHighlighter(QSyntaxHighlighter):
+    def __init__(self, document):
+        super().__init__(document)
+        self.formats = {}
+        for kind, (color, bold) in STYLES.items():
+            fmt = QTextCharFormat()
+            fmt.setForeground(QColor(color))
+            if bold:
+                fmt.setFontWeight(QFont.Bold)
+            self.formats[kind] = fmt
+        for depth, color in enumerate(PAREN_COLORS):
+            fmt = QTextCharFormat()
+            fmt.setForeground(QColor(color))
+            self.formats[depth] = fmt
+        fmt = QTextCharFormat()
+        fmt.setForeground(QColor(ERROR_COLOR))
+        fmt.setUnderlineStyle(QTextCharFormat.WaveUnderline)
+        fmt.setUnderlineColor(QColor(ERROR_COLOR))
+        self.formats['MISMATCH'] = fmt
+
+    def highlightBlock(self, text):
+        # previousBlockState() is -1 for the first block
+        spans, state = scan_block(text, max(self.previousBlockState(), 0))
+        formats = self.formats
+        if not text.isascii():
+            # Qt counts UTF-16 code units, so characters beyond the BMP count twice
+            units = [0]
+            for ch in text:
+                units.append(units[-1] + (2 if ord(ch) > 0xFFFF else 1))
+            spans = [(units[start], units[start + length] - units[start], style) for start, length, style in spans]
+        for start, length, style in spans:
+            self.setFormat(start, length, formats[style])
+        self.setCurrentBlockState(state)
@@ -1,11 +1,41 @@
 from PyQt5.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QTextEdit, QPushButton,
     QTabWidget, QMessageBox, QSplitter, QLabel, QHBoxLayout, 
-    QFrame, QGraphicsDropShadowEffect, QProgressBar, QApplication
+    QFrame, QGraphicsDropShadowEffect, QProgressBar, QTableView, QTreeView,
+    QHeaderView, QAbstractItemView
 )
 from PyQt5.QtGui import QFont, QColor, QPalette, QTextCharFormat, QTextCursor, QPainter, QLinearGradient
 from PyQt5.QtCore import Qt, QTimer, QPropertyAnimation, QEasingCurve, pyqtProperty, QRect
-from compiler import lexer, parser, semantic_analyzer, intermediate_gen, optimizer, code_generator
+from compiler import pipeline, optimizer
+from compiler.cache import PhaseCache
+from compiler.incremental import IncrementalCompiler
+from compiler.profiling import Profiler
+from ui.compile_worker import CompileWorker, RunWorker, start_worker
+from ui.highlighter import SourceHighlighter
+from ui.models import TokenTableModel, AstTreeModel, IRListModel
+
+# Tab, progress value and the status shown while the *next* phase runs, per pipeline phase
+PHASE_DISPLAY = {
+    "tokens": ("Tokens", 25, "🌳 Building syntax tree..."),
+    "ast": ("AST", 40, "✅ Performing semantic analysis..."),
+    "semantics": ("Semantics", 55, "⚙️ Generating intermediate code..."),
+    "ir": ("IR", 70, "🚀 Optimizing code..."),
+    "optimized": ("Optimized", 85, "💻 Generating target code..."),
+    "target": ("Target", 100, "✨ Finishing up..."),
+}
+
+TAB_PHASES = {tab: phase for phase, (tab, _, _) in PHASE_DISPLAY.items()}
+
+# Tabs backed by a model instead of formatted text, so huge results stay responsive
+MODEL_TABS = {"Tokens": TokenTableModel, "AST": AstTreeModel, "IR": IRListModel, "Optimized": IRListModel}
+TEXT_PHASES = {phase for phase, (tab, _, _) in PHASE_DISPLAY.items() if tab not in MODEL_TABS}
+
+# Live mode compiles this long after the last keystroke, so a burst of typing compiles once
+LIVE_DELAY_MS = 60
+# Live compiles always get far enough to report lexer, parser and semantic problems
+LIVE_MIN_PHASE = "semantics"
+PROBLEM_COLORS = {"error": "#E06C75", "warning": "#E5C07B"}
+MAX_LISTED_PROBLEMS = 5
 
 
 class GlowEffect(QGraphicsDropShadowEffect):
@@ -122,6 +152,86 @@ class NeonTextEdit(QTextEdit):
         self.setGraphicsEffect(glow)
 
 
+class ResultViewMixin:
+    # Shared look and model handling for the table and tree result views
+    def setup_view(self, model_class, accent_color):
+        self.model_class = model_class
+        font = QFont("JetBrains Mono", 11)
+        font.setStyleHint(QFont.Monospace)
+        self.setFont(font)
+        self.setAlternatingRowColors(True)
+        self.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.setStyleSheet(f"""
+            QAbstractItemView {{
+                background: qlineargradient(x1:0, y1:0, x2:1, y2:1,
+                    stop:0 rgba(30, 30, 47, 0.95),
+                    stop:1 rgba(44, 49, 60, 0.95));
+                alternate-background-color: rgba(255, 255, 255, 0.03);
+                color: {accent_color};
+                border: 2px solid rgba(255, 255, 255, 0.1);
+                border-radius: 12px;
+                gridline-color: rgba(255, 255, 255, 0.05);
+                selection-background-color: rgba(97, 175, 239, 0.3);
+            }}
+            QHeaderView::section {{
+                background: rgba(255, 255, 255, 0.05);
+                color: #ABB2BF;
+                border: none;
+                padding: 4px 8px;
+            }}
+            QScrollBar:vertical {{
+                background: rgba(255, 255, 255, 0.05);
+                width: 12px;
+                border-radius: 6px;
+            }}
+            QScrollBar::handle:vertical {{
+                background: {accent_color};
+                border-radius: 6px;
+                min-height: 20px;
+            }}
+        """)
+        self.setGraphicsEffect(GlowEffect(QColor(accent_color), 15))
+
+    def show_result(self, result):
+        old = self.model()
+        self.setModel(self.model_class(result, self))
+        if old is not None:
+            old.deleteLater()
+
+    def clear(self):
+        old = self.model()
+        self.setModel(None)
+        if old is not None:
+            old.deleteLater()
+
+
+class NeonTableView(ResultViewMixin, QTableView):
+    def __init__(self, model_class, accent_color="#61AFEF"):
+        super().__init__()
+        self.setup_view(model_class, accent_color)
+        # Fixed row heights let the view skip measuring rows it does not paint
+        header = self.verticalHeader()
+        header.setSectionResizeMode(QHeaderView.Fixed)
+        header.setDefaultSectionSize(22)
+        self.horizontalHeader().setStretchLastSection(True)
+        self.setShowGrid(False)
+
+
+class NeonTreeView(ResultViewMixin, QTreeView):
+    def __init__(self, model_class, accent_color="#61AFEF"):
+        super().__init__()
+        self.setup_view(model_class, accent_color)
+        # Uniform rows and lazily wrapped children keep expanding a huge program cheap
+        self.setUniformRowHeights(True)
+
+    def show_result(self, result):
+        super().show_result(result)
+        header = self.header()
+        header.setStretchLastSection(False)
+        header.setSectionResizeMode(0, QHeaderView.Stretch)
+
+
 class GlassFrame(QFrame):
     def __init__(self):
         super().__init__()
@@ -183,6 +293,30 @@ class CompilerUI(QMainWindow):
         super().__init__()
         self.setWindowTitle("✨Compiler - Advanced Code Processor")
         self.setGeometry(100, 50, 1400, 900)
+
+        # Background compile state: the latest generation wins, older runs are cancelled
+        self._generation = 0
+        self._worker = None
+        self._threads = []
+        # Per-statement cache so a recompile only redoes the statements that changed
+        self.incremental = IncrementalCompiler()
+        # On-disk results shared with the CLI; unchanged sources load without compiling
+        self.phase_cache = PhaseCache()
+        self._cache_hits = 0
+        self.profiler = None
+        self._pass_stats = None
+        # Lazily computed phases of the last compiled source; tabs pull from it on demand
+        self.lazy = None
+        self._until = None
+        self._displayed = set()
+        self._failed = False
+        # Results of a Run started before the source was recompiled are dropped
+        self._run_generation = 0
+        # Live mode: at most one compile thread at a time, and a flag for an edit that
+        # arrived while a superseded compile was still winding down
+        self._live = False
+        self._live_pending = False
+        self._compile_thread = None
         
         # Dark gradient background
         self.setStyleSheet("""
@@ -274,8 +408,28 @@ class CompilerUI(QMainWindow):
 
         self.editor = NeonTextEdit(is_readonly=False)
         self.editor.setPlaceholderText("// Enter your source code here...\n// The compiler will process it through multiple stages\n\nint main() {\n    // Your code here\n}")
+        # Rescans only the edited lines and those whose carried-over state changes
+        self.highlighter = SourceHighlighter(self.editor.document())
         left_layout.addWidget(self.editor)
 
+        # Problems of the last live compile, listed under the editor
+        self.problems_label = QLabel()
+        self.problems_label.setFont(QFont("JetBrains Mono", 10))
+        self.problems_label.setStyleSheet("""
+            color: #E06C75;
+            padding: 8px;
+            background: rgba(224, 108, 117, 0.08);
+            border-radius: 8px;
+        """)
+        self.problems_label.setVisible(False)
+        left_layout.addWidget(self.problems_label)
+
+        self.live_timer = QTimer(self)
+        self.live_timer.setSingleShot(True)
+        self.live_timer.setInterval(LIVE_DELAY_MS)
+        self.live_timer.timeout.connect(self.live_compile)
+        self.editor.textChanged.connect(self.on_text_changed)
+
         left_panel.setLayout(left_layout)
         splitter.addWidget(left_panel)
 
@@ -338,15 +492,25 @@ class CompilerUI(QMainWindow):
             ("⚙️ IR", "#56B6C2", "Intermediate Representation"),
             ("🚀 Optimized", "#D19A66", "Optimized IR Code"),
             ("💻 Target", "#61AFEF", "Generated Machine Code"),
+            ("📊 Profile", "#E5C07B", "Time and Size per Phase"),
+            ("🏃 Run", "#E06C75", "Program Output on the Bytecode VM"),
         ]
 
         for name, color, tooltip in tab_configs:
-            tab = NeonTextEdit(is_readonly=True, accent_color=color)
+            key = name.split(' ', 1)[1]
+            model_class = MODEL_TABS.get(key)
+            if model_class is AstTreeModel:
+                tab = NeonTreeView(model_class, accent_color=color)
+            elif model_class is not None:
+                tab = NeonTableView(model_class, accent_color=color)
+            else:
+                tab = NeonTextEdit(is_readonly=True, accent_color=color)
+                tab.setPlaceholderText(f"Compilation output will appear here after processing...")
             tab.setToolTip(tooltip)
-            tab.setPlaceholderText(f"Compilation output will appear here after processing...")
             self.output_tabs.addTab(tab, name)
-            self.tabs[name.split(' ', 1)[1]] = tab
+            self.tabs[key] = tab
 
+        self.output_tabs.currentChanged.connect(self.on_tab_changed)
         right_layout.addWidget(self.output_tabs)
         right_panel.setLayout(right_layout)
         splitter.addWidget(right_panel)
@@ -406,8 +570,80 @@ class CompilerUI(QMainWindow):
         """)
         clear_btn.clicked.connect(self.clear_all)
 
+        # Run Button
+        self.run_btn = AnimatedButton("▶ RUN")
+        self.run_btn.setFont(QFont("Segoe UI", 11, QFont.Bold))
+        self.run_btn.setFixedWidth(120)
+        self.run_btn.setStyleSheet("""
+            QPushButton {
+                background: qlineargradient(x1:0, y1:0, x2:1, y2:0,
+                    stop:0 rgba(152, 195, 121, 0.8),
+                    stop:1 rgba(152, 195, 121, 0.6));
+                color: white;
+                border-radius: 20px;
+                padding: 12px;
+                font-weight: bold;
+            }
+            QPushButton:hover {
+                background: rgba(152, 195, 121, 1.0);
+            }
+        """)
+        self.run_btn.clicked.connect(self.run_program)
+
+        # Live Button
+        self.live_btn = AnimatedButton("⚡LIVE")
+        self.live_btn.setFont(QFont("Segoe UI", 11, QFont.Bold))
+        self.live_btn.setFixedWidth(120)
+        self.live_btn.setCheckable(True)
+        self.live_btn.setChecked(True)
+        self.live_btn.setToolTip("Compile while typing")
+        self.live_btn.setStyleSheet("""
+            QPushButton {
+                background: rgba(255, 255, 255, 0.08);
+                color: rgba(232, 232, 232, 0.6);
+                border-radius: 20px;
+                padding: 12px;
+                font-weight: bold;
+            }
+            QPushButton:checked {
+                background: qlineargradient(x1:0, y1:0, x2:1, y2:0,
+                    stop:0 rgba(229, 192, 123, 0.8),
+                    stop:1 rgba(229, 192, 123, 0.6));
+                color: white;
+            }
+        """)
+        self.live_btn.toggled.connect(self.on_live_toggled)
+
+        # Cancel Button
+        self.cancel_btn = AnimatedButton("⛔CANCEL")
+        self.cancel_btn.setFont(QFont("Segoe UI", 11, QFont.Bold))
+        self.cancel_btn.setFixedWidth(140)
+        self.cancel_btn.setEnabled(False)
+        self.cancel_btn.setStyleSheet("""
+            QPushButton {
+                background: qlineargradient(x1:0, y1:0, x2:1, y2:0,
+                    stop:0 rgba(209, 154, 102, 0.8),
+                    stop:1 rgba(209, 154, 102, 0.6));
+                color: white;
+                border-radius: 20px;
+                padding: 12px;
+                font-weight: bold;
+            }
+            QPushButton:hover {
+                background: rgba(209, 154, 102, 1.0);
+            }
+            QPushButton:disabled {
+                background: rgba(255, 255, 255, 0.08);
+                color: rgba(232, 232, 232, 0.4);
+            }
+        """)
+        self.cancel_btn.clicked.connect(self.cancel_compile)
+
         controls_layout.addStretch()
         controls_layout.addWidget(clear_btn)
+        controls_layout.addWidget(self.live_btn)
+        controls_layout.addWidget(self.cancel_btn)
+        controls_layout.addWidget(self.run_btn)
         controls_layout.addWidget(self.compile_btn)
         controls_layout.addStretch()
         controls_frame.setLayout(controls_layout)
@@ -420,7 +656,10 @@ class CompilerUI(QMainWindow):
         main_widget.setLayout(main_layout)
 
     def clear_all(self):
+        self.cancel_compile()
+        self.lazy = None
         self.editor.clear()
+        self.show_problems([])
         for tab in self.tabs.values():
             tab.clear()
         self.status_bar.status_label.setText("Ready to compile ⚡")
@@ -428,11 +667,14 @@ class CompilerUI(QMainWindow):
     def update_status(self, message, show_progress=False):
         self.status_bar.status_label.setText(message)
         self.status_bar.progress.setVisible(show_progress)
-        QApplication.processEvents()
+
+    def source_code(self):
+        # Leading blank lines are kept so error positions match the editor's lines
+        return self.editor.toPlainText().rstrip()
 
     def compile_code(self):
-        code = self.editor.toPlainText().strip()
-        if not code:
+        code = self.source_code()
+        if not code.strip():
             QMessageBox.warning(
                 self, 
                 "Input Required", 
@@ -440,76 +682,259 @@ class CompilerUI(QMainWindow):
                 QMessageBox.Ok
             )
             return
+        self.start_compile(code, live=False)
+
+    def start_compile(self, code, live):
+        # A new request supersedes whatever is still running
+        self.cancel_compile(quiet=True)
+
+        # Live compiles keep the previous outputs until the new ones replace them
+        if not live:
+            for tab in self.tabs.values():
+                tab.clear()
+
+        # Only an explicit compile reads and writes the disk cache; every pause while
+        # typing is a new text, and the incremental compiler already reuses its work
+        cache = None if live else self.phase_cache
+        self.lazy = pipeline.LazyPipeline(code, cache, self.incremental)
+        self._live = live
+        self._run_generation += 1
+        self._displayed = set()
+        self._failed = False
+        self._pass_stats = None
+        self._cache_hits = self.phase_cache.hits
+        # Only the phases the selected tab needs run now; the Profile tab asks for all
+        phase = self.selected_phase() or pipeline.PHASES[-1]
+        if live and pipeline.PHASES.index(phase) < pipeline.PHASES.index(LIVE_MIN_PHASE):
+            phase = LIVE_MIN_PHASE
+        self.run_until(phase)
+
+    def on_text_changed(self):
+        if not self.live_btn.isChecked():
+            return
+        # Every edit restarts the debounce; a compile of an older text is superseded and
+        # stops at its next phase boundary instead of finishing work nobody will see
+        if self._worker is not None and self.source_code() != self.lazy.code:
+            self.cancel_compile(quiet=True)
+        self.live_timer.start()
+
+    def on_live_toggled(self, checked):
+        if checked:
+            self.live_timer.start()
+        else:
+            self.live_timer.stop()
+            self._live_pending = False
 
-        # Clear previous outputs
-        for tab in self.tabs.values():
-            tab.clear()
+    def live_compile(self):
+        # One compile thread at a time: wait for a superseded run to wind down first
+        if self._compile_thread is not None:
+            self._live_pending = True
+            return
+        code = self.source_code()
+        if self.lazy is not None and self.lazy.code == code:
+            # Unchanged text only resumes a compile that an edit interrupted
+            if not self._failed and not self.lazy.done(self._until):
+                self.run_until(self._until)
+            return
+        if not code.strip():
+            self.lazy = None
+            self.show_problems([])
+            return
+        self.start_compile(code, live=True)
+
+    def show_problems(self, problems):
+        # Underline each (severity, text, line, column) in the editor and list the first few
+        selections = []
+        document = self.editor.document()
+        for severity, text, line, column in problems:
+            block = document.findBlockByNumber(line - 1) if line else None
+            if block is None or not block.isValid():
+                continue
+            cursor = QTextCursor(block)
+            offset = min(max((column or 1) - 1, 0), max(block.length() - 2, 0))
+            cursor.setPosition(block.position() + offset)
+            cursor.movePosition(QTextCursor.NextCharacter, QTextCursor.KeepAnchor)
+            selection = QTextEdit.ExtraSelection()
+            selection.cursor = cursor
+            selection.format = QTextCharFormat()
+            selection.format.setUnderlineStyle(QTextCharFormat.WaveUnderline)
+            selection.format.setUnderlineColor(QColor(PROBLEM_COLORS[severity]))
+            selections.append(selection)
+        self.editor.setExtraSelections(selections)
+
+        lines = [text for _, text, _, _ in problems[:MAX_LISTED_PROBLEMS]]
+        if len(problems) > MAX_LISTED_PROBLEMS:
+            lines.append(f"... and {len(problems) - MAX_LISTED_PROBLEMS} more")
+        self.problems_label.setText("\n".join(lines))
+        self.problems_label.setVisible(bool(problems))
+
+    def selected_phase(self):
+        widget = self.output_tabs.currentWidget()
+        for name, tab in self.tabs.items():
+            if tab is widget:
+                return TAB_PHASES.get(name)
+        return None
+
+    def run_until(self, phase):
+        self._generation += 1
+        self._until = phase
+        self.update_status("🔍 Starting lexical analysis...", True)
+        self.status_bar.progress.setValue(10)
+        self.cancel_btn.setEnabled(True)
+
+        # tracemalloc slows every allocation several times over, so the GUI profiles time
+        # and sizes only; `python -m compiler --profile` also records peak memory
+        self.profiler = Profiler(trace_memory=False)
+        worker = CompileWorker(self.lazy, phase, self._generation, self.profiler, text_phases=TEXT_PHASES)
+        worker.phase_done.connect(self.on_phase_done)
+        worker.finished.connect(self.on_compile_finished)
+        worker.failed.connect(self.on_compile_failed)
+        thread = start_worker(worker)
+        thread.finished.connect(self.on_thread_finished)
+        self._worker = worker
+        self._compile_thread = thread
+        self._threads.append(thread)
+
+    def on_tab_changed(self, index):
+        # Switching to a tab whose phase has not been computed for this source runs the
+        # pipeline just far enough; phases already memoized are not recomputed
+        phase = self.selected_phase()
+        if self.lazy is None or phase is None or self._failed or phase in self._displayed:
+            return
+        if self._worker is not None and pipeline.PHASES.index(self._until) >= pipeline.PHASES.index(phase):
+            return
+        self.cancel_compile(quiet=True)
+        self.run_until(phase)
+
+    def run_program(self):
+        # Runs the compiled program; the source is compiled first when it changed
+        code = self.source_code()
+        if self.lazy is None or self.lazy.code != code:
+            self.compile_code()
+            if self.lazy is None or self.lazy.code != code:
+                return
+        self._run_generation += 1
+        self.update_status("🏃 Running program...", False)
+        worker = RunWorker(self.lazy, self._run_generation)
+        worker.finished.connect(self.on_run_finished)
+        worker.failed.connect(self.on_run_failed)
+        thread = start_worker(worker)
+        thread.finished.connect(self.on_thread_finished)
+        self._threads.append(thread)
+
+    def on_run_finished(self, generation, text):
+        if generation != self._run_generation:
+            return
+        self.tabs["Run"].setText(text)
+        self.output_tabs.setCurrentWidget(self.tabs["Run"])
+        self.update_status("🏃 Program finished", False)
 
-        try:
-            self.update_status("🔍 Starting lexical analysis...", True)
-            self.status_bar.progress.setValue(10)
-            
-            # Step 1: Lexical Analysis
-            tokens = lexer.tokenize(code)
-            token_display = []
-            for i, (typ, val) in enumerate(tokens, 1):
-                token_display.append(f"{i:3d}. {typ:15} → '{val}'")
-            self.tabs["Tokens"].setText("\n".join(token_display))
-            self.status_bar.progress.setValue(25)
-            
-            self.update_status("🌳 Building syntax tree...")
-            # Step 2: Parsing
-            ast = parser.Parser(tokens).parse()
-            self.tabs["AST"].setText(str(ast))
-            self.status_bar.progress.setValue(40)
-
-            self.update_status("✅ Performing semantic analysis...")
-            # Step 3: Semantic Analysis
-            sem_result = semantic_analyzer.analyze(ast)
-            self.tabs["Semantics"].setText(str(sem_result))
-            self.status_bar.progress.setValue(55)
-
-            self.update_status("⚙️ Generating intermediate code...")
-            # Step 4: Intermediate Representation
-            ir = intermediate_gen.generate_ir(ast)
-            self.tabs["IR"].setText(str(ir))
-            self.status_bar.progress.setValue(70)
-
-            self.update_status("🚀 Optimizing code...")
-            # Step 5: Optimizer
-            opt_ir = optimizer.optimize(ir)
-            self.tabs["Optimized"].setText(str(opt_ir))
-            self.status_bar.progress.setValue(85)
-
-            self.update_status("💻 Generating target code...")
-            # Step 6: Code Generation
-            code_output = code_generator.generate_code(opt_ir)
-            self.tabs["Target"].setText(str(code_output))
-            self.status_bar.progress.setValue(100)
-
-            self.update_status("✨ Compilation completed successfully!", False)
-            
-            # Success animation
-            QTimer.singleShot(2000, lambda: self.update_status("Ready for next compilation ⚡"))
-
-        except Exception as e:
-            self.update_status("❌ Compilation failed!", False)
-            msg = QMessageBox()
-            msg.setIcon(QMessageBox.Critical)
-            msg.setWindowTitle("Compilation Error")
-            msg.setText("An error occurred during compilation:")
-            msg.setDetailedText(str(e))
-            msg.setStyleSheet("""
-                QMessageBox {
-                    background-color: #1E1E2F;
-                    color: #E8E8E8;
-                }
-                QMessageBox QPushButton {
-                    background-color: #61AFEF;
-                    color: white;
-                    border-radius: 6px;
-                    padding: 8px 16px;
-                    min-width: 80px;
-                }
-            """)
-            msg.exec_()
\ No newline at end of file
+    def on_run_failed(self, generation, phase, error):
+        if generation != self._run_generation:
+            return
+        self.tabs["Run"].setText(f"Run failed: {error}")
+        self.output_tabs.setCurrentWidget(self.tabs["Run"])
+        self.update_status("❌ Run failed!", False)
+
+    def cancel_compile(self, quiet=False):
+        if self._worker is None:
+            return
+        # The worker stops at the next phase boundary; its late signals are ignored
+        self._worker.cancel()
+        self._worker = None
+        self._generation += 1
+        self.cancel_btn.setEnabled(False)
+        if not quiet:
+            self.update_status("⛔ Compilation cancelled", False)
+
+    def on_phase_done(self, generation, phase, result, text):
+        if generation != self._generation:
+            return
+        tab_name, progress, next_status = PHASE_DISPLAY[phase]
+        self.status_bar.progress.setValue(progress)
+        self.update_status(next_status, True)
+        if phase == "ast":
+            self.show_problems([])
+        elif phase == "semantics":
+            self.show_problems([(d.severity, str(d), d.line, d.column) for d in result])
+        if phase in self._displayed:
+            return
+        self._displayed.add(phase)
+        if tab_name in MODEL_TABS:
+            self.tabs[tab_name].show_result(result)
+        else:
+            self.tabs[tab_name].setText(text)
+        if phase == "optimized":
+            self._pass_stats = result.pass_stats
+
+    def on_compile_finished(self, generation):
+        if generation != self._generation:
+            return
+        self._worker = None
+        self.cancel_btn.setEnabled(False)
+        if self.phase_cache.hits > self._cache_hits:
+            detail = "loaded from cache"
+        else:
+            stats = self.incremental.stats
+            detail = f"{stats['compiled']} of {stats['statements']} statements recompiled"
+        profile = self.profiler.format_table()
+        if self._pass_stats:
+            profile += "\n\n" + optimizer.format_stats(self._pass_stats)
+        self.tabs["Profile"].setText(profile)
+        total_ms = self.profiler.report()["wall_seconds"] * 1000
+        stage = PHASE_DISPLAY[self._until][0]
+        self.update_status(f"✨ Compiled through {stage} in {total_ms:.0f} ms! ({detail})", False)
+
+        # Success animation
+        QTimer.singleShot(2000, lambda: self.update_status("Ready for next compilation ⚡"))
+
+    def on_compile_failed(self, generation, phase, error, position):
+        if generation != self._generation:
+            return
+        self._worker = None
+        self._failed = True
+        self.cancel_btn.setEnabled(False)
+        line, column = position or (None, None)
+        self.show_problems([("error", error, line, column)])
+        if self._live:
+            # While typing, errors stay inline instead of interrupting with a dialog
+            self.update_status(f"❌ {phase} error", False)
+            return
+        self.update_status("❌ Compilation failed!", False)
+        msg = QMessageBox()
+        msg.setIcon(QMessageBox.Critical)
+        msg.setWindowTitle("Compilation Error")
+        msg.setText(f"An error occurred during compilation ({phase}):")
+        msg.setDetailedText(error)
+        msg.setStyleSheet("""
+            QMessageBox {
+                background-color: #1E1E2F;
+                color: #E8E8E8;
+            }
+            QMessageBox QPushButton {
+                background-color: #61AFEF;
+                color: white;
+                border-radius: 6px;
+                padding: 8px 16px;
+                min-width: 80px;
+            }
+        """)
+        msg.exec_()
+
+    def on_thread_finished(self):
+        thread = self.sender()
+        if thread in self._threads:
+            self._threads.remove(thread)
+            thread.deleteLater()
+        if thread is self._compile_thread:
+            self._compile_thread = None
+            if self._live_pending:
+                self._live_pending = False
+                self.live_compile()
+
+    def closeEvent(self, event):
+        self.live_timer.stop()
+        self.cancel_compile(quiet=True)
+        for thread in list(self._threads):
+            thread.wait()
+        super().closeEvent(event)
@@ -0,0 +1,178 @@
+from PyQt5.QtCore import Qt, QAbstractItemModel, QAbstractTableModel, QModelIndex
+
+from compiler.ast_nodes import Node, Declare, BinOp, expression_size
+
+# Models for the large result tabs. Views only ask for the rows they paint, so rows are
+# formatted when they scroll into view instead of building one huge string per phase.
+
+
+class TokenTableModel(QAbstractTableModel):
+    HEADERS = ("Kind", "Value", "Line", "Column")
+
+    def __init__(self, tokens=(), parent=None):
+        super().__init__(parent)
+        self.tokens = tokens
+        self.positions = getattr(tokens, 'position', None)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.tokens)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+        row, column = index.row(), index.column()
+        if column < 2:
+            token = self.tokens[row]
+            if column == 0:
+                return token[0]
+            return "" if token[1] is None else str(token[1])
+        if self.positions is None:
+            return ""
+        return self.positions(row)[column - 2]
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return section + 1
+
+
+class IRListModel(QAbstractTableModel):
+    # One row per instruction of an IRProgram, formatted on demand
+    HEADERS = ("Instruction",)
+
+    def __init__(self, program=None, parent=None):
+        super().__init__(parent)
+        self.program = program
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() or self.program is None else len(self.program)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+        return self.program.format_instruction(index.row())
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return section
+
+
+class TreeItem:
+    # View-side wrapper giving each shown node a parent and row. Children are wrapped
+    # the first time the view asks for them, so collapsed subtrees cost nothing.
+    # Expression nodes are shared between occurrences, so an item also records which
+    # occurrence of its statement it shows and where that occurrence is.
+    __slots__ = ('node', 'parent', 'row', 'children', 'statement', 'occurrence', 'line', 'column')
+
+    def __init__(self, node, parent, row, statement=None, occurrence=None):
+        self.node = node
+        self.parent = parent
+        self.row = row
+        self.children = None
+        self.statement = statement
+        self.occurrence = occurrence
+        if statement is None:
+            self.line, self.column = getattr(node, 'line', None), getattr(node, 'column', None)
+        else:
+            self.line, self.column = statement.position(occurrence)
+
+
+def child_nodes(node):
+    # The program is a list of statements; every other item is an AST node
+    if isinstance(node, Node):
+        return list(node.children())
+    return node
+
+
+def child_item(item, row):
+    # Wrap child `row` of item. Occurrences are numbered in post order, so an operator's
+    # right operand ends just before it and its left operand just before the right one.
+    node = child_nodes(item.node)[row]
+    if isinstance(item.node, Declare):
+        return TreeItem(node, item, row, item.node, expression_size(node) - 1)
+    if item.statement is not None and item.node.__class__ is BinOp:
+        right = item.occurrence - 1
+        occurrence = right if row == 1 else right - expression_size(item.node.right)
+        return TreeItem(node, item, row, item.statement, occurrence)
+    return TreeItem(node, item, row)
+
+
+def node_label(node):
+    values = [getattr(node, name) for name in node._fields]
+    details = " ".join(repr(v) for v in values if not isinstance(v, Node))
+    return f"{node.__class__.__name__} {details}" if details else node.__class__.__name__
+
+
+class AstTreeModel(QAbstractItemModel):
+    HEADERS = ("Node", "Line", "Column")
+
+    def __init__(self, ast=(), parent=None):
+        super().__init__(parent)
+        self.root = TreeItem(ast, None, 0)
+
+    def item(self, index):
+        return index.internalPointer() if index.isValid() else self.root
+
+    def child_items(self, item):
+        if item.children is None:
+            item.children = [None] * len(child_nodes(item.node))
+        return item.children
+
+    def index(self, row, column, parent=QModelIndex()):
+        if not self.hasIndex(row, column, parent):
+            return QModelIndex()
+        item = self.item(parent)
+        children = self.child_items(item)
+        child = children[row]
+        if child is None:
+            child = children[row] = child_item(item, row)
+        return self.createIndex(row, column, child)
+
+    def parent(self, index):
+        if not index.isValid():
+            return QModelIndex()
+        parent = index.internalPointer().parent
+        if parent is None or parent is self.root:
+            return QModelIndex()
+        return self.createIndex(parent.row, 0, parent)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.column() > 0:
+            return 0
+        return len(self.child_items(self.item(parent)))
+
+    def columnCount(self, parent=QModelIndex()):
+        return len(self.HEADERS)
+
+    def hasChildren(self, parent=QModelIndex()):
+        # Answered without wrapping the children, so the expand arrow stays cheap
+        item = self.item(parent)
+        if item is self.root:
+            return len(item.node) > 0
+        return parent.column() <= 0 and any(True for _ in item.node.children())
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+        item = index.internalPointer()
+        column = index.column()
+        if column == 0:
+            return node_label(item.node)
+        value = item.line if column == 1 else item.column
+        return "" if value is None else value
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return None